@@ -1,14 +1,181 @@
+from datetime import datetime, timedelta
+from functools import cached_property, lru_cache
+
 from django.contrib import admin
+from django.contrib.admin.views.main import ChangeList
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import F, Max, Min, OuterRef, QuerySet, Subquery
+from django.db.models.functions import Coalesce
 from django.utils.html import format_html
-from .models import Student, Course, Attendance, AttendanceSession, TeacherProfile
+from .models import (
+    Student, Course, Attendance, AttendanceSession, TeacherProfile, StudentAttendanceStats,
+    Exam, ExamType, Marks,
+)
+
+
+def estimated_row_count(model, using='default'):
+    """Fast approximate row count of ``model``'s table, or None if the backend has none"""
+    connection = connections[using]
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SELECT reltuples FROM pg_class WHERE oid = %s::regclass', [table])
+        elif connection.vendor == 'mysql':
+            cursor.execute(
+                'SELECT table_rows FROM information_schema.tables '
+                'WHERE table_schema = DATABASE() AND table_name = %s', [table]
+            )
+        elif connection.vendor == 'sqlite':
+            # The largest rowid: exact unless rows were deleted, and read from the b-tree's edge
+            cursor.execute(f'SELECT MAX(rowid) FROM {connection.ops.quote_name(table)}')
+        else:
+            return None
+        row = cursor.fetchone()
+    return int(row[0]) if row and row[0] is not None and row[0] >= 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Changelist paginator that counts an unfiltered table from the database's
+    statistics once it is large, instead of a COUNT(*) over every row.
+    Filtered changelists (search, filters, a date_hierarchy level) are
+    counted exactly, through the indexes those filters use.
+    """
+    # Tables with fewer rows than this are counted exactly
+    estimate_above = 100000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if isinstance(queryset, QuerySet) and not queryset.query.where and not queryset.query.distinct:
+            estimate = estimated_row_count(queryset.model, queryset.db)
+            if estimate is not None and estimate >= self.estimate_above:
+                return estimate
+        return super().count
+
+
+class DistinctDatesQuerySet(QuerySet):
+    """
+    ``dates()`` for the admin's date_hierarchy from a DISTINCT over the stored
+    column, which an index on it serves, truncated in Python -- instead of a
+    DISTINCT over a truncation computed for every row. When ``dates_from``
+    (a tuple of querysets) is set, the dates -- and a Min/Max of a field, the
+    hierarchy's opening date range -- are read from those (smaller)
+    querysets instead and combined.
+    """
+    dates_from = None
+
+    TRUNCATE = {
+        'year': lambda day: day.replace(month=1, day=1),
+        'month': lambda day: day.replace(day=1),
+        'week': lambda day: day - timedelta(days=day.weekday()),
+        'day': lambda day: day,
+    }
+
+    def _clone(self):
+        clone = super()._clone()
+        clone.dates_from = self.dates_from
+        return clone
+
+    def dates(self, field_name, kind, order='ASC'):
+        truncate = self.TRUNCATE[kind]
+        days = {
+            truncate(day)
+            for source in (self.dates_from or (self,))
+            for day in source.order_by().values_list(field_name, flat=True).distinct()
+            if day is not None
+        }
+        return sorted(days, reverse=order == 'DESC')
+
+    def aggregate(self, *args, **kwargs):
+        if self.dates_from is not None and not args and kwargs and all(
+            isinstance(expression, (Min, Max)) and isinstance(expression.source_expressions[0], F)
+            for expression in kwargs.values()
+        ):
+            results = [source.aggregate(**kwargs) for source in self.dates_from]
+            combined = {}
+            for name, expression in kwargs.items():
+                values = [result[name] for result in results if result[name] is not None]
+                pick = min if isinstance(expression, Min) else max
+                combined[name] = pick(values) if values else None
+            return combined
+        return super().aggregate(*args, **kwargs)
+
+
+@lru_cache(maxsize=None)
+def distinct_dates_class(queryset_class):
+    """``queryset_class`` (a model's own QuerySet, say) with DistinctDatesQuerySet's ``dates()``"""
+    if issubclass(queryset_class, DistinctDatesQuerySet):
+        return queryset_class
+    return type(f'DistinctDates{queryset_class.__name__}', (DistinctDatesQuerySet, queryset_class), {})
+
+
+class LargeTableChangeList(ChangeList):
+    """
+    Points the changelist's queryset, which the date_hierarchy tag reads, at
+    the admin's ``date_hierarchy_source`` once the page's rows are fetched.
+    Admin actions query ``get_queryset()`` afresh and are unaffected.
+    """
+
+    def __init__(self, request, *args, **kwargs):
+        super().__init__(request, *args, **kwargs)
+        if self.date_hierarchy and self.model_admin.date_hierarchy_source:
+            self.queryset = self.queryset.all()
+            self.queryset.dates_from = self.model_admin.date_hierarchy_dates(request)
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """Changelist settings for tables that grow to millions of rows"""
+    paginator = EstimatedCountPaginator
+    # Skip the second, unfiltered COUNT(*) shown next to filtered result counts
+    show_full_result_count = False
+    # A model with the same date_hierarchy field, much smaller, whose dates
+    # the drill-down offers instead of scanning the (filtered) changelist rows
+    date_hierarchy_source = None
+
+    def get_changelist(self, request, **kwargs):
+        return LargeTableChangeList
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        if self.date_hierarchy:
+            # Keeps the model's queryset methods (Attendance's bulk delete keeps its counters)
+            queryset_class = distinct_dates_class(type(queryset))
+            queryset = queryset_class(model=queryset.model, query=queryset.query.chain(), using=queryset._db)
+        return queryset
+
+    def date_hierarchy_lookups(self, request):
+        """Filter arguments for the drill-down level selected in ``request``"""
+        field = self.date_hierarchy
+        lookups = {}
+        for part in ('year', 'month', 'day'):
+            value = request.GET.get(f'{field}__{part}')
+            if value and value.isdigit():
+                lookups[f'{field}__{part}'] = int(value)
+        return lookups
+
+    def date_hierarchy_dates(self, request):
+        """Querysets whose dates, at the selected level, the drill-down offers"""
+        return (self.date_hierarchy_source._default_manager.filter(**self.date_hierarchy_lookups(request)),)
+
+    def get_search_results(self, request, queryset, search_term):
+        # A YYYY-MM-DD search term is an exact (indexed) match on the date_hierarchy field
+        if self.date_hierarchy:
+            try:
+                day = datetime.strptime(search_term.strip(), '%Y-%m-%d').date()
+            except ValueError:
+                pass
+            else:
+                return queryset.filter(**{self.date_hierarchy: day}), False
+        return super().get_search_results(request, queryset, search_term)
 
 
 @admin.register(Student)
-class StudentAdmin(admin.ModelAdmin):
+class StudentAdmin(LargeTableAdmin):
     """Admin interface for Student model"""
     list_display = ['id', 'name', 'roll_number', 'email', 'attendance_count', 'created_at']
     search_fields = ['name', 'id', 'roll_number', 'email']
-    list_filter = ['created_at']
     ordering = ['roll_number']
     readonly_fields = ['created_at', 'updated_at']
     
@@ -22,13 +189,22 @@ class StudentAdmin(admin.ModelAdmin):
         })
     )
     
+    def get_queryset(self, request):
+        # Read the maintained overall counter instead of a COUNT per row
+        queryset = super().get_queryset(request)
+        overall = StudentAttendanceStats.objects.filter(student=OuterRef('pk'), course__isnull=True)
+        return queryset.annotate(
+            attendance_total=Coalesce(Subquery(overall.values('total')[:1]), 0)
+        )
+
     def attendance_count(self, obj):
-        count = obj.attendance_records.count()
+        count = obj.attendance_total
         return format_html(
             '<span style="background-color: #e3f2fd; padding: 3px 8px; border-radius: 3px;">{}</span>',
             count
         )
     attendance_count.__name__= 'Attendance Records'
+    attendance_count.admin_order_field = 'attendance_total'
 
 
 @admin.register(Course)
@@ -51,11 +227,18 @@ class CourseAdmin(admin.ModelAdmin):
 
 
 @admin.register(Attendance)
-class AttendanceAdmin(admin.ModelAdmin):
+class AttendanceAdmin(LargeTableAdmin):
     """Admin interface for Attendance model"""
     list_display = ['student', 'date', 'status_badge', 'marked_at', 'course']
-    search_fields = ['student__name', 'student__id', 'date']
-    list_filter = ['date', 'status', 'course', 'created_at']
+    # Dates are searched as YYYY-MM-DD (an exact match), not with LIKE
+    search_fields = ['student__name', '=student__id']
+    date_hierarchy = 'date'
+    # Attendance with a course has a session (one per course and date), so the
+    # drill-down lists the days attendance was taken, whatever the filters
+    date_hierarchy_source = AttendanceSession
+    list_filter = ['status', 'course']
+    list_select_related = ['student', 'course']
+    autocomplete_fields = ['student', 'course', 'marked_by']
     ordering = ['-date']
     readonly_fields = ['created_at', 'updated_at', 'marked_at']
     
@@ -85,18 +268,25 @@ class AttendanceAdmin(admin.ModelAdmin):
             color, label
         )
     status_badge.__name__ = 'Status'
-    
-    def get_queryset(self, request):
-        queryset = super().get_queryset(request)
-        return queryset.select_related('student', 'course')
+
+    def date_hierarchy_dates(self, request):
+        # Attendance without a course has no session; its days come from the rows themselves
+        lookups = self.date_hierarchy_lookups(request)
+        return (
+            *super().date_hierarchy_dates(request),
+            Attendance.objects.filter(course__isnull=True, **lookups),
+        )
 
 
 @admin.register(AttendanceSession)
-class AttendanceSessionAdmin(admin.ModelAdmin):
+class AttendanceSessionAdmin(LargeTableAdmin):
     """Admin interface for AttendanceSession model"""
     list_display = ['course', 'date', 'teacher', 'present_count', 'absent_count', 'total_students']
-    search_fields = ['course__name', 'date']
-    list_filter = ['date', 'course', 'teacher', 'created_at']
+    search_fields = ['course__name']
+    date_hierarchy = 'date'
+    list_filter = ['course', 'teacher']
+    list_select_related = ['course', 'teacher']
+    autocomplete_fields = ['course', 'teacher']
     ordering = ['-date']
     readonly_fields = ['created_at', 'updated_at', 'total_students', 'present_count', 'absent_count']
     
@@ -114,13 +304,16 @@ class AttendanceSessionAdmin(admin.ModelAdmin):
     )
     
     actions = ['calculate_stats_action']
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        # The counts are derived: seed a new session from the attendance already marked
+        if not change or {'course', 'date'} & set(form.changed_data):
+            AttendanceSession.objects.filter(pk=obj.pk).recalculate_stats()
     
     def calculate_stats_action(self, request, queryset):
         """Admin action to recalculate statistics"""
-        count = 0
-        for session in queryset:
-            session.calculate_stats()
-            count += 1
+        count = queryset.recalculate_stats()
         self.message_user(request, f'Calculated stats for {count} sessions')
     calculate_stats_action.__name__ = 'Recalculate statistics for selected sessions'
 
@@ -140,4 +333,32 @@ class TeacherProfileAdmin(admin.ModelAdmin):
             'fields': ('created_at',),
             'classes': ('collapse',)
         })
-    )
\ No newline at end of file
+    )
+
+
+@admin.register(ExamType)
+class ExamTypeAdmin(admin.ModelAdmin):
+    """Admin interface for ExamType model"""
+    list_display = ['name', 'weightage', 'created_at']
+    search_fields = ['name']
+
+
+@admin.register(Exam)
+class ExamAdmin(admin.ModelAdmin):
+    """Admin interface for Exam model"""
+    list_display = ['name', 'course', 'exam_type', 'semester', 'max_marks', 'date']
+    search_fields = ['name', 'course__code', 'course__name', 'semester']
+    list_filter = ['exam_type', 'semester']
+    list_select_related = ['course', 'exam_type']
+    autocomplete_fields = ['course', 'exam_type', 'created_by']
+
+
+@admin.register(Marks)
+class MarksAdmin(LargeTableAdmin):
+    """Admin interface for Marks model"""
+    list_display = ['student', 'exam', 'marks_obtained', 'percentage', 'grade', 'updated_at']
+    search_fields = ['student__name', '=student__id']
+    list_filter = ['grade', 'exam__exam_type']
+    list_select_related = ['student', 'exam__course', 'exam__exam_type']
+    autocomplete_fields = ['student', 'exam', 'uploaded_by']
+    readonly_fields = ['percentage', 'grade', 'created_at', 'updated_at']
@@ -0,0 +1,129 @@
+"""
+Class-wide marks analytics per exam.
+
+Count, mean, standard deviation, min and max come from one grouped
+aggregate and the grade histogram from a second; median, percentiles and
+the top/bottom students from a single ordered pass over the percentages
+(NumPy's ``percentile`` when it is installed, the same linear
+interpolation otherwise). All three queries cover every exam asked for at
+once. Results for the default options are cached per exam and dropped
+whenever one of the exam's marks is written (see ``cache.invalidate_exams``).
+"""
+from collections import defaultdict
+
+from django.db.models import Avg, Count, Max, Min, StdDev
+
+from .cache import exam_key, get_cache
+from .grading import grading_scale
+from .models import Marks
+
+try:
+    import numpy as np
+except ImportError:  # percentiles fall back to pure Python
+    np = None
+
+DEFAULT_PERCENTILES = (10, 25, 50, 75, 90)
+DEFAULT_TOP_K = 5
+
+
+def _round(value):
+    return round(float(value), 2) if value is not None else None
+
+
+def percentiles(values, points):
+    """Linearly interpolated percentiles of an ascending list (as numpy.percentile)"""
+    if not values:
+        return [None] * len(points)
+    if np is not None:
+        return np.percentile(np.asarray(values, dtype=float), points).tolist()
+    last = len(values) - 1
+    result = []
+    for point in points:
+        position = last * point / 100
+        lower = int(position)
+        upper = min(lower + 1, last)
+        result.append(values[lower] + (values[upper] - values[lower]) * (position - lower))
+    return result
+
+
+def _student(row):
+    student_id, name, obtained, percentage = row
+    return {
+        'student_id': student_id,
+        'student_name': name,
+        'marks_obtained': float(obtained),
+        'percentage': float(percentage),
+    }
+
+
+def compute_exam_analytics(exams, points=DEFAULT_PERCENTILES, k=DEFAULT_TOP_K):
+    """Analytics dict per exam id for ``exams`` (Exam instances), uncached"""
+    marks = Marks.objects.filter(exam__in=exams, percentage__isnull=False).order_by()
+    summaries = {
+        row.pop('exam_id'): row
+        for row in marks.values('exam_id').annotate(
+            count=Count('id'),
+            mean=Avg('percentage'),
+            std_dev=StdDev('percentage'),
+            min=Min('percentage'),
+            max=Max('percentage'),
+        )
+    }
+    histograms = defaultdict(dict)
+    for exam_id, grade, count in marks.values_list('exam_id', 'grade').annotate(count=Count('id')):
+        histograms[exam_id][grade] = count
+
+    # Ascending percentages per exam; ties broken by student for a stable top/bottom
+    ordered = defaultdict(list)
+    for exam_id, *row in marks.values_list(
+        'exam_id', 'student_id', 'student__name', 'marks_obtained', 'percentage'
+    ).order_by('exam_id', 'percentage', 'student_id'):
+        ordered[exam_id].append(row)
+
+    _, scale_grades = grading_scale()
+    analytics = {}
+    for exam in exams:
+        summary = summaries.get(exam.pk, {'count': 0, 'mean': None, 'std_dev': None, 'min': None, 'max': None})
+        rows = ordered.get(exam.pk, [])
+        values = [float(row[3]) for row in rows]
+        histogram = {grade: 0 for grade in reversed(scale_grades)}
+        histogram.update(histograms.get(exam.pk, {}))
+        cuts = percentiles(values, [50, *points])
+        analytics[exam.pk] = {
+            'exam_id': exam.pk,
+            'exam_name': exam.name,
+            'exam_type': exam.exam_type.name,
+            'semester': exam.semester,
+            'max_marks': float(exam.max_marks),
+            'count': summary['count'],
+            'mean': _round(summary['mean']),
+            'median': _round(cuts[0]),
+            'std_dev': _round(summary['std_dev']),
+            'min': _round(summary['min']),
+            'max': _round(summary['max']),
+            'percentiles': {str(point): _round(value) for point, value in zip(points, cuts[1:])},
+            'grade_histogram': histogram,
+            'top': [_student(row) for row in reversed(rows[-k:])] if k else [],
+            'bottom': [_student(row) for row in rows[:k]] if k else [],
+        }
+    return analytics
+
+
+def exam_analytics(exams, points=DEFAULT_PERCENTILES, k=DEFAULT_TOP_K):
+    """
+    Analytics for each of ``exams``, in order. With the default options
+    cached entries are reused and only the missing exams are computed.
+    """
+    if tuple(points) != DEFAULT_PERCENTILES or k != DEFAULT_TOP_K:
+        computed = compute_exam_analytics(exams, points, k)
+        return [computed[exam.pk] for exam in exams]
+
+    cache = get_cache()
+    keys = {exam.pk: exam_key('analytics', exam.pk) for exam in exams}
+    cached = cache.get_many(list(keys.values()))
+    missing = [exam for exam in exams if keys[exam.pk] not in cached]
+    if missing:
+        computed = compute_exam_analytics(missing)
+        cache.set_many({keys[exam_id]: data for exam_id, data in computed.items()})
+        cached.update({keys[exam_id]: data for exam_id, data in computed.items()})
+    return [cached[keys[exam.pk]] for exam in exams]
@@ -4,3 +4,21 @@ from django.apps import AppConfig
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        from django.core import checks
+
+        from .auth import connect_signals as connect_login_signals
+        from .cache import check_shared_cache
+        from .conditional import connect_signals
+        from .metrics import connect_signals as connect_metrics_signals
+        from .querycheck import connect_signals as connect_querycheck_signals
+        from .stats import connect_signals as connect_stats_signals
+        from .tokens import connect_signals as connect_token_signals
+        connect_signals(self)
+        connect_login_signals()
+        connect_token_signals()
+        connect_metrics_signals()
+        connect_querycheck_signals()
+        connect_stats_signals()
+        checks.register(check_shared_cache, checks.Tags.caches, deploy=True)
@@ -0,0 +1,239 @@
+"""
+Async (ASGI-native) versions of the hot read views.
+
+Same URLs, query parameters and response bodies as their counterparts in
+views.py, written against Django's async ORM API so that under an ASGI
+server a request waiting on the database does not hold a worker thread.
+urls.py routes to them when ``API_ASYNC_VIEWS`` is on, which asgi.py turns
+on by default. DRF has no async function views, so these are plain Django
+views rendering JSON through ``json_response``. ``login`` is here too, so
+that its password hash runs on the login thread pool (see auth.py) rather
+than on the one thread Django keeps for sync views.
+"""
+import asyncio
+import json
+import logging
+from datetime import datetime
+
+from asgiref.sync import sync_to_async
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from . import views
+from .auth import aresolve_login
+from .cache import cached_student_response, json_response
+from .conditional import conditional_get
+from .fast_serializers import aattendance_rows, astudent_marks_rows
+from .models import Attendance, Marks, Student
+from .pagination import requested_fields, wants_pagination
+from .serializers import AttendanceSerializer, LoginSerializer
+from .stats import BREAKDOWNS, aattendance_summary, astudent_totals, attendance_percentage
+
+logger = logging.getLogger(__name__)
+
+
+async def _recent_history(student_id, limit=50):
+    records = (
+        Attendance.objects.filter(student_id=student_id)
+        .order_by('-date')
+        .values('date', 'status', 'marked_at')[:limit]
+    )
+    return [
+        {
+            'date': record['date'].strftime('%B %d, %Y'),  # Format: January 06, 2024
+            'status': record['status'],
+            'time': record['marked_at'].strftime('%I:%M %p') if record['marked_at'] else 'N/A'
+        }
+        async for record in records
+    ]
+
+
+async def _breakdown(by, student_id):
+    if not by:
+        return None
+    return await aattendance_summary(by=by, student_id=student_id)
+
+
+def _bad_breakdown(by):
+    if by is not None and by not in BREAKDOWNS:
+        return json_response(
+            {'error': f"by must be one of: {', '.join(BREAKDOWNS)}"}, status.HTTP_400_BAD_REQUEST
+        )
+    return None
+
+
+@require_GET
+@cached_student_response('dashboard')
+async def student_dashboard(request, student_id):
+    """
+    GET: Get student's attendance data for dashboard
+
+    URL: /api/student-dashboard/<student_id>/?by=course|month
+    Returns: Complete student dashboard with all attendance statistics;
+    ``by`` adds a per-course or per-month ``breakdown``
+    """
+    by = request.GET.get('by')
+    error = _bad_breakdown(by)
+    if error:
+        return error
+    try:
+        # The lookups only need the id, so they are issued together
+        student, totals, attendance_history, breakdown = await asyncio.gather(
+            Student.objects.aget(id=student_id),
+            astudent_totals(student_id),
+            _recent_history(student_id),
+            _breakdown(by, student_id),
+        )
+        total_classes = totals['total']
+        present_classes = totals['present']
+
+        data = {
+            'student_id': student.id,
+            'student_name': student.name,
+            'roll_number': student.roll_number,
+            'total_classes': total_classes,
+            'present_count': present_classes,
+            'absent_count': totals['absent'],
+            'attendance_percentage': attendance_percentage(present_classes, total_classes, digits=None),
+            'attendance_history': attendance_history
+        }
+        if breakdown is not None:
+            data['breakdown'] = breakdown
+        return json_response(data)
+    except Student.DoesNotExist:
+        return json_response({'error': 'Student not found'}, status.HTTP_404_NOT_FOUND)
+    except Exception as e:
+        logger.error(f"Error in student_dashboard: {str(e)}", exc_info=True)
+        return json_response({'error': str(e)}, status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@require_GET
+async def attendance_statistics(request, student_id):
+    """
+    GET: Summary statistics for a student's attendance
+
+    URL: /api/attendance-statistics/<student_id>/?by=course|month
+    Returns: Totals and percentage; ``by`` adds a per-course or per-month ``breakdown``
+    """
+    by = request.GET.get('by')
+    error = _bad_breakdown(by)
+    if error:
+        return error
+    try:
+        student, totals, breakdown = await asyncio.gather(
+            Student.objects.aget(id=student_id),
+            astudent_totals(student_id),
+            _breakdown(by, student_id),
+        )
+        total = totals['total']
+        present = totals['present']
+
+        data = {
+            'student_id': student.id,
+            'student_name': student.name,
+            'total_classes': total,
+            'present': present,
+            'absent': totals['absent'],
+            'attendance_percentage': attendance_percentage(present, total),
+        }
+        if breakdown is not None:
+            data['breakdown'] = breakdown
+        return json_response(data)
+    except Student.DoesNotExist:
+        return json_response({'error': 'Student not found'}, status.HTTP_404_NOT_FOUND)
+    except Exception as e:
+        logger.error(f"Error in attendance_statistics: {str(e)}", exc_info=True)
+        return json_response({'error': str(e)}, status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@require_GET
+@cached_student_response('marks')
+async def get_marks(request, student_id):
+    """
+    GET: Get all marks for a student
+
+    URL: /api/marks/<student_id>/
+    Returns: All marks across all exams and courses
+    """
+    try:
+        student, marks_data = await asyncio.gather(
+            Student.objects.aget(id=student_id),
+            astudent_marks_rows(Marks.objects.filter(student_id=student_id).order_by('-created_at')),
+        )
+        return json_response({
+            'student_id': student.id,
+            'student_name': student.name,
+            'marks': marks_data
+        })
+    except Student.DoesNotExist:
+        return json_response({'error': 'Student not found'}, status.HTTP_404_NOT_FOUND)
+    except Exception as e:
+        logger.error(f"Error in get_marks: {str(e)}", exc_info=True)
+        return json_response({'error': str(e)}, status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@require_GET
+@conditional_get(views._attendance_by_date_version)
+async def get_attendance_by_date(request, attendance_date):
+    """
+    GET: Get attendance records for a specific date
+
+    URL: /api/attendance-by-date/<attendance_date>/
+    Query: ?fields=student_id,status (sparse rows); ?page_size=/?cursor= are
+    served by the synchronous view, since DRF's cursor paginator is sync-only
+    Returns: List of attendance records for the date
+    """
+    if wants_pagination(request):
+        return await sync_to_async(views.get_attendance_by_date)(request, attendance_date)
+    try:
+        date_obj = datetime.strptime(attendance_date, '%Y-%m-%d').date()
+        fields = requested_fields(request, AttendanceSerializer)
+        data = await aattendance_rows(Attendance.objects.filter(date=date_obj), fields)
+        logger.info(f"Retrieved {len(data)} attendance records for {attendance_date}")
+        return json_response(data)
+    except ValueError:
+        return json_response({'error': 'Invalid date format. Use YYYY-MM-DD'}, status.HTTP_400_BAD_REQUEST)
+    except APIException as e:
+        return json_response({'error': e.detail}, e.status_code)
+    except Exception as e:
+        logger.error(f"Error in get_attendance_by_date: {str(e)}", exc_info=True)
+        return json_response({'error': str(e)}, status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@csrf_exempt  # as DRF's APIView, which the sync login is served by
+@require_POST
+async def login(request):
+    """
+    POST: Authenticate user
+
+    URL: /api/login/
+    Body: {"id": "username", "password": "password"}
+    Returns: User information with role and authentication details
+    """
+    try:
+        try:
+            payload = json.loads(request.body or b'{}')
+        except ValueError:
+            payload = None
+        serializer = LoginSerializer(data=payload if isinstance(payload, dict) else request.POST)
+        if not serializer.is_valid():
+            logger.warning(f"Invalid login request: {serializer.errors}")
+            return json_response({
+                'success': False,
+                'message': 'Invalid request data. Please provide both id and password.',
+                'error': serializer.errors
+            }, status.HTTP_400_BAD_REQUEST)
+
+        username = serializer.validated_data['id']
+        logger.info(f"Login attempt for username: {username}")
+        status_code, body = await aresolve_login(username, serializer.validated_data['password'], request)
+        return json_response(body, status_code)
+    except Exception as e:
+        logger.error(f"Error in login: {str(e)}", exc_info=True)
+        return json_response({
+            'success': False,
+            'message': 'An error occurred during login. Please try again.',
+            'error': str(e)
+        }, status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -0,0 +1,174 @@
+"""
+Login identity resolution for ``/api/login/``.
+
+The password is checked by ``django.contrib.auth.authenticate``, so
+AUTHENTICATION_BACKENDS, ``ModelBackend``'s ``is_active`` rule and the
+``user_login_failed`` signal all apply; with the default backend a teacher
+login is one query. Only when it returns no user is the id looked up as a
+Student (or a User with a wrong password), and that lookup is remembered in
+the ``api`` cache for ``LOGIN_IDENTITY_CACHE_TTL`` seconds, so a class
+logging in at once reads each student once. Saving or deleting a User or
+Student drops the cached identity of that name; rows written with
+``bulk_create`` show up once the TTL expires.
+
+Checking a password is a full PBKDF2 hash. The async login view runs
+``authenticate`` on a bounded thread pool (``LOGIN_HASH_WORKERS``) so
+concurrent logins hash in parallel instead of queueing on Django's single
+thread for sync code.
+"""
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import authenticate
+from django.contrib.auth.models import User
+from django.db import close_old_connections
+from django.db.models.signals import post_delete, post_save
+from rest_framework import status
+
+from .cache import get_cache
+from .models import Student
+from .tokens import issue_tokens
+
+logger = logging.getLogger(__name__)
+
+UNKNOWN = {'role': None}
+WRONG_PASSWORD = {'role': 'user'}
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _identity_key(username):
+    # Hashed: a username may hold characters memcached refuses in a key
+    return f"identity:{hashlib.sha256(username.encode()).hexdigest()}"
+
+
+def _identity_ttl():
+    return getattr(settings, 'LOGIN_IDENTITY_CACHE_TTL', 60)
+
+
+def _identity(student, user_exists):
+    if student:
+        return {'role': 'student', 'id': student['id'], 'name': student['name']}
+    return WRONG_PASSWORD if user_exists else UNKNOWN
+
+
+def find_identity(username):
+    """The cached or looked-up identity of a ``username`` that did not authenticate"""
+    cache = get_cache()
+    identity = cache.get(_identity_key(username))
+    if identity is None:
+        student = Student.objects.filter(id=username).values('id', 'name').first()
+        identity = _identity(student, not student and User.objects.filter(username=username).exists())
+        cache.set(_identity_key(username), identity, _identity_ttl())
+    return identity
+
+
+async def afind_identity(username):
+    """Async version of ``find_identity``"""
+    cache = get_cache()
+    identity = await cache.aget(_identity_key(username))
+    if identity is None:
+        student = await Student.objects.filter(id=username).values('id', 'name').afirst()
+        identity = _identity(student, not student and await User.objects.filter(username=username).aexists())
+        await cache.aset(_identity_key(username), identity, _identity_ttl())
+    return identity
+
+
+def _hash_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'LOGIN_HASH_WORKERS', 4), thread_name_prefix='login-hash'
+            )
+    return _pool
+
+
+def _pooled_authenticate(request, username, password):
+    # The pool's threads keep their own connections; drop stale ones like a request would
+    close_old_connections()
+    try:
+        return authenticate(request, username=username, password=password)
+    finally:
+        close_old_connections()
+
+
+def _user_success(user):
+    name = user.get_full_name() or user.username
+    # Teachers, staff and any other authenticated users are served the teacher view
+    logger.info(f"User authenticated as teacher: {name}")
+    return status.HTTP_200_OK, {
+        'success': True,
+        'role': 'teacher',
+        'user_id': str(user.id),
+        'user_name': name,
+        'message': 'Login successful',
+        **issue_tokens('teacher', user.id, name),
+    }
+
+
+def _student_success(identity):
+    logger.info(f"Found student: {identity['name']} (ID: {identity['id']})")
+    # For demo: students log in with their ID and any password
+    return status.HTTP_200_OK, {
+        'success': True,
+        'role': 'student',
+        'user_id': identity['id'],
+        'user_name': identity['name'],
+        'message': 'Login successful',
+        **issue_tokens('student', identity['id'], identity['name']),
+    }
+
+
+INVALID_PASSWORD = (status.HTTP_401_UNAUTHORIZED, {
+    'success': False,
+    'message': 'Invalid password. Please check your password.',
+    'error': 'The password you entered is incorrect'
+})
+NOT_FOUND = (status.HTTP_401_UNAUTHORIZED, {
+    'success': False,
+    'message': 'Invalid credentials. Username not found. Please check your username and password, or run "python manage.py setup_default_users" to create default users.',
+    'error': 'Invalid credentials'
+})
+
+
+def _outcome(username, user, identity):
+    """(status code, body) from what ``authenticate`` returned and, if nothing, the identity"""
+    if user is not None:
+        return _user_success(user)
+    # A student whose id matches a User name may still log in as the student
+    if identity['role'] == 'student':
+        return _student_success(identity)
+    logger.warning(f"Authentication failed for username: {username}")
+    return INVALID_PASSWORD if identity == WRONG_PASSWORD else NOT_FOUND
+
+
+def resolve_login(username, password, request=None):
+    """(status code, response body) for a login attempt"""
+    user = authenticate(request, username=username, password=password)
+    return _outcome(username, user, None if user else find_identity(username))
+
+
+async def aresolve_login(username, password, request=None):
+    """Async version of ``resolve_login``; ``authenticate`` runs on the login thread pool"""
+    user = await sync_to_async(_pooled_authenticate, thread_sensitive=False, executor=_hash_pool())(
+        request, username, password
+    )
+    return _outcome(username, user, None if user else await afind_identity(username))
+
+
+def forget_identity(sender, instance, **kwargs):
+    """post_save/post_delete receiver dropping the cached identity for a User or Student name"""
+    name = instance.username if isinstance(instance, User) else instance.pk
+    get_cache().delete(_identity_key(name))
+
+
+def connect_signals():
+    for model in (User, Student):
+        post_save.connect(forget_identity, sender=model, dispatch_uid=f'login-identity-save-{model.__name__}')
+        post_delete.connect(forget_identity, sender=model, dispatch_uid=f'login-identity-delete-{model.__name__}')
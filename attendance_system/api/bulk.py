@@ -0,0 +1,248 @@
+"""
+Batched write paths used by the attendance and marks endpoints.
+
+Every function here touches the database a constant number of times per
+batch (not per record) and runs its writes inside a single transaction.
+"""
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Student, Attendance, ExamType, Exam, Marks
+from .stats import apply_attendance_changes, apply_session_changes
+from .grading import TWO_PLACES, grade_marks, regrade_exam
+from .cache import ATTENDANCE_VIEWS, MARKS_VIEWS, invalidate_courses, invalidate_exams, invalidate_students
+
+
+ATTENDANCE_UPDATE_FIELDS = ['status', 'marked_by', 'marked_at', 'updated_at']
+MARKS_UPDATE_FIELDS = ['marks_obtained', 'percentage', 'grade', 'uploaded_by', 'updated_at']
+
+
+def upsert_attendance(date, records, course=None, marked_by=None):
+    """
+    Create or update attendance for one roll call.
+
+    ``records`` is an iterable of ``{"student_id": ..., "status": "P"|"A"}``;
+    if a student appears more than once the last status wins.
+
+    The student counters and the course's AttendanceSession are updated in
+    the same transaction. The students' rows are locked first, so concurrent
+    roll calls for the same students run one after the other and each reads
+    the previous statuses the other committed.
+
+    Returns ``(attendance_queryset, unknown_student_ids)`` where the queryset
+    yields the stored rows for the known students.
+    """
+    statuses = {}
+    for record in records:
+        statuses[record['student_id']] = record['status']
+
+    with transaction.atomic():
+        # One IN query validates every student id in the batch and locks the
+        # students, which also covers attendance rows not created yet
+        known_ids = set(
+            Student.objects.select_for_update()
+            .filter(id__in=list(statuses))
+            .order_by('id')
+            .values_list('id', flat=True)
+        )
+        unknown_ids = [student_id for student_id in statuses if student_id not in known_ids]
+
+        rows = [
+            Attendance(
+                student_id=student_id,
+                course=course,
+                date=date,
+                status=status_value,
+                marked_by=marked_by,
+            )
+            for student_id, status_value in statuses.items()
+            if student_id in known_ids
+        ]
+
+        # Previous statuses feed the incremental attendance counters
+        existing = {
+            student_id: (pk, previous_status)
+            for student_id, pk, previous_status in Attendance.objects.select_for_update()
+            .filter(date=date, course=course, student_id__in=known_ids)
+            .order_by('pk')
+            .values_list('student_id', 'id', 'status')
+        }
+
+        if course is not None:
+            Attendance.objects.bulk_create(
+                rows,
+                update_conflicts=True,
+                unique_fields=['student', 'date', 'course'],
+                update_fields=ATTENDANCE_UPDATE_FIELDS,
+            )
+        else:
+            # NULL never conflicts in a unique index, so rows without a course
+            # are matched against the existing ones explicitly.
+            now = timezone.now()
+            to_update = []
+            to_create = []
+            for row in rows:
+                if row.student_id in existing:
+                    row.pk = existing[row.student_id][0]
+                    row.marked_at = datetime.now().time()
+                    row.updated_at = now
+                    to_update.append(row)
+                else:
+                    to_create.append(row)
+            Attendance.objects.bulk_create(to_create)
+            Attendance.objects.bulk_update(to_update, ATTENDANCE_UPDATE_FIELDS)
+
+        changes = [
+            (row.student_id, row.course_id, existing.get(row.student_id, (None, None))[1], row.status)
+            for row in rows
+        ]
+        apply_attendance_changes(changes)
+        apply_session_changes(
+            [(course_id, date, old_status, new_status) for _, course_id, old_status, new_status in changes],
+            teacher_id=marked_by.pk if marked_by else None,
+        )
+        invalidate_students(known_ids, ATTENDANCE_VIEWS)
+
+    stored = (
+        Attendance.objects.filter(date=date, course=course, student_id__in=known_ids)
+        .select_related('student', 'course')
+    )
+    return stored, unknown_ids
+
+
+def to_decimal(value):
+    """Parse a JSON/CSV number into a 2-place Decimal; ``None`` if it is not numeric"""
+    if value is None or isinstance(value, bool):
+        return None
+    try:
+        number = Decimal(str(value).strip())
+    except (InvalidOperation, ValueError):
+        return None
+    if not number.is_finite():
+        return None
+    return number.quantize(TWO_PLACES)
+
+
+def prepare_exam(course, exam_type, max_marks):
+    """
+    Get or create the Exam for ``course``/``exam_type`` and make sure its
+    max_marks matches this upload. The Exam row is written at most once.
+    """
+    exam_type_obj, _ = ExamType.objects.get_or_create(
+        name=str(exam_type).strip().title()
+    )
+    exam, created = Exam.objects.get_or_create(
+        course=course,
+        exam_type=exam_type_obj,
+        defaults={
+            'name': f'{exam_type_obj.name} - {course.code}',
+            'max_marks': max_marks,
+        }
+    )
+    if not created and exam.max_marks != max_marks:
+        exam.max_marks = max_marks
+        exam.save(update_fields=['max_marks', 'updated_at'])
+        # Marks already stored were graded against the old max_marks
+        regrade_exam(exam)
+    return exam
+
+
+def write_marks(exam, records, uploaded_by=None, first_row=1, seen_ids=None):
+    """
+    Validate and store a batch of marks for one exam.
+
+    ``records`` is a list of ``{"student_id", "marks_obtained", "max_marks"?}``
+    dicts; ``first_row`` is the row number reported for ``records[0]``.
+    A student id is accepted once: later records for it are rejected as
+    duplicates, including ids in ``seen_ids`` (those accepted by earlier
+    batches of the same upload), to which this batch's ids are added.
+    Percentage and grade are computed for the whole batch by
+    ``grading.grade_marks``, then all rows are written with one bulk_create
+    and one bulk_update inside a single transaction.
+
+    Returns one result dict per record, in order, with ``status`` set to
+    ``created``, ``updated`` or ``rejected`` (plus a ``reason``).
+    """
+    max_marks = exam.max_marks
+    results = []
+    accepted = {}
+
+    for offset, record in enumerate(records):
+        student_id = record.get('student_id')
+        student_id = str(student_id).strip() if student_id is not None else ''
+        result = {'row': first_row + offset, 'student_id': student_id or None}
+        results.append(result)
+
+        marks_obtained = to_decimal(record.get('marks_obtained'))
+        record_max = record.get('max_marks')
+        reason = None
+        if not student_id:
+            reason = 'student_id is required'
+        elif record.get('marks_obtained') in (None, ''):
+            reason = 'marks_obtained is required'
+        elif marks_obtained is None:
+            reason = 'marks_obtained must be a number'
+        elif record_max not in (None, '') and to_decimal(record_max) != max_marks:
+            reason = f'max_marks {record_max} does not match the exam max_marks {max_marks}'
+        elif marks_obtained < 0 or marks_obtained > max_marks:
+            reason = f'marks_obtained must be between 0 and {max_marks}'
+        elif student_id in accepted or (seen_ids is not None and student_id in seen_ids):
+            reason = 'duplicate student_id in upload'
+
+        if reason:
+            result.update(status='rejected', reason=reason)
+            continue
+        result['marks_obtained'] = float(marks_obtained)
+        accepted[student_id] = (result, marks_obtained)
+    if seen_ids is not None:
+        seen_ids.update(accepted)
+
+    known_ids = set(
+        Student.objects.filter(id__in=list(accepted)).values_list('id', flat=True)
+    )
+    existing = dict(
+        Marks.objects.filter(exam=exam, student_id__in=known_ids).values_list('student_id', 'id')
+    )
+
+    now = timezone.now()
+    to_create = []
+    to_update = []
+    for student_id, (result, _) in accepted.items():
+        if student_id not in known_ids:
+            result.pop('marks_obtained')
+            result.update(status='rejected', reason='student not found')
+    graded = [(student_id, result, marks_obtained)
+              for student_id, (result, marks_obtained) in accepted.items() if student_id in known_ids]
+    percentages, grades = grade_marks([marks_obtained for _, _, marks_obtained in graded], max_marks)
+
+    for (student_id, result, marks_obtained), percentage, grade in zip(graded, percentages, grades):
+        mark = Marks(
+            student_id=student_id,
+            exam=exam,
+            marks_obtained=marks_obtained,
+            percentage=percentage,
+            grade=grade,
+            uploaded_by=uploaded_by,
+        )
+        result['percentage'] = float(percentage) if percentage is not None else None
+        result['grade'] = grade
+        if student_id in existing:
+            mark.pk = existing[student_id]
+            mark.updated_at = now
+            to_update.append(mark)
+            result['status'] = 'updated'
+        else:
+            to_create.append(mark)
+            result['status'] = 'created'
+
+    with transaction.atomic():
+        Marks.objects.bulk_create(to_create)
+        Marks.objects.bulk_update(to_update, MARKS_UPDATE_FIELDS)
+        invalidate_students([mark.student_id for mark in to_create + to_update], MARKS_VIEWS)
+        invalidate_courses([exam.course_id])
+        invalidate_exams([exam.pk])
+
+    return results
@@ -0,0 +1,193 @@
+"""
+Per-student and per-course response cache for the read-heavy endpoints.
+
+Responses are stored in the ``api`` cache (see CACHES in settings) under one
+key per student (or course, or exam) and view. Writers call
+``invalidate_students``, ``invalidate_courses`` and ``invalidate_exams`` for
+the rows they touched, so entries never outlive the data they were built
+from; the cache TIMEOUT is only a safety net. That only holds when every worker
+shares the cache, which the ``check_shared_cache`` deploy check enforces
+outside DEBUG.
+"""
+import threading
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core import checks
+from django.core.cache import caches
+from django.db import transaction
+from django.http import HttpResponse
+from rest_framework import status
+from rest_framework.response import Response
+
+from .metrics import TimedJSONRenderer
+
+CACHE_ALIAS = 'api'
+ATTENDANCE_VIEWS = ('dashboard',)
+MARKS_VIEWS = ('marks', 'gpa')
+STUDENT_VIEWS = ATTENDANCE_VIEWS + MARKS_VIEWS
+COURSE_VIEWS = ('results',)
+EXAM_VIEWS = ('analytics',)
+
+_lock = threading.Lock()
+_counters = {'hits': 0, 'misses': 0, 'invalidations': 0}
+
+
+def _bump(counter, amount=1):
+    with _lock:
+        _counters[counter] += amount
+
+
+def get_cache():
+    return caches[CACHE_ALIAS]
+
+
+def check_shared_cache(app_configs=None, **kwargs):
+    """System check: a per-process backend cannot be shared by several workers"""
+    backend = settings.CACHES.get(CACHE_ALIAS, {}).get('BACKEND', '')
+    if settings.DEBUG or not backend.endswith('.LocMemCache'):
+        return []
+    return [checks.Error(
+        f"The '{CACHE_ALIAS}' cache uses LocMemCache outside DEBUG",
+        hint=(
+            'Invalidations and table versions would not reach the other worker processes; '
+            'set API_CACHE_BACKEND=file or db (shared by the workers of one host), or redis or memcached.'
+        ),
+        id='api.E001',
+    )]
+
+
+def student_key(kind, student_id):
+    return f'student:{student_id}:{kind}'
+
+
+def course_key(kind, course_id):
+    return f'course:{course_id}:{kind}'
+
+
+def exam_key(kind, exam_id):
+    return f'exam:{exam_id}:{kind}'
+
+
+def json_response(data, status_code=status.HTTP_200_OK):
+    """
+    Plain Django response with the same body DRF's Response would render,
+    for the async views; ``data`` is kept on it like on a DRF Response.
+    """
+    response = HttpResponse(TimedJSONRenderer().render(data), status=status_code, content_type='application/json')
+    response.data = data
+    return response
+
+
+def cached_student_response(kind):
+    """
+    Cache a ``view(request, student_id)`` 200 response per student.
+
+    Requests with query parameters bypass the cache, since they may ask
+    for a different shape than the cached one. Async views share the same
+    entries through the cache's async API.
+    """
+    return _cached_response(student_key, 'student_id', kind)
+
+
+def cached_course_response(kind):
+    """Like ``cached_student_response``, for a ``view(request, course_id)``"""
+    return _cached_response(course_key, 'course_id', kind)
+
+
+def _object_id(name, args, kwargs):
+    # URL captures arrive as keyword arguments; direct calls may pass them positionally
+    return kwargs[name] if name in kwargs else args[0]
+
+
+def _cached_response(make_key, id_name, kind):
+    def decorator(view):
+        if iscoroutinefunction(view):
+            return _async_cached(make_key, id_name, kind, view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method != 'GET' or request.query_params:
+                return view(request, *args, **kwargs)
+
+            cache = get_cache()
+            key = make_key(kind, _object_id(id_name, args, kwargs))
+            data = cache.get(key)
+            if data is not None:
+                _bump('hits')
+                response = Response(data, status=status.HTTP_200_OK)
+                response['X-Cache'] = 'HIT'
+                return response
+
+            _bump('misses')
+            response = view(request, *args, **kwargs)
+            if response.status_code == status.HTTP_200_OK:
+                cache.set(key, response.data)
+            response['X-Cache'] = 'MISS'
+            return response
+        return wrapper
+    return decorator
+
+
+def _async_cached(make_key, id_name, kind, view):
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method != 'GET' or request.GET:
+            return await view(request, *args, **kwargs)
+
+        cache = get_cache()
+        key = make_key(kind, _object_id(id_name, args, kwargs))
+        data = await cache.aget(key)
+        if data is not None:
+            _bump('hits')
+            response = json_response(data)
+            response['X-Cache'] = 'HIT'
+            return response
+
+        _bump('misses')
+        response = await view(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            await cache.aset(key, response.data)
+        response['X-Cache'] = 'MISS'
+        return response
+    return wrapper
+
+
+def invalidate_students(student_ids, kinds=STUDENT_VIEWS):
+    """
+    Drop the cached responses of ``kinds`` for ``student_ids``.
+
+    Inside a transaction the entries are dropped again on commit, so a read
+    racing the write cannot leave pre-commit data in the cache.
+    """
+    _invalidate([student_key(kind, student_id) for student_id in set(student_ids) for kind in kinds])
+
+
+def invalidate_courses(course_ids, kinds=COURSE_VIEWS):
+    """Drop the cached responses of ``kinds`` for ``course_ids``, as ``invalidate_students``"""
+    _invalidate([course_key(kind, course_id) for course_id in set(course_ids) for kind in kinds])
+
+
+def invalidate_exams(exam_ids, kinds=EXAM_VIEWS):
+    """Drop the cached per-exam entries of ``kinds`` for ``exam_ids``, as ``invalidate_students``"""
+    _invalidate([exam_key(kind, exam_id) for exam_id in set(exam_ids) for kind in kinds])
+
+
+def _invalidate(keys):
+    if not keys:
+        return
+    get_cache().delete_many(keys)
+    _bump('invalidations', len(keys))
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: get_cache().delete_many(keys))
+
+
+def cache_stats():
+    """Hit/miss counters of this process"""
+    with _lock:
+        stats = dict(_counters)
+    lookups = stats['hits'] + stats['misses']
+    stats['hit_rate'] = round(stats['hits'] / lookups, 4) if lookups else 0
+    stats['backend'] = get_cache().__class__.__name__
+    return stats
@@ -0,0 +1,91 @@
+"""
+Conditional GET (ETag / Last-Modified) for the polled list endpoints.
+
+Each endpoint supplies a cheap validator: an aggregate such as COUNT plus
+MAX(updated_at) over the rows it would return, combined with per-table
+version counters for related tables whose edits change the payload
+(e.g. a student's name). When the client's ``If-None-Match`` or
+``If-Modified-Since`` still matches, Django's ``condition`` decorator
+answers 304 before the view runs, so nothing is serialized.
+"""
+import hashlib
+import time
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.db.models.signals import post_delete, post_save
+from django.views.decorators.http import condition
+
+from .cache import get_cache
+
+VERSIONED_MODELS = ('Student', 'Course', 'Exam', 'ExamType')
+
+
+def _version_key(model):
+    return f'table-version:{model._meta.label_lower}'
+
+
+def table_version(model):
+    """Current version counter of ``model``'s table"""
+    cache = get_cache()
+    key = _version_key(model)
+    # Start from a clock value so an evicted counter never repeats an old one
+    cache.add(key, time.time_ns(), timeout=None)
+    return cache.get(key)
+
+
+def bump_table_version(sender, **kwargs):
+    """post_save/post_delete receiver for the models in VERSIONED_MODELS"""
+    cache = get_cache()
+    key = _version_key(sender)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), timeout=None)
+
+
+def connect_signals(app_config):
+    for name in VERSIONED_MODELS:
+        model = app_config.get_model(name)
+        post_save.connect(bump_table_version, sender=model, dispatch_uid=f'table-version-save-{name}')
+        post_delete.connect(bump_table_version, sender=model, dispatch_uid=f'table-version-delete-{name}')
+
+
+def conditional_get(validator):
+    """
+    Add ETag/Last-Modified handling to a view.
+
+    ``validator(request, *args, **kwargs)`` returns ``(parts, last_modified)``
+    where ``parts`` is any repr-able value that changes whenever the response
+    would (None to skip validation), and ``last_modified`` is a datetime or
+    None. It runs once per request; the query string is part of the ETag.
+    For async views it runs in a worker thread before Django's check.
+    """
+    def validators(request, *args, **kwargs):
+        if not hasattr(request, '_conditional_validators'):
+            parts, last_modified = validator(request, *args, **kwargs)
+            digest = None
+            if parts is not None:
+                digest = hashlib.sha1(
+                    repr((parts, request.GET.urlencode())).encode(), usedforsecurity=False
+                ).hexdigest()
+            request._conditional_validators = (digest, last_modified)
+        return request._conditional_validators
+
+    check = condition(
+        etag_func=lambda request, *args, **kwargs: validators(request, *args, **kwargs)[0],
+        last_modified_func=lambda request, *args, **kwargs: validators(request, *args, **kwargs)[1],
+    )
+
+    def decorator(view):
+        conditional_view = check(view)
+        if not iscoroutinefunction(view):
+            return conditional_view
+
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            # condition() calls the validator synchronously; memoize it off the event loop first
+            await sync_to_async(validators)(request, *args, **kwargs)
+            return await conditional_view(request, *args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,201 @@
+"""
+Bulk export of attendance and marks for institutional reporting.
+
+Rows are joined with Student/Course/Exam in SQL, read in server-side chunks
+(``QuerySet.iterator``) and written out as they arrive, as CSV or, when
+pyarrow is installed, as Parquet (one row group per chunk). Memory use does
+not depend on the number of rows exported, under ASGI too: the view sends
+the chunks through ``streaming.streaming_response``. Used by
+``/api/export/`` and the ``export_records`` management command.
+"""
+import csv
+import io
+from datetime import date, datetime, time
+
+from django.db.models import Q
+
+from .models import Attendance, Marks
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet export is optional
+    pa = pq = None
+
+EXPORT_CHUNK_SIZE = 2000
+DATASETS = ('attendance', 'marks')
+FORMATS = ('csv', 'parquet')
+CONTENT_TYPES = {'csv': 'text/csv', 'parquet': 'application/vnd.apache.parquet'}
+
+# (column header, values() lookup, type) per dataset
+ATTENDANCE_COLUMNS = (
+    ('date', 'date', 'date'),
+    ('student_id', 'student_id', 'string'),
+    ('student_name', 'student__name', 'string'),
+    ('roll_number', 'student__roll_number', 'string'),
+    ('course_id', 'course_id', 'string'),
+    ('course_name', 'course__name', 'string'),
+    ('status', 'status', 'string'),
+    ('marked_at', 'marked_at', 'time'),
+)
+
+MARKS_COLUMNS = (
+    ('student_id', 'student_id', 'string'),
+    ('student_name', 'student__name', 'string'),
+    ('roll_number', 'student__roll_number', 'string'),
+    ('course_id', 'exam__course_id', 'string'),
+    ('course_name', 'exam__course__name', 'string'),
+    ('semester', 'exam__semester', 'string'),
+    ('exam_type', 'exam__exam_type__name', 'string'),
+    ('exam_name', 'exam__name', 'string'),
+    ('exam_date', 'exam__date', 'date'),
+    ('marks_obtained', 'marks_obtained', 'decimal'),
+    ('max_marks', 'exam__max_marks', 'decimal'),
+    ('percentage', 'percentage', 'decimal'),
+    ('grade', 'grade', 'string'),
+    ('uploaded_at', 'created_at', 'timestamp'),
+)
+
+
+class ExportError(ValueError):
+    """Invalid export options; the message is safe to show to the user"""
+
+
+def parquet_available():
+    return pq is not None
+
+
+def columns_for(dataset):
+    return ATTENDANCE_COLUMNS if dataset == 'attendance' else MARKS_COLUMNS
+
+
+def export_queryset(dataset, date_from=None, date_to=None, course_id=None, semester=None):
+    """
+    ``values_list`` queryset of ``dataset`` rows in export column order.
+
+    Attendance is filtered on its date; marks on the exam date, or the
+    upload date for exams without one. Only marks carry a semester.
+    """
+    if dataset not in DATASETS:
+        raise ExportError(f"dataset must be one of: {', '.join(DATASETS)}")
+
+    if dataset == 'attendance':
+        if semester:
+            raise ExportError('Attendance has no semester; filter it with from/to instead')
+        queryset = Attendance.objects.all()
+        if date_from:
+            queryset = queryset.filter(date__gte=date_from)
+        if date_to:
+            queryset = queryset.filter(date__lte=date_to)
+        if course_id:
+            queryset = queryset.filter(course_id=course_id)
+        queryset = queryset.order_by('date', 'id')
+    else:
+        queryset = Marks.objects.all()
+        if date_from:
+            queryset = queryset.filter(
+                Q(exam__date__gte=date_from) | Q(exam__date__isnull=True, created_at__date__gte=date_from)
+            )
+        if date_to:
+            queryset = queryset.filter(
+                Q(exam__date__lte=date_to) | Q(exam__date__isnull=True, created_at__date__lte=date_to)
+            )
+        if course_id:
+            queryset = queryset.filter(exam__course_id=course_id)
+        if semester:
+            queryset = queryset.filter(exam__semester=semester)
+        queryset = queryset.order_by('exam_id', 'student_id')
+
+    return queryset.values_list(*(lookup for _, lookup, _ in columns_for(dataset)))
+
+
+def _csv_value(value):
+    if isinstance(value, (date, datetime, time)):
+        return value.isoformat()
+    return value
+
+
+def iter_csv(dataset, queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield the CSV file as byte chunks of about ``chunk_size`` rows"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([header for header, _, _ in columns_for(dataset)])
+    count = 0
+    for row in queryset.iterator(chunk_size=chunk_size):
+        writer.writerow([_csv_value(value) for value in row])
+        count += 1
+        if count % chunk_size == 0:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode()
+
+
+class _Drain(io.RawIOBase):
+    """Write-only sink whose bytes are handed out after each row group"""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def take(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def _parquet_schema(dataset):
+    types = {
+        'string': pa.string(),
+        'date': pa.date32(),
+        'time': pa.time64('us'),
+        'timestamp': pa.timestamp('us', tz='UTC'),
+        'decimal': pa.decimal128(8, 2),
+    }
+    return pa.schema([(header, types[kind]) for header, _, kind in columns_for(dataset)])
+
+
+def _table(schema, rows):
+    return pa.Table.from_pylist([dict(zip(schema.names, row)) for row in rows], schema=schema)
+
+
+def iter_parquet(dataset, queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield a Parquet file as byte chunks, one row group per ``chunk_size`` rows"""
+    schema = _parquet_schema(dataset)
+    sink = _Drain()
+    writer = pq.ParquetWriter(sink, schema)
+    try:
+        batch = []
+        for row in queryset.iterator(chunk_size=chunk_size):
+            batch.append(row)
+            if len(batch) == chunk_size:
+                writer.write_table(_table(schema, batch))
+                batch = []
+                yield sink.take()
+        if batch:
+            writer.write_table(_table(schema, batch))
+    finally:
+        writer.close()
+    yield sink.take()
+
+
+def iter_export(dataset, file_format, queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """Byte chunks of ``queryset`` (from ``export_queryset``) in ``file_format``"""
+    if file_format not in FORMATS:
+        raise ExportError(f"format must be one of: {', '.join(FORMATS)}")
+    if file_format == 'parquet':
+        if not parquet_available():
+            raise ExportError('Parquet export needs pyarrow; install it or use format=csv')
+        return iter_parquet(dataset, queryset, chunk_size)
+    return iter_csv(dataset, queryset, chunk_size)
@@ -0,0 +1,207 @@
+"""
+Fast serialization path for the large attendance and marks payloads.
+
+Rows are read with ``.values()`` (only the needed columns, joined in SQL)
+and turned into dicts by a row function built once per field set, so no
+model instances or DRF fields are built per row. The output is the same
+JSON as ``AttendanceSerializer`` and the dicts ``get_marks`` /
+``get_course_marks`` used to build by hand; ``api/tests.py`` checks this.
+"""
+from functools import lru_cache
+from operator import itemgetter
+
+from django.conf import settings
+from django.db.models import QuerySet
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
+
+
+def _date(value):
+    return value.isoformat() if value is not None else None
+
+
+def _time(value):
+    return value.isoformat() if value is not None else None
+
+
+def _datetime_in(tz):
+    """ISO 8601 datetimes converted to ``tz``, as DRF's DateTimeField renders them"""
+    def to_iso(value):
+        if value is None:
+            return None
+        if tz is not None and value.tzinfo is not None:
+            value = value.astimezone(tz)
+        value = value.isoformat()
+        if value.endswith('+00:00'):
+            value = value[:-6] + 'Z'
+        return value
+    return to_iso
+
+
+def _float(value):
+    return float(value)
+
+
+def _float_or_zero(value):
+    return float(value) if value is not None else 0
+
+
+def _formatters(tz):
+    """Date/time/datetime converters; DRF's own fields when a custom format is set"""
+    date_format = _date
+    time_format = _time
+    datetime_format = _datetime_in(tz)
+    if api_settings.DATE_FORMAT != ISO_8601:
+        date_format = serializers.DateField().to_representation
+    if api_settings.TIME_FORMAT != ISO_8601:
+        time_format = serializers.TimeField().to_representation
+    if api_settings.DATETIME_FORMAT != ISO_8601:
+        datetime_format = serializers.DateTimeField().to_representation
+    return date_format, time_format, datetime_format
+
+
+def _attendance_columns(tz):
+    date_format, time_format, datetime_format = _formatters(tz)
+    # Same order as AttendanceSerializer.Meta.fields: (output key, lookup, converter)
+    return (
+        ('id', 'id', None),
+        ('student', 'student_id', None),
+        ('student_name', 'student__name', None),
+        ('student_roll', 'student__roll_number', None),
+        ('course', 'course_id', None),
+        ('course_name', 'course__name', None),
+        ('date', 'date', date_format),
+        ('status', 'status', None),
+        ('marked_at', 'marked_at', time_format),
+        ('created_at', 'created_at', datetime_format),
+    )
+
+
+STUDENT_MARKS_COLUMNS = (
+    ('id', 'id', None),
+    ('course_id', 'exam__course_id', None),
+    ('course_name', 'exam__course__name', None),
+    ('exam_type', 'exam__exam_type__name', None),
+    ('marks_obtained', 'marks_obtained', _float),
+    ('max_marks', 'exam__max_marks', _float),
+    ('percentage', 'percentage', _float_or_zero),
+    ('grade', 'grade', None),
+)
+
+COURSE_MARKS_COLUMNS = (
+    ('student_id', 'student_id', None),
+    ('student_name', 'student__name', None),
+    ('roll_number', 'student__roll_number', None),
+    ('marks_obtained', 'marks_obtained', _float),
+    ('max_marks', 'exam__max_marks', _float),
+    ('percentage', 'percentage', _float_or_zero),
+    ('grade', 'grade', None),
+)
+
+
+def compile_row(columns, omit_if_null=()):
+    """
+    Build ``values() row -> response dict`` for ``(key, lookup, converter)``
+    columns. One ``itemgetter`` call reads every column, then only the
+    columns with a converter are touched again. Keys in ``omit_if_null`` are
+    dropped when their value is None, like a DRF field with
+    ``required=False`` whose source is missing.
+    """
+    keys = tuple(key for key, _, _ in columns)
+    lookups = tuple(lookup for _, lookup, _ in columns)
+    converters = tuple((key, convert) for key, _, convert in columns if convert is not None)
+    omitted = tuple((key, lookup) for key, lookup, _ in columns if key in omit_if_null)
+    def fetch(row):
+        return tuple(row[lookup] for lookup in lookups)
+
+    # itemgetter returns a bare value for a single key, and needs at least one
+    if len(lookups) > 1:
+        fetch = itemgetter(*lookups)
+
+    def to_dict(row):
+        out = dict(zip(keys, fetch(row)))
+        for key, convert in converters:
+            out[key] = convert(out[key])
+        for key, lookup in omitted:
+            if row[lookup] is None:
+                del out[key]
+        return out
+    return to_dict
+
+
+def _attendance_plan(fields):
+    # Resolved once per call rather than per row; the active zone can change per request
+    tz = timezone.get_current_timezone() if settings.USE_TZ else None
+    return _compiled_attendance_plan(tuple(fields) if fields is not None else None, tz)
+
+
+@lru_cache(maxsize=64)
+def _compiled_attendance_plan(fields, tz):
+    columns = _attendance_columns(tz)
+    if fields is not None:
+        columns = tuple(column for column in columns if column[0] in fields)
+    # course_name is required=False on the serializer, so it is left out without a course
+    return tuple(lookup for _, lookup, _ in columns), compile_row(columns, omit_if_null=('course_name',))
+
+
+def attendance_values(queryset, fields=None):
+    """
+    ``queryset`` as a ``values()`` queryset of the columns
+    ``attendance_rows`` needs; paginate this one, not the model queryset.
+    """
+    lookups, _ = _attendance_plan(fields)
+    # Keyset pagination reads its ordering keys from the row dicts
+    return queryset.values(*dict.fromkeys(lookups + ('id', 'date')))
+
+
+def attendance_rows(rows, fields=None):
+    """
+    AttendanceSerializer output for ``rows``: an Attendance queryset, or
+    rows already taken from ``attendance_values``.
+    """
+    lookups, to_dict = _attendance_plan(fields)
+    if isinstance(rows, QuerySet):
+        rows = rows.values(*lookups)
+    return [to_dict(row) for row in rows]
+
+
+async def aattendance_rows(queryset, fields=None):
+    """Async version of ``attendance_rows`` for an Attendance queryset"""
+    lookups, to_dict = _attendance_plan(fields)
+    return [to_dict(row) async for row in queryset.values(*lookups).aiterator()]
+
+
+def iter_attendance_rows(queryset, fields=None, chunk_size=2000):
+    """
+    Generator version of ``attendance_rows`` for an Attendance queryset,
+    fetching ``chunk_size`` rows at a time so memory does not grow with it.
+    """
+    # Planned now, not on first next(), while the request's timezone is active
+    lookups, to_dict = _attendance_plan(fields)
+    return map(to_dict, queryset.values(*lookups).iterator(chunk_size=chunk_size))
+
+
+_student_marks_row = compile_row(STUDENT_MARKS_COLUMNS)
+_course_marks_row = compile_row(COURSE_MARKS_COLUMNS)
+
+
+def student_marks_rows(queryset):
+    """Rows of ``get_marks`` for a Marks queryset"""
+    lookups = [lookup for _, lookup, _ in STUDENT_MARKS_COLUMNS]
+    return [_student_marks_row(row) for row in queryset.values(*lookups)]
+
+
+async def astudent_marks_rows(queryset):
+    """Async version of ``student_marks_rows``"""
+    lookups = [lookup for _, lookup, _ in STUDENT_MARKS_COLUMNS]
+    return [_student_marks_row(row) async for row in queryset.values(*lookups).aiterator()]
+
+
+def course_marks_by_exam(queryset):
+    """``get_course_marks`` rows grouped by exam type name, in queryset order"""
+    lookups = [lookup for _, lookup, _ in COURSE_MARKS_COLUMNS] + ['exam__exam_type__name']
+    grouped = {}
+    for row in queryset.values(*lookups):
+        grouped.setdefault(row['exam__exam_type__name'], []).append(_course_marks_row(row))
+    return grouped
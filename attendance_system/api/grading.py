@@ -0,0 +1,205 @@
+"""
+Grading: letter grades for marks, weighted course totals and GPA.
+
+Grades come from ``settings.GRADING_SCALE`` (minimum percentage -> grade),
+looked up by bisection over the thresholds. ``grade_marks`` grades whole
+arrays of marks at once (with NumPy when it is installed) for the bulk
+write paths and ``regrade_exam``.
+
+A student's total in a course (per semester) is the mean of their exam
+percentages weighted by ``ExamType.weightage``, over the exams they sat; when
+none of those exam types carries a weightage it is the plain mean. The total
+maps to a letter grade and grade point as for a single mark, and GPAs are
+the ``Course.credits``-weighted mean of those grade points.
+
+The weighted sums are computed by the database in one grouped aggregate,
+for any number of students or courses at once; only the per-course rows
+(not individual marks) come back to Python.
+"""
+from bisect import bisect_right
+from collections import defaultdict
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Avg, Count, F, Sum
+from django.utils import timezone
+
+from .cache import MARKS_VIEWS, invalidate_courses, invalidate_exams, invalidate_students
+from .models import Marks
+
+try:
+    import numpy as np
+except ImportError:  # grade_marks falls back to bisect
+    np = None
+
+DEFAULT_GRADING_SCALE = (
+    (90, 'A+'), (85, 'A'), (80, 'A-'),
+    (75, 'B+'), (70, 'B'), (65, 'B-'),
+    (60, 'C+'), (55, 'C'), (50, 'C-'),
+    (40, 'D'), (0, 'F'),
+)
+TWO_PLACES = Decimal('0.01')
+
+
+def grading_scale():
+    """``(thresholds, grades)`` in ascending order; ``grades[i]`` starts at ``thresholds[i]``"""
+    scale = sorted(getattr(settings, 'GRADING_SCALE', DEFAULT_GRADING_SCALE), key=lambda step: step[0])
+    return [float(minimum) for minimum, _ in scale], [grade for _, grade in scale]
+
+
+def _grade_index(thresholds, percentage):
+    return max(bisect_right(thresholds, float(percentage)) - 1, 0)
+
+
+def grade_for(percentage):
+    """Letter grade for one percentage (the lowest grade for None)"""
+    thresholds, grades = grading_scale()
+    if percentage is None:
+        return grades[0]
+    return grades[_grade_index(thresholds, percentage)]
+
+
+def grade_marks(marks_obtained, max_marks):
+    """
+    Percentages and grades for a sequence of Decimal marks.
+
+    ``max_marks`` is one value for every mark or a parallel sequence.
+    Percentages are Decimals rounded to two places, as stored on Marks;
+    grades are taken from the unrounded percentage. A mark whose max is 0
+    gets (None, None).
+    """
+    maxima = max_marks if isinstance(max_marks, (list, tuple)) else [max_marks] * len(marks_obtained)
+    raw = [(obtained / maximum) * 100 if maximum else None for obtained, maximum in zip(marks_obtained, maxima)]
+
+    thresholds, grades = grading_scale()
+    graded = [value for value in raw if value is not None]
+    if np is not None and graded:
+        indexes = np.searchsorted(np.asarray(thresholds), np.asarray(graded, dtype=float), side='right') - 1
+        indexes = np.maximum(indexes, 0).tolist()
+    else:
+        indexes = [_grade_index(thresholds, value) for value in graded]
+    letters = iter([grades[index] for index in indexes])
+
+    return (
+        [value.quantize(TWO_PLACES) if value is not None else None for value in raw],
+        [next(letters) if value is not None else None for value in raw],
+    )
+
+
+def regrade_exam(exam, batch_size=1000):
+    """
+    Recompute percentage and grade of every mark of ``exam`` against its
+    current max_marks and the grading scale, in one ``bulk_update``.
+    Returns the number of marks written.
+    """
+    marks = list(exam.student_marks.order_by().only('id', 'student_id', 'marks_obtained'))
+    if not marks:
+        return 0
+    percentages, grades = grade_marks([mark.marks_obtained for mark in marks], exam.max_marks)
+    now = timezone.now()
+    for mark, percentage, grade in zip(marks, percentages, grades):
+        mark.percentage = percentage
+        mark.grade = grade
+        mark.updated_at = now
+
+    with transaction.atomic():
+        Marks.objects.bulk_update(marks, ['percentage', 'grade', 'updated_at'], batch_size=batch_size)
+        invalidate_students([mark.student_id for mark in marks], MARKS_VIEWS)
+        invalidate_courses([exam.course_id])
+        invalidate_exams([exam.pk])
+    return len(marks)
+
+
+def course_totals(**filters):
+    """
+    One row per (student, course, semester) among the Marks matching
+    ``filters``, with the weighted ``total``, its ``grade`` and
+    ``grade_point``, the course ``credits`` and the number of ``exams``.
+    """
+    rows = (
+        Marks.objects.filter(percentage__isnull=False, **filters)
+        .order_by()
+        .values(
+            'student_id', 'student__name', 'student__roll_number',
+            'exam__course_id', 'exam__course__name', 'exam__course__credits', 'exam__semester',
+        )
+        .annotate(
+            weighted=Sum(F('percentage') * F('exam__exam_type__weightage')),
+            weight=Sum('exam__exam_type__weightage'),
+            mean=Avg('percentage'),
+            exams=Count('id'),
+        )
+        .order_by('exam__semester', 'exam__course_id', 'student__roll_number', 'student_id')
+    )
+    return [_total_row(row) for row in rows]
+
+
+def _total_row(row):
+    if row['weight']:
+        total = float(row['weighted']) / float(row['weight'])
+    else:
+        total = float(row['mean'])
+    grade = grade_for(total)
+    return {
+        'student_id': row['student_id'],
+        'student_name': row['student__name'],
+        'roll_number': row['student__roll_number'],
+        'course_id': row['exam__course_id'],
+        'course_name': row['exam__course__name'],
+        'credits': row['exam__course__credits'],
+        'semester': row['exam__semester'],
+        'total': round(total, 2),
+        'grade': grade,
+        'grade_point': Marks.GRADE_POINTS.get(grade, 0.0),
+        'exams': row['exams'],
+    }
+
+
+def gpa(rows):
+    """Credit-weighted mean grade point of ``course_totals`` rows (0 without credits)"""
+    credits = sum(row['credits'] for row in rows)
+    if not credits:
+        return 0
+    return round(sum(row['grade_point'] * row['credits'] for row in rows) / credits, 2)
+
+
+def student_gpa(student_id):
+    """Per-semester GPA (with its course totals) and cumulative GPA of one student"""
+    by_semester = defaultdict(list)
+    for row in course_totals(student_id=student_id):
+        by_semester[row['semester']].append(row)
+
+    semesters = [
+        {
+            'semester': semester,
+            'gpa': gpa(rows),
+            'credits': sum(row['credits'] for row in rows),
+            'courses': [_course_entry(row) for row in rows],
+        }
+        for semester, rows in by_semester.items()
+    ]
+    every_course = [row for rows in by_semester.values() for row in rows]
+    return {
+        'cgpa': gpa(every_course),
+        'total_credits': sum(row['credits'] for row in every_course),
+        'semesters': semesters,
+    }
+
+
+def _course_entry(row):
+    return {key: row[key] for key in ('course_id', 'course_name', 'credits', 'total', 'grade', 'grade_point', 'exams')}
+
+
+def course_results(course_id, semester=None):
+    """Every student's weighted total in one course, with the class average"""
+    filters = {'exam__course_id': course_id}
+    if semester:
+        filters['exam__semester'] = semester
+    results = [
+        {key: row[key] for key in ('student_id', 'student_name', 'roll_number', 'semester',
+                                   'total', 'grade', 'grade_point', 'exams')}
+        for row in course_totals(**filters)
+    ]
+    average = round(sum(row['total'] for row in results) / len(results), 2) if results else 0
+    return {'average': average, 'results': results}
@@ -0,0 +1,66 @@
+import sys
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from api.models import Course
+from api.export import DATASETS, EXPORT_CHUNK_SIZE, FORMATS, ExportError, export_queryset, iter_export
+
+
+class Command(BaseCommand):
+    help = 'Export attendance or marks (joined with student/course/exam) to CSV or Parquet, in chunks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=DATASETS)
+        parser.add_argument('--output', '-o', required=True, help="File to write, or '-' for stdout (CSV only)")
+        parser.add_argument('--format', choices=FORMATS,
+                            help='Output format (defaults to the --output extension, else csv)')
+        parser.add_argument('--from', dest='date_from', help='First date to include (YYYY-MM-DD)')
+        parser.add_argument('--to', dest='date_to', help='Last date to include (YYYY-MM-DD)')
+        parser.add_argument('--course', help='Only this course id')
+        parser.add_argument('--semester', help='Only exams of this semester (marks only)')
+        parser.add_argument('--chunk-size', type=int, default=EXPORT_CHUNK_SIZE,
+                            help=f'Rows fetched and written per chunk (default {EXPORT_CHUNK_SIZE})')
+
+    def handle(self, *args, **options):
+        output = options['output']
+        file_format = options['format'] or ('parquet' if output.endswith('.parquet') else 'csv')
+        if options['chunk_size'] <= 0:
+            raise CommandError('--chunk-size must be a positive integer')
+        if output == '-' and file_format != 'csv':
+            raise CommandError('Only CSV can be written to stdout')
+        if options['course'] and not Course.objects.filter(id=options['course']).exists():
+            raise CommandError(f"Course {options['course']} not found")
+
+        try:
+            date_from = date.fromisoformat(options['date_from']) if options['date_from'] else None
+            date_to = date.fromisoformat(options['date_to']) if options['date_to'] else None
+        except ValueError:
+            raise CommandError('--from/--to must be YYYY-MM-DD')
+
+        try:
+            queryset = export_queryset(
+                options['dataset'], date_from, date_to, options['course'], options['semester']
+            )
+            chunks = iter_export(options['dataset'], file_format, queryset, options['chunk_size'])
+        except ExportError as e:
+            raise CommandError(str(e))
+
+        if output == '-':
+            self._write(sys.stdout.buffer, chunks)
+            return
+        try:
+            with open(output, 'wb') as handle:
+                written = self._write(handle, chunks)
+        except OSError as e:
+            raise CommandError(f'Cannot write {output}: {e}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Exported {options['dataset']} to {output} ({file_format}, {written} bytes)"
+        ))
+
+    def _write(self, handle, chunks):
+        written = 0
+        for chunk in chunks:
+            handle.write(chunk)
+            written += len(chunk)
+        return written
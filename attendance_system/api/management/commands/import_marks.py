@@ -0,0 +1,58 @@
+from django.core.management.base import BaseCommand, CommandError
+from api.models import Course
+from api.marks_import import DEFAULT_CHUNK_SIZE, MarksImportError, import_marks, iter_rows
+
+
+class Command(BaseCommand):
+    help = 'Import marks for one course/exam type from a CSV or XLSX file, in chunks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or XLSX file with student_id, marks_obtained[, max_marks] columns')
+        parser.add_argument('--course', required=True, help='Course id, e.g. CS201')
+        parser.add_argument('--exam-type', required=True, help='Exam type, e.g. midterm')
+        parser.add_argument('--max-marks', help='Maximum marks (defaults to the first row, or 100)')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                            help=f'Rows written per batch (default {DEFAULT_CHUNK_SIZE})')
+        parser.add_argument('--format', choices=['csv', 'xlsx'],
+                            help='File format (defaults to the file extension)')
+
+    def handle(self, *args, **options):
+        try:
+            course = Course.objects.get(id=options['course'])
+        except Course.DoesNotExist:
+            raise CommandError(f"Course {options['course']} not found")
+        if options['chunk_size'] <= 0:
+            raise CommandError('--chunk-size must be a positive integer')
+
+        def report(summary):
+            self.stdout.write(
+                f"Processed {summary['processed']} rows "
+                f"(created {summary['created']}, updated {summary['updated']}, rejected {summary['rejected']})"
+            )
+
+        try:
+            with open(options['path'], 'rb') as handle:
+                summary = import_marks(
+                    course,
+                    options['exam_type'],
+                    iter_rows(handle, options['path'], options['format']),
+                    max_marks=options['max_marks'],
+                    chunk_size=options['chunk_size'],
+                    progress=report,
+                )
+        except OSError as e:
+            raise CommandError(f'Cannot read {options["path"]}: {e}')
+        except MarksImportError as e:
+            raise CommandError(str(e))
+
+        for error in summary['errors']:
+            self.stdout.write(self.style.WARNING(
+                f"Line {error['line']} ({error['student_id']}): {error['reason']}"
+            ))
+        if summary['errors_truncated']:
+            self.stdout.write(self.style.WARNING('... more rejected lines not shown'))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported marks: created {summary['created']}, updated {summary['updated']}, "
+            f"rejected {summary['rejected']}"
+        ))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from api.stats import rebuild_attendance_stats
+
+
+class Command(BaseCommand):
+    help = 'Recompute the denormalized per-student attendance counters from the Attendance table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Counter rows inserted per query (default 1000)')
+
+    def handle(self, *args, **options):
+        count = rebuild_attendance_stats(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {count} attendance counter rows'))
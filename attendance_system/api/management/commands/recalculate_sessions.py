@@ -0,0 +1,37 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from api.models import AttendanceSession, Course
+
+
+class Command(BaseCommand):
+    help = 'Recompute AttendanceSession total/present/absent counts from the Attendance table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='date_from', help='First session date to include (YYYY-MM-DD)')
+        parser.add_argument('--to', dest='date_to', help='Last session date to include (YYYY-MM-DD)')
+        parser.add_argument('--course', help='Only sessions of this course id')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Sessions updated per query (default 1000)')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] <= 0:
+            raise CommandError('--batch-size must be a positive integer')
+        if options['course'] and not Course.objects.filter(id=options['course']).exists():
+            raise CommandError(f"Course {options['course']} not found")
+        try:
+            date_from = date.fromisoformat(options['date_from']) if options['date_from'] else None
+            date_to = date.fromisoformat(options['date_to']) if options['date_to'] else None
+        except ValueError:
+            raise CommandError('--from/--to must be YYYY-MM-DD')
+
+        sessions = AttendanceSession.objects.all()
+        if date_from:
+            sessions = sessions.filter(date__gte=date_from)
+        if date_to:
+            sessions = sessions.filter(date__lte=date_to)
+        if options['course']:
+            sessions = sessions.filter(course_id=options['course'])
+
+        count = sessions.recalculate_stats(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Recalculated stats for {count} sessions'))
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+from api.models import Course, Exam
+from api.grading import regrade_exam
+
+
+class Command(BaseCommand):
+    help = 'Recompute percentage and grade of every mark of the given exams (e.g. after a GRADING_SCALE change)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('exam_ids', nargs='*', type=int, help='Exam ids to regrade')
+        parser.add_argument('--course', help='Regrade every exam of this course id')
+        parser.add_argument('--all', action='store_true', help='Regrade every exam')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Marks updated per query (default 1000)')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] <= 0:
+            raise CommandError('--batch-size must be a positive integer')
+        if not (options['exam_ids'] or options['course'] or options['all']):
+            raise CommandError('Give exam ids, --course or --all')
+
+        exams = Exam.objects.all()
+        if options['course']:
+            if not Course.objects.filter(id=options['course']).exists():
+                raise CommandError(f"Course {options['course']} not found")
+            exams = exams.filter(course_id=options['course'])
+        if options['exam_ids']:
+            exams = exams.filter(id__in=options['exam_ids'])
+            missing = set(options['exam_ids']) - set(exams.values_list('id', flat=True))
+            if missing:
+                raise CommandError(f"Exam(s) not found: {', '.join(map(str, sorted(missing)))}")
+
+        total = 0
+        for exam in exams.select_related('course', 'exam_type'):
+            count = regrade_exam(exam, batch_size=options['batch_size'])
+            total += count
+            if options['verbosity'] > 1:
+                self.stdout.write(f'{exam}: {count} marks')
+        self.stdout.write(self.style.SUCCESS(f'Regraded {total} marks'))
@@ -0,0 +1,140 @@
+import random
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from api.models import Student, Course, Attendance, AttendanceSession, ExamType, Exam, Marks
+from api.stats import rebuild_attendance_stats
+
+STUDENT_PREFIX = 'B-'
+COURSE_PREFIX = 'BC'
+EXAM_TYPES = [('Midterm', 30), ('Final', 50), ('Assignment', 10), ('Quiz', 10)]
+
+
+class Command(BaseCommand):
+    help = 'Generate benchmark data at a configurable scale using bulk inserts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=1000)
+        parser.add_argument('--courses', type=int, default=5)
+        parser.add_argument('--days', type=int, default=200,
+                            help='Days of attendance per course (one row per student per course per day)')
+        parser.add_argument('--exams', type=int, default=3,
+                            help=f'Exams per course (max {len(EXAM_TYPES)})')
+        parser.add_argument('--start-date', default='2024-01-01', help='First attendance day (YYYY-MM-DD)')
+        parser.add_argument('--present-rate', type=float, default=0.8)
+        parser.add_argument('--batch-size', type=int, default=20000)
+        parser.add_argument('--seed', type=int, default=42, help='Random seed, for reproducible data')
+        parser.add_argument('--clear', action='store_true', help='Delete previously generated benchmark data first')
+
+    def handle(self, *args, **options):
+        if not 0 <= options['exams'] <= len(EXAM_TYPES):
+            raise CommandError(f'--exams must be between 0 and {len(EXAM_TYPES)}')
+        try:
+            start = date.fromisoformat(options['start_date'])
+        except ValueError:
+            raise CommandError('--start-date must be YYYY-MM-DD')
+
+        self.verbosity = options['verbosity']
+        rng = random.Random(options['seed'])
+        batch_size = options['batch_size']
+
+        if options['clear']:
+            Student.objects.filter(id__startswith=STUDENT_PREFIX).delete()
+            Course.objects.filter(id__startswith=COURSE_PREFIX).delete()
+
+        student_ids = [f'{STUDENT_PREFIX}{i:06d}' for i in range(options['students'])]
+        course_ids = [f'{COURSE_PREFIX}{i:03d}' for i in range(options['courses'])]
+        if Student.objects.filter(id__in=student_ids[:1]).exists():
+            raise CommandError('Benchmark data already exists; use --clear to regenerate it')
+
+        with transaction.atomic():
+            Student.objects.bulk_create(
+                [Student(id=sid, name=f'Bench Student {i}', roll_number=f'{i:06d}')
+                 for i, sid in enumerate(student_ids)],
+                batch_size=batch_size,
+            )
+            Course.objects.bulk_create(
+                [Course(id=cid, name=f'Bench Course {i}', code=cid) for i, cid in enumerate(course_ids)]
+            )
+            self._progress(f'Created {len(student_ids)} students and {len(course_ids)} courses')
+
+            attendance_count = self._seed_attendance(
+                student_ids, course_ids, start, options['days'], options['present_rate'], rng, batch_size
+            )
+            self._progress(f'Created {attendance_count} attendance records')
+
+            marks_count = self._seed_marks(student_ids, course_ids, options['exams'], rng, batch_size)
+            self._progress(f'Created {marks_count} marks')
+
+            rebuild_attendance_stats()
+
+        if self.verbosity:
+            self.stdout.write(self.style.SUCCESS('Successfully generated benchmark data'))
+
+    def _progress(self, message):
+        if self.verbosity:
+            self.stdout.write(message)
+
+    def _seed_attendance(self, student_ids, course_ids, start, days, present_rate, rng, batch_size):
+        batch = []
+        sessions = []
+        count = 0
+        for day in range(days):
+            current = start + timedelta(days=day)
+            for course_id in course_ids:
+                present = 0
+                for student_id in student_ids:
+                    status = 'P' if rng.random() < present_rate else 'A'
+                    present += status == 'P'
+                    batch.append(Attendance(
+                        student_id=student_id,
+                        course_id=course_id,
+                        date=current,
+                        status=status,
+                    ))
+                    if len(batch) >= batch_size:
+                        Attendance.objects.bulk_create(batch)
+                        count += len(batch)
+                        batch = []
+                sessions.append(AttendanceSession(
+                    course_id=course_id,
+                    date=current,
+                    total_students=len(student_ids),
+                    present_count=present,
+                    absent_count=len(student_ids) - present,
+                ))
+            if days >= 10 and (day + 1) % (days // 10) == 0:
+                self._progress(f'  attendance: {day + 1}/{days} days')
+        Attendance.objects.bulk_create(batch)
+        AttendanceSession.objects.bulk_create(sessions, batch_size=batch_size)
+        return count + len(batch)
+
+    def _seed_marks(self, student_ids, course_ids, exams, rng, batch_size):
+        exam_types = [
+            ExamType.objects.get_or_create(name=name, defaults={'weightage': weight})[0]
+            for name, weight in EXAM_TYPES[:exams]
+        ]
+        exam_rows = Exam.objects.bulk_create([
+            Exam(course_id=course_id, exam_type=exam_type, name=f'{exam_type.name} - {course_id}', max_marks=100)
+            for course_id in course_ids for exam_type in exam_types
+        ])
+
+        batch = []
+        count = 0
+        for exam in exam_rows:
+            for student_id in student_ids:
+                score = round(min(100, max(0, rng.gauss(68, 15))), 2)
+                batch.append(Marks(
+                    student_id=student_id,
+                    exam=exam,
+                    marks_obtained=score,
+                    percentage=score,
+                    grade=Marks.grade_for_percentage(score),
+                ))
+                if len(batch) >= batch_size:
+                    Marks.objects.bulk_create(batch)
+                    count += len(batch)
+                    batch = []
+        Marks.objects.bulk_create(batch)
+        return count + len(batch)
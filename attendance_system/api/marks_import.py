@@ -0,0 +1,162 @@
+"""
+Streaming import of marks spreadsheets (CSV, and XLSX when openpyxl is installed).
+
+Rows are read lazily and written in fixed-size chunks through
+``bulk.write_marks``, so memory use depends on the chunk size rather than
+on the size of the file. Each chunk is its own transaction: if the file
+turns out to be unreadable partway (text that is not UTF-8, say), the
+chunks before it stay imported and the ``MarksImportError`` carries their
+summary. A student id is accepted once per file; later rows for it are
+rejected as duplicates, whichever chunk they fall in.
+
+Expected columns (header row, case-insensitive): ``student_id``,
+``marks_obtained`` and optionally ``max_marks``.
+"""
+import csv
+import io
+import logging
+from itertools import islice
+
+from .bulk import prepare_exam, write_marks, to_decimal
+
+try:
+    import openpyxl
+except ImportError:  # XLSX support is optional
+    openpyxl = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 500
+MAX_REPORTED_ERRORS = 1000
+REQUIRED_COLUMNS = ('student_id', 'marks_obtained')
+
+
+class MarksImportError(ValueError):
+    """
+    Raised when a file cannot be imported (bad format or header) or stops
+    partway; ``summary`` then holds the counts of the chunks already written
+    """
+
+    def __init__(self, message, summary=None):
+        super().__init__(message)
+        self.summary = summary
+
+
+def _check_header(header):
+    columns = [str(name).strip().lower() if name is not None else '' for name in header]
+    missing = [name for name in REQUIRED_COLUMNS if name not in columns]
+    if missing:
+        raise MarksImportError(f"Missing required column(s): {', '.join(missing)}")
+    return columns
+
+
+def iter_csv_rows(text_file):
+    """Yield ``(line_number, record)`` pairs from a text-mode CSV file"""
+    reader = csv.reader(text_file)
+    try:
+        header = next(reader, None)
+        if header is None:
+            raise MarksImportError('File is empty')
+        columns = _check_header(header)
+        for row in reader:
+            if not any(cell.strip() for cell in row):
+                continue
+            yield reader.line_num, dict(zip(columns, row))
+    except UnicodeDecodeError:
+        # Text is decoded in blocks, so the bad byte is at or after this line
+        raise MarksImportError(
+            f'The file is not UTF-8 text (near line {reader.line_num + 1}); save it as "CSV UTF-8"'
+        )
+
+
+def iter_xlsx_rows(binary_file):
+    """Yield ``(line_number, record)`` pairs from the first sheet of an XLSX workbook"""
+    if openpyxl is None:
+        raise MarksImportError('XLSX import requires openpyxl (pip install openpyxl)')
+    workbook = openpyxl.load_workbook(binary_file, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            raise MarksImportError('File is empty')
+        columns = _check_header(header)
+        for line_number, row in enumerate(rows, start=2):
+            if all(cell is None or str(cell).strip() == '' for cell in row):
+                continue
+            yield line_number, dict(zip(columns, row))
+    finally:
+        workbook.close()
+
+
+def iter_rows(binary_file, filename='', file_format=None):
+    """Pick the CSV or XLSX reader from ``file_format`` or the file extension"""
+    file_format = (file_format or filename.rsplit('.', 1)[-1]).lower()
+    if file_format == 'xlsx':
+        return iter_xlsx_rows(binary_file)
+    if file_format in ('csv', 'txt', ''):
+        return iter_csv_rows(io.TextIOWrapper(binary_file, encoding='utf-8-sig', newline=''))
+    raise MarksImportError(f'Unsupported file format: {file_format}')
+
+
+def import_marks(course, exam_type, rows, max_marks=None, uploaded_by=None,
+                 chunk_size=DEFAULT_CHUNK_SIZE, progress=None):
+    """
+    Write ``(line_number, record)`` rows for one course/exam type in chunks.
+
+    ``max_marks`` defaults to the first row's ``max_marks`` column (or 100);
+    the Exam row is written at most once. ``progress`` is called with the
+    running summary after every chunk. A MarksImportError raised while
+    reading a later chunk is re-raised with the summary so far.
+
+    Returns a summary dict with counts and the per-line errors (capped at
+    ``MAX_REPORTED_ERRORS``).
+    """
+    rows = iter(rows)
+    chunk = list(islice(rows, chunk_size))
+
+    if max_marks in (None, ''):
+        max_marks = next(
+            (record.get('max_marks') for _, record in chunk if record.get('max_marks') not in (None, '')),
+            100
+        )
+    max_marks = to_decimal(max_marks)
+    if max_marks is None or max_marks <= 0:
+        raise MarksImportError('max_marks must be a positive number')
+
+    exam = prepare_exam(course, exam_type, max_marks)
+    summary = {
+        'exam_id': exam.id,
+        'processed': 0,
+        'created': 0,
+        'updated': 0,
+        'rejected': 0,
+        'chunks': 0,
+        'errors': [],
+        'errors_truncated': False,
+    }
+    seen_ids = set()
+
+    while chunk:
+        results = write_marks(exam, [record for _, record in chunk], uploaded_by=uploaded_by, seen_ids=seen_ids)
+        for (line_number, _), result in zip(chunk, results):
+            result['row'] = line_number
+            summary[result['status']] += 1
+            if result['status'] == 'rejected':
+                if len(summary['errors']) < MAX_REPORTED_ERRORS:
+                    summary['errors'].append(
+                        {'line': line_number, 'student_id': result['student_id'], 'reason': result['reason']}
+                    )
+                else:
+                    summary['errors_truncated'] = True
+        summary['processed'] += len(chunk)
+        summary['chunks'] += 1
+        if progress:
+            progress(summary)
+        try:
+            chunk = list(islice(rows, chunk_size))
+        except MarksImportError as e:
+            raise MarksImportError(
+                f"{e}. The {summary['processed']} rows before it were imported", summary
+            ) from e
+
+    return summary
@@ -0,0 +1,250 @@
+"""
+Per-request timing and query metrics for the ``api`` views.
+
+``RequestMetricsMiddleware`` samples ``API_METRICS_SAMPLE_RATE`` of the
+requests. For each sampled request routed to an ``api`` view it records the
+wall time, the number of database queries and the time spent in them, the
+JSON rendering time and the response size. They are added to in-process
+histograms, labelled by view name, which ``/api/_metrics`` exposes in the
+Prometheus text format. Sampled responses also get a ``Server-Timing``
+header when ``API_METRICS_SERVER_TIMING`` is on, so the browser's dev tools
+show the breakdown.
+
+Queries are counted by one execute wrapper installed on every connection.
+It finds the request through a context variable, which ``sync_to_async``
+copies into its thread, so the async views' queries are counted too.
+Requests that are not sampled pay one ``random()`` call and one context
+variable lookup per query. A sample rate of 0 removes the middleware.
+"""
+import random
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from rest_framework.renderers import JSONRenderer
+
+_current = ContextVar('api_request_sample', default=None)
+_lock = threading.Lock()
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+RENDER_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50, 100)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+# name -> (help, buckets); observed per view in this order
+HISTOGRAMS = {
+    'api_request_duration_seconds': ('Wall time of api requests', DURATION_BUCKETS),
+    'api_request_db_seconds': ('Time api requests spent in database queries', DURATION_BUCKETS),
+    'api_request_queries': ('Database queries per api request', QUERY_BUCKETS),
+    'api_request_render_seconds': ('Time api requests spent rendering JSON', RENDER_BUCKETS),
+    'api_response_size_bytes': ('Size of api response bodies (streaming responses excluded)', SIZE_BUCKETS),
+}
+
+
+class Histogram:
+    """Cumulative Prometheus histogram: per-bucket counts, sum and count"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # the last one is +Inf
+        self.sum = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+
+_histograms = {name: {} for name in HISTOGRAMS}
+_responses = {}  # (view, status code) -> count
+
+
+class Sample:
+    __slots__ = ('start', 'queries', 'db', 'render')
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.queries = 0
+        self.db = 0.0
+        self.render = 0.0
+
+
+def sample_rate():
+    return getattr(settings, 'API_METRICS_SAMPLE_RATE', 1.0)
+
+
+def record_query(execute, sql, params, many, context):
+    """Connection execute wrapper adding each query to the current request's sample"""
+    sample = _current.get()
+    if sample is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        sample.queries += 1
+        sample.db += time.perf_counter() - start
+
+
+def _install_wrapper(connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def connect_signals():
+    """Install ``record_query`` on every connection (from AppConfig.ready, before any is opened)"""
+    if sample_rate() <= 0:
+        return
+    connection_created.connect(_install_wrapper, dispatch_uid='api-metrics-query-recorder')
+    for connection in connections.all(initialized_only=True):
+        _install_wrapper(connection)
+
+
+class TimedJSONRenderer(JSONRenderer):
+    """DRF's JSONRenderer, adding its time to the current request's sample"""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        sample = _current.get()
+        if sample is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        start = time.perf_counter()
+        try:
+            return super().render(data, accepted_media_type, renderer_context)
+        finally:
+            sample.render += time.perf_counter() - start
+
+
+def observe(view, status_code, duration, queries, db, render, size):
+    with _lock:
+        values = (duration, db, queries, render, size)
+        for name, value in zip(HISTOGRAMS, values):
+            if value is None:
+                continue
+            histogram = _histograms[name].get(view)
+            if histogram is None:
+                histogram = _histograms[name][view] = Histogram(HISTOGRAMS[name][1])
+            histogram.observe(value)
+        _responses[(view, status_code)] = _responses.get((view, status_code), 0) + 1
+
+
+def reset():
+    with _lock:
+        for views in _histograms.values():
+            views.clear()
+        _responses.clear()
+
+
+def _view_name(request):
+    match = request.resolver_match
+    if match is None or 'api' not in match.namespaces or match.url_name == 'metrics':
+        return None
+    return match.url_name
+
+
+def _server_timing(duration, sample):
+    return (
+        f'total;dur={duration * 1000:.1f}, '
+        f'db;dur={sample.db * 1000:.1f};desc="{sample.queries} queries", '
+        f'render;dur={sample.render * 1000:.1f}'
+    )
+
+
+class RequestMetricsMiddleware:
+    """Samples requests into the ``api`` metrics; see the module docstring"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.rate = sample_rate()
+        if self.rate <= 0:
+            raise MiddlewareNotUsed
+        self.server_timing = getattr(settings, 'API_METRICS_SERVER_TIMING', False)
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def _sampled(self):
+        return self.rate >= 1 or random.random() < self.rate
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not self._sampled():
+            return self.get_response(request)
+        sample = Sample()
+        token = _current.set(sample)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, sample)
+
+    async def __acall__(self, request):
+        if not self._sampled():
+            return await self.get_response(request)
+        sample = Sample()
+        token = _current.set(sample)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, sample)
+
+    def _finish(self, request, response, sample):
+        view = _view_name(request)
+        if view is None:
+            return response
+        duration = time.perf_counter() - sample.start
+        size = None if response.streaming else len(response.content)
+        observe(view, response.status_code, duration, sample.queries, sample.db, sample.render, size)
+        if self.server_timing:
+            response['Server-Timing'] = _server_timing(duration, sample)
+        return response
+
+
+def _labels(**labels):
+    return '{' + ','.join(f'{key}="{value}"' for key, value in labels.items()) + '}'
+
+
+def _number(value):
+    return str(round(value, 6)) if isinstance(value, float) else str(value)
+
+
+def render_prometheus():
+    """Every metric in the Prometheus text exposition format (version 0.0.4)"""
+    with _lock:
+        histograms = {
+            name: {view: (list(h.counts), h.sum) for view, h in views.items()}
+            for name, views in _histograms.items()
+        }
+        responses = dict(_responses)
+
+    lines = [
+        '# HELP api_metrics_sample_rate Fraction of requests measured; divide counts by it for totals',
+        '# TYPE api_metrics_sample_rate gauge',
+        f'api_metrics_sample_rate {_number(sample_rate())}',
+        '# HELP api_responses_total Sampled api responses by view and status code',
+        '# TYPE api_responses_total counter',
+    ]
+    for (view, status_code), count in sorted(responses.items()):
+        lines.append(f'api_responses_total{_labels(view=view, status=status_code)} {count}')
+
+    for name, (help_text, buckets) in HISTOGRAMS.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} histogram')
+        for view, (counts, total) in sorted(histograms[name].items()):
+            cumulative = 0
+            for bound, count in zip((*map(_number, buckets), '+Inf'), counts):
+                cumulative += count
+                lines.append(f'{name}_bucket{_labels(view=view, le=bound)} {cumulative}')
+            lines.append(f'{name}_sum{_labels(view=view)} {_number(total)}')
+            lines.append(f'{name}_count{_labels(view=view)} {cumulative}')
+    return '\n'.join(lines) + '\n'
+
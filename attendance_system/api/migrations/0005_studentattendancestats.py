@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def populate_stats(apps, schema_editor):
+    """Seed the counters from the attendance already recorded"""
+    Attendance = apps.get_model('api', 'Attendance')
+    StudentAttendanceStats = apps.get_model('api', 'StudentAttendanceStats')
+    counts = {
+        'total': models.Count('id'),
+        'present': models.Count('id', filter=models.Q(status='P')),
+        'absent': models.Count('id', filter=models.Q(status='A')),
+    }
+    overall = Attendance.objects.order_by().values('student_id').annotate(**counts)
+    per_course = (
+        Attendance.objects.filter(course__isnull=False)
+        .order_by()
+        .values('student_id', 'course_id')
+        .annotate(**counts)
+    )
+    rows = [StudentAttendanceStats(course_id=None, **row) for row in overall]
+    rows += [StudentAttendanceStats(**row) for row in per_course]
+    StudentAttendanceStats.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_examtype_course_credits_exam_marks'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StudentAttendanceStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total', models.IntegerField(default=0)),
+                ('present', models.IntegerField(default=0)),
+                ('absent', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('course', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='attendance_stats', to='api.course')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_stats', to='api.student')),
+            ],
+            options={
+                'verbose_name_plural': 'Student Attendance Stats',
+                'constraints': [models.UniqueConstraint(fields=('student', 'course'), name='unique_student_course_stats'), models.UniqueConstraint(condition=models.Q(('course__isnull', True)), fields=('student',), name='unique_student_overall_stats')],
+            },
+        ),
+        migrations.RunPython(populate_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_studentattendancestats'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['date'], name='attendance_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['course', 'date', 'status'], name='attendance_course_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['student', 'status', 'date'], name='attendance_student_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='marks',
+            index=models.Index(fields=['student', '-created_at'], name='marks_student_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='marks',
+            index=models.Index(fields=['-created_at'], name='marks_created_idx'),
+        ),
+    ]
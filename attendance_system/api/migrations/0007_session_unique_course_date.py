@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:51
+
+from django.db import migrations, models
+
+
+def drop_duplicate_sessions(apps, schema_editor):
+    # Sessions only hold derived counts; keep the oldest per (course, date)
+    AttendanceSession = apps.get_model('api', 'AttendanceSession')
+    seen = set()
+    duplicates = []
+    for pk, course_id, day in AttendanceSession.objects.order_by('id').values_list('id', 'course_id', 'date'):
+        if (course_id, day) in seen:
+            duplicates.append(pk)
+        seen.add((course_id, day))
+    AttendanceSession.objects.filter(id__in=duplicates).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_attendance_marks_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_duplicate_sessions, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='attendancesession',
+            constraint=models.UniqueConstraint(fields=('course', 'date'), name='unique_session_course_date'),
+        ),
+    ]
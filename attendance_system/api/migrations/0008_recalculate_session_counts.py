@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-17 09:12
+
+from django.db import migrations, models
+
+
+def recalculate_sessions(apps, schema_editor):
+    """
+    Recount every session from the attendance already recorded, and add the
+    sessions missing for it, so apply_session_changes starts from true counts
+    """
+    Attendance = apps.get_model('api', 'Attendance')
+    AttendanceSession = apps.get_model('api', 'AttendanceSession')
+    Course = apps.get_model('api', 'Course')
+    grouped = (
+        Attendance.objects.filter(course__isnull=False)
+        .order_by()
+        .values('course_id', 'date')
+        .annotate(
+            total=models.Count('id'),
+            present=models.Count('id', filter=models.Q(status='P')),
+            absent=models.Count('id', filter=models.Q(status='A')),
+        )
+    )
+    counts = {(row['course_id'], row['date']): row for row in grouped.iterator()}
+
+    sessions = list(AttendanceSession.objects.only('id', 'course_id', 'date'))
+    for session in sessions:
+        row = counts.pop((session.course_id, session.date), None)
+        session.total_students = row['total'] if row else 0
+        session.present_count = row['present'] if row else 0
+        session.absent_count = row['absent'] if row else 0
+    AttendanceSession.objects.bulk_update(
+        sessions, ['total_students', 'present_count', 'absent_count'], batch_size=1000
+    )
+
+    teachers = dict(Course.objects.values_list('id', 'teacher_id'))
+    AttendanceSession.objects.bulk_create(
+        [
+            AttendanceSession(
+                course_id=course_id, date=day, teacher_id=teachers.get(course_id),
+                total_students=row['total'], present_count=row['present'], absent_count=row['absent'],
+            )
+            for (course_id, day), row in counts.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_session_unique_course_date'),
+    ]
+
+    operations = [
+        migrations.RunPython(recalculate_sessions, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,8 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import User
 from datetime import date
 from decimal import Decimal
+from .cache import ATTENDANCE_VIEWS, MARKS_VIEWS, invalidate_courses, invalidate_exams, invalidate_students
 
 class Student(models.Model):
     """Student model with roll number and basic info"""
@@ -20,6 +21,17 @@ class Student(models.Model):
     def __str__(self):
         return f"{self.name} ({self.id})"
 
+    def save(self, *args, **kwargs):
+        """Save and drop this student's cached responses"""
+        adding = self._state.adding
+        super().save(*args, **kwargs)
+        invalidate_students([self.pk])
+        if not adding:
+            # Course results and exam analytics list student names
+            exams = list(Marks.objects.filter(student=self).values_list('exam_id', 'exam__course_id'))
+            invalidate_courses(course_id for _, course_id in exams)
+            invalidate_exams(exam_id for exam_id, _ in exams)
+
 
 class Course(models.Model):
     """Course model"""
@@ -33,6 +45,38 @@ class Course(models.Model):
     def __str__(self):
         return f"{self.name} ({self.code})"
 
+    def save(self, *args, **kwargs):
+        """Save and drop the cached results that use this course's credits"""
+        adding = self._state.adding
+        super().save(*args, **kwargs)
+        if not adding:
+            invalidate_courses([self.pk])
+            invalidate_students(
+                Marks.objects.filter(exam__course=self).values_list('student_id', flat=True), ('gpa',)
+            )
+
+
+class AttendanceQuerySet(models.QuerySet):
+    def delete(self):
+        """
+        Bulk delete (the admin's "delete selected" among others) that also
+        takes the rows out of StudentAttendanceStats and their AttendanceSession
+        """
+        from .stats import apply_attendance_changes, apply_session_changes
+
+        with transaction.atomic():
+            rows = list(
+                self.select_for_update(of=('self',)).order_by().values_list('student_id', 'course_id', 'date', 'status')
+            )
+            result = super().delete()
+            apply_attendance_changes([(student_id, course_id, status, None) for student_id, course_id, _, status in rows])
+            apply_session_changes([(course_id, day, status, None) for _, course_id, day, status in rows])
+            invalidate_students({row[0] for row in rows}, ATTENDANCE_VIEWS)
+        return result
+
+    delete.alters_data = True
+    delete.queryset_only = True
+
 
 class Attendance(models.Model):
     """Attendance record model"""
@@ -51,14 +95,64 @@ class Attendance(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = AttendanceQuerySet.as_manager()
+
     class Meta:
         unique_together = ('student', 'date', 'course')
         ordering = ['-date']
         verbose_name_plural = "Attendance Records"
+        # (student, date) lookups and per-student history are already served
+        # by the unique (student, date, course) index.
+        indexes = [
+            models.Index(fields=['date'], name='attendance_date_idx'),
+            models.Index(fields=['course', 'date', 'status'], name='attendance_course_date_idx'),
+            models.Index(fields=['student', 'status', 'date'], name='attendance_student_status_idx'),
+        ]
 
     def __str__(self):
         return f"{self.student.name} - {self.date} - {self.status}"
 
+    def save(self, *args, **kwargs):
+        """Save and keep StudentAttendanceStats and the AttendanceSession in step with the change"""
+        from .stats import apply_attendance_changes, apply_session_changes
+
+        with transaction.atomic():
+            previous = None
+            if self.pk:
+                # Locked, so a concurrent save of this row waits and sees our status
+                previous = Attendance.objects.select_for_update().filter(pk=self.pk).values_list(
+                    'student_id', 'course_id', 'date', 'status'
+                ).first()
+            super().save(*args, **kwargs)
+
+            current = (self.student_id, self.course_id, self.date)
+            if previous and previous[:3] != current:
+                changes = [previous + (None,), current + (None, self.status)]
+            else:
+                changes = [current + (previous[3] if previous else None, self.status)]
+            apply_attendance_changes([(s, c, old, new) for s, c, _, old, new in changes])
+            apply_session_changes([(c, d, old, new) for _, c, d, old, new in changes], teacher_id=self.marked_by_id)
+            invalidate_students({change[0] for change in changes}, ATTENDANCE_VIEWS)
+
+    def delete(self, *args, **kwargs):
+        """Delete and remove the row from StudentAttendanceStats and its AttendanceSession"""
+        from .stats import apply_attendance_changes, apply_session_changes
+
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            apply_attendance_changes([(self.student_id, self.course_id, self.status, None)])
+            apply_session_changes([(self.course_id, self.date, self.status, None)])
+            invalidate_students([self.student_id], ATTENDANCE_VIEWS)
+        return result
+
+
+class AttendanceSessionQuerySet(models.QuerySet):
+    def recalculate_stats(self, batch_size=1000):
+        """Recompute the counts of every session in the queryset; returns how many were updated"""
+        from .stats import recalculate_sessions
+
+        return recalculate_sessions(self, batch_size=batch_size)
+
 
 class AttendanceSession(models.Model):
     """Attendance session for bulk operations"""
@@ -71,24 +165,59 @@ class AttendanceSession(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = AttendanceSessionQuerySet.as_manager()
+
     class Meta:
         ordering = ['-date']
+        # One session per course and day, maintained by every attendance write
+        constraints = [
+            models.UniqueConstraint(fields=['course', 'date'], name='unique_session_course_date'),
+        ]
 
     def __str__(self):
         return f"{self.course} - {self.date}"
 
     def calculate_stats(self):
         """Calculate attendance statistics"""
-        attendance = Attendance.objects.filter(
-            course=self.course,
-            date=self.date
-        )
-        self.total_students = attendance.count()
-        self.present_count = attendance.filter(status='P').count()
-        self.absent_count = attendance.filter(status='A').count()
+        from .stats import attendance_summary
+
+        summary = attendance_summary(course_id=self.course_id, date=self.date)
+        self.total_students = summary['total']
+        self.present_count = summary['present']
+        self.absent_count = summary['absent']
         self.save()
 
 
+class StudentAttendanceStats(models.Model):
+    """
+    Denormalized attendance counters, maintained on every attendance write.
+
+    The row with course=None holds a student's overall totals; rows with a
+    course hold the per-course totals. Run ``rebuild_attendance_stats`` to
+    repair drift (e.g. after raw SQL).
+    """
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='attendance_stats')
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, null=True, blank=True, related_name='attendance_stats')
+    total = models.IntegerField(default=0)
+    present = models.IntegerField(default=0)
+    absent = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = "Student Attendance Stats"
+        constraints = [
+            models.UniqueConstraint(fields=['student', 'course'], name='unique_student_course_stats'),
+            models.UniqueConstraint(
+                fields=['student'],
+                condition=models.Q(course__isnull=True),
+                name='unique_student_overall_stats',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.student_id} - {self.course_id or 'overall'}: {self.present}/{self.total}"
+
+
 class TeacherProfile(models.Model):
     """Teacher profile linked to User"""
     user = models.OneToOneField(User, on_delete=models.CASCADE)
@@ -115,6 +244,18 @@ class ExamType(models.Model):
     def __str__(self):
         return f"{self.name} ({self.weightage}%)"
 
+    def save(self, *args, **kwargs):
+        """Save and drop the cached results weighted by (or listing) this exam type"""
+        adding = self._state.adding
+        super().save(*args, **kwargs)
+        if not adding:
+            exams = list(Exam.objects.filter(exam_type=self).values_list('id', 'course_id'))
+            invalidate_courses(course_id for _, course_id in exams)
+            invalidate_exams(exam_id for exam_id, _ in exams)
+            invalidate_students(
+                Marks.objects.filter(exam__exam_type=self).values_list('student_id', flat=True), ('gpa',)
+            )
+
 
 class Exam(models.Model):
     """Specific exam instance"""
@@ -135,6 +276,15 @@ class Exam(models.Model):
     def __str__(self):
         return f"{self.course.code} - {self.exam_type.name}"
 
+    def save(self, *args, **kwargs):
+        """Save and drop the cached marks of every student who sat this exam"""
+        adding = self._state.adding
+        super().save(*args, **kwargs)
+        if not adding:
+            invalidate_students(self.student_marks.values_list('student_id', flat=True), MARKS_VIEWS)
+            invalidate_courses([self.course_id])
+            invalidate_exams([self.pk])
+
 
 class Marks(models.Model):
     """Student marks for exams"""
@@ -151,6 +301,12 @@ class Marks(models.Model):
         ('D', 'D (40-49)'),
         ('F', 'F (0-39)'),
     ]
+    GRADE_POINTS = {
+        'A+': 4.0, 'A': 3.7, 'A-': 3.3,
+        'B+': 3.0, 'B': 2.7, 'B-': 2.3,
+        'C+': 2.0, 'C': 1.7, 'C-': 1.3,
+        'D': 1.0, 'F': 0.0
+    }
 
     student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='marks')
     exam = models.ForeignKey(Exam, on_delete=models.CASCADE, related_name='student_marks')
@@ -166,6 +322,10 @@ class Marks(models.Model):
         ordering = ['-created_at']
         unique_together = ('student', 'exam')
         verbose_name_plural = "Marks"
+        indexes = [
+            models.Index(fields=['student', '-created_at'], name='marks_student_created_idx'),
+            models.Index(fields=['-created_at'], name='marks_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.student.name} - {self.exam.name} - {self.marks_obtained}/{self.exam.max_marks}"
@@ -176,41 +336,29 @@ class Marks(models.Model):
             self.percentage = (self.marks_obtained / self.exam.max_marks) * 100
             self.grade = self.calculate_grade()
         super().save(*args, **kwargs)
+        invalidate_students([self.student_id], MARKS_VIEWS)
+        invalidate_courses([self.exam.course_id])
+        invalidate_exams([self.exam_id])
+
+    def delete(self, *args, **kwargs):
+        """Delete and drop the student's cached marks"""
+        result = super().delete(*args, **kwargs)
+        invalidate_students([self.student_id], MARKS_VIEWS)
+        invalidate_courses([self.exam.course_id])
+        invalidate_exams([self.exam_id])
+        return result
 
     def calculate_grade(self):
         """Calculate letter grade based on percentage"""
-        if self.percentage is None:
-            return 'F'
-        
-        if self.percentage >= 90:
-            return 'A+'
-        elif self.percentage >= 85:
-            return 'A'
-        elif self.percentage >= 80:
-            return 'A-'
-        elif self.percentage >= 75:
-            return 'B+'
-        elif self.percentage >= 70:
-            return 'B'
-        elif self.percentage >= 65:
-            return 'B-'
-        elif self.percentage >= 60:
-            return 'C+'
-        elif self.percentage >= 55:
-            return 'C'
-        elif self.percentage >= 50:
-            return 'C-'
-        elif self.percentage >= 40:
-            return 'D'
-        else:
-            return 'F'
+        return self.grade_for_percentage(self.percentage)
+
+    @staticmethod
+    def grade_for_percentage(percentage):
+        """Letter grade for a percentage (settings.GRADING_SCALE), without needing a Marks instance"""
+        from .grading import grade_for
+
+        return grade_for(percentage)
 
     def get_grade_point(self):
         """Get grade point for GPA calculation"""
-        grade_points = {
-            'A+': 4.0, 'A': 3.7, 'A-': 3.3,
-            'B+': 3.0, 'B': 2.7, 'B-': 2.3,
-            'C+': 2.0, 'C': 1.7, 'C-': 1.3,
-            'D': 1.0, 'F': 0.0
-        }
-        return grade_points.get(self.grade, 0.0)
\ No newline at end of file
+        return self.GRADE_POINTS.get(self.grade, 0.0)
\ No newline at end of file
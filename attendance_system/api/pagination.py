@@ -0,0 +1,54 @@
+"""
+Keyset (cursor) pagination and sparse fieldsets for the list endpoints.
+
+Clients opt in by sending ``?page_size=`` or ``?cursor=``; other requests
+keep the historical unpaginated shape while ``API_LEGACY_LIST_RESPONSES``
+is True. ``?fields=a,b`` limits every serialized row to those fields.
+"""
+from django.conf import settings
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import CursorPagination
+
+
+class KeysetPagination(CursorPagination):
+    """Cursor pagination over an ordering given per endpoint"""
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+
+    def __init__(self, ordering):
+        self.ordering = ordering
+
+
+def _params(request):
+    # DRF requests have query_params; the async views get a plain HttpRequest
+    return getattr(request, 'query_params', request.GET)
+
+
+def wants_pagination(request):
+    if 'cursor' in _params(request) or 'page_size' in _params(request):
+        return True
+    return not getattr(settings, 'API_LEGACY_LIST_RESPONSES', True)
+
+
+def requested_fields(request, serializer_class):
+    """Field names from ``?fields=``, or None for all; unknown names are a 400"""
+    raw = _params(request).get('fields')
+    if not raw:
+        return None
+    fields = [name.strip() for name in raw.split(',') if name.strip()]
+    unknown = sorted(set(fields) - set(serializer_class.Meta.fields))
+    if unknown:
+        raise ValidationError({'fields': f"Unknown field(s): {', '.join(unknown)}"})
+    return fields
+
+
+def paginate(request, queryset, ordering):
+    """
+    Return ``(page, paginator)`` when the request asks for pagination, else
+    ``(queryset, None)`` so the caller can keep its unpaginated response.
+    """
+    if not wants_pagination(request):
+        return queryset, None
+    paginator = KeysetPagination(ordering)
+    return paginator.paginate_queryset(queryset, request), paginator
@@ -0,0 +1,185 @@
+"""
+Detection of repeated query patterns (N+1 queries).
+
+Every query's SQL is reduced to a template -- literals become ``?`` and
+``IN`` lists of any length become ``IN (...)`` -- and counted per request.
+A template run ``API_QUERY_REPEAT_THRESHOLD`` times or more is reported
+with the call site that reached the threshold, which is almost always a
+loop touching a relation one row at a time.
+
+``detect_repeated_queries`` is a context manager for tests and scripts;
+``QueryPatternMiddleware`` applies it to every request, acting on
+``API_QUERY_PATTERN_CHECK``: ``'warn'`` logs the offending templates and
+stack summaries, ``'raise'`` raises ``RepeatedQueriesError``, ``'off'``
+removes the middleware. Like ``api.metrics``, the queries are seen through
+one execute wrapper on every connection that looks up the active detectors
+in a context variable, so queries the async views run in
+``sync_to_async`` threads are included. Bodies of streaming responses are
+produced after the check has ended and are not covered.
+"""
+import logging
+import os
+import re
+import traceback
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger(__name__)
+
+_active = ContextVar('api_query_detectors', default=())
+
+ACTIONS = ('off', 'warn', 'raise')
+API_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_DIR = os.path.dirname(API_DIR)
+# Query wrappers and entry points, left out of stack summaries
+SKIPPED_FILES = {os.path.join(API_DIR, 'querycheck.py'), os.path.join(API_DIR, 'metrics.py'),
+                 os.path.join(PROJECT_DIR, 'manage.py')}
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST = re.compile(r'\bIN \((?:\s*(?:%s|\?)\s*,?)+\)', re.IGNORECASE)
+_SPACE = re.compile(r'\s+')
+
+
+class RepeatedQueriesError(AssertionError):
+    """Raised by a detector in ``'raise'`` mode; an AssertionError so tests fail rather than error"""
+
+
+def fingerprint(sql):
+    """The template of ``sql``: literals as ``?``, IN lists collapsed, whitespace normalised"""
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _IN_LIST.sub('IN (...)', sql)
+    return _SPACE.sub(' ', sql).strip()
+
+
+def repeat_threshold():
+    return getattr(settings, 'API_QUERY_REPEAT_THRESHOLD', 5)
+
+
+def _call_site(limit=6):
+    """The innermost project frames of the current stack"""
+    frames = [
+        frame for frame in traceback.extract_stack()
+        if frame.filename.startswith(PROJECT_DIR) and frame.filename not in SKIPPED_FILES
+    ]
+    return [
+        f'{os.path.relpath(frame.filename, PROJECT_DIR)}:{frame.lineno} in {frame.name}: {frame.line}'
+        for frame in frames[-limit:]
+    ]
+
+
+class QueryPatternDetector:
+    """Counts query templates while active; ``violations`` lists those at or over the threshold"""
+
+    def __init__(self, threshold=None, label=''):
+        self.threshold = threshold or repeat_threshold()
+        self.label = label
+        self.counts = Counter()
+        self.call_sites = {}
+
+    def record(self, sql):
+        template = fingerprint(sql)
+        self.counts[template] += 1
+        if self.counts[template] == self.threshold:
+            self.call_sites[template] = _call_site()
+
+    @property
+    def violations(self):
+        return [
+            (template, count, self.call_sites.get(template, []))
+            for template, count in self.counts.most_common()
+            if count >= self.threshold
+        ]
+
+    def report(self):
+        lines = [f'Repeated queries{f" in {self.label}" if self.label else ""} (threshold {self.threshold}):']
+        for template, count, call_site in self.violations:
+            lines.append(f'  {count}x {template}')
+            lines.extend(f'      {frame}' for frame in call_site)
+        return '\n'.join(lines)
+
+    def check(self, action):
+        if not self.violations or action == 'off':
+            return
+        if action == 'raise':
+            raise RepeatedQueriesError(self.report())
+        logger.warning(self.report())
+
+
+def record_query(execute, sql, params, many, context):
+    """Connection execute wrapper feeding the active detectors"""
+    for detector in _active.get():
+        detector.record(sql)
+    return execute(sql, params, many, context)
+
+
+def _install_wrapper(connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def connect_signals():
+    """Install ``record_query`` on every connection (from AppConfig.ready)"""
+    if getattr(settings, 'API_QUERY_PATTERN_CHECK', 'off') == 'off':
+        return
+    connection_created.connect(_install_wrapper, dispatch_uid='api-querycheck-recorder')
+    for connection in connections.all(initialized_only=True):
+        _install_wrapper(connection)
+
+
+@contextmanager
+def detect_repeated_queries(threshold=None, action='raise', label=''):
+    """
+    Count query templates inside the block; on exit act on repeats
+    (``'raise'`` or ``'warn'``). Yields the detector for inspection.
+    Nested detectors (a test around a request the middleware checks) all
+    see the block's queries.
+    """
+    for connection in connections.all(initialized_only=True):
+        _install_wrapper(connection)
+    detector = QueryPatternDetector(threshold, label)
+    token = _active.set((*_active.get(), detector))
+    try:
+        yield detector
+    finally:
+        _active.reset(token)
+    detector.check(action)
+
+
+class QueryPatternMiddleware:
+    """Runs every request under a detector; see the module docstring"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.action = getattr(settings, 'API_QUERY_PATTERN_CHECK', 'off')
+        if self.action not in ACTIONS:
+            raise ValueError(f"API_QUERY_PATTERN_CHECK must be one of: {', '.join(ACTIONS)}")
+        if self.action == 'off':
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def _label(self, request):
+        return f'{request.method} {request.path}'
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        with detect_repeated_queries(action=self.action, label=self._label(request)):
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        with detect_repeated_queries(action=self.action, label=self._label(request)):
+            return await self.get_response(request)
@@ -1,6 +1,17 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
 from .models import Student, Course, Attendance, AttendanceSession, TeacherProfile
+from .stats import attendance_percentage, student_totals
+
+
+class SparseFieldsMixin:
+    """Accept ``fields=[...]`` to serialize only those fields"""
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
 
 
 class LoginSerializer(serializers.Serializer):
@@ -9,7 +20,7 @@ class LoginSerializer(serializers.Serializer):
     password = serializers.CharField(write_only=True)
 
 
-class StudentSerializer(serializers.ModelSerializer):
+class StudentSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Serialize student data"""
     class Meta:
         model = Student
@@ -26,14 +37,20 @@ class StudentDetailSerializer(serializers.ModelSerializer):
         model = Student
         fields = ['id', 'name', 'roll_number', 'email', 'phone', 'attendance_count', 'present_count']
 
+    def _totals(self, obj):
+        # Both fields share one counter lookup per student
+        if not hasattr(obj, '_attendance_totals'):
+            obj._attendance_totals = student_totals(obj.id)
+        return obj._attendance_totals
+
     def get_attendance_count(self, obj):
-        return obj.attendance_records.count()
+        return self._totals(obj)['total']
 
     def get_present_count(self, obj):
-        return obj.attendance_records.filter(status='P').count()
+        return self._totals(obj)['present']
 
 
-class CourseSerializer(serializers.ModelSerializer):
+class CourseSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Serialize course data"""
     class Meta:
         model = Course
@@ -41,7 +58,7 @@ class CourseSerializer(serializers.ModelSerializer):
         read_only_fields = ['created_at']
 
 
-class AttendanceSerializer(serializers.ModelSerializer):
+class AttendanceSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Serialize attendance records"""
     student_name = serializers.CharField(source='student.name', read_only=True)
     student_roll = serializers.CharField(source='student.roll_number', read_only=True)
@@ -67,6 +84,7 @@ class AttendanceSerializer(serializers.ModelSerializer):
 class AttendanceCreateSerializer(serializers.Serializer):
     """Serializer for bulk attendance creation"""
     date = serializers.DateField()
+    course_id = serializers.CharField(required=False, allow_null=True, allow_blank=True)
     records = serializers.ListField(
         child=serializers.DictField(
             child=serializers.CharField()
@@ -119,20 +137,28 @@ class StudentDashboardSerializer(serializers.Serializer):
 
 class AttendanceSessionSerializer(serializers.ModelSerializer):
     """Serialize attendance session data"""
+    course_name = serializers.CharField(source='course.name', read_only=True)
+    percentage = serializers.SerializerMethodField()
+
     class Meta:
         model = AttendanceSession
         fields = [
             'id',
             'course',
+            'course_name',
             'date',
             'teacher',
             'total_students',
             'present_count',
             'absent_count',
+            'percentage',
             'created_at'
         ]
         read_only_fields = ['created_at']
 
+    def get_percentage(self, obj):
+        return attendance_percentage(obj.present_count or 0, obj.total_students or 0)
+
 
 class AttendanceReportSerializer(serializers.Serializer):
     """Serializer for attendance report"""
@@ -0,0 +1,314 @@
+"""
+Attendance statistics.
+
+``StudentAttendanceStats`` keeps per-student counters (overall and per
+course) so the read endpoints never recount the Attendance table. Writers
+report what changed through ``apply_attendance_changes``; the
+``rebuild_attendance_stats`` command recomputes everything from scratch.
+``attendance_summary`` aggregates arbitrary slices (a session, a student's
+courses or months) in a single query. AttendanceSession rows (one per
+course and date) are kept current by ``apply_session_changes``;
+``recalculate_sessions`` recomputes many of them at once. Deleting a
+Student or Course cascades to its attendance without running
+``Attendance.delete``, so ``connect_signals`` takes those rows out of the
+counters that outlive them.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models.signals import post_delete, pre_delete
+from django.db.models import Count, F, Q
+from django.db.models.functions import Coalesce, TruncMonth
+from django.utils import timezone
+
+from .cache import ATTENDANCE_VIEWS, invalidate_students
+from .models import Attendance, AttendanceSession, Course, Student, StudentAttendanceStats
+
+STATUS_COUNTS = {
+    'total': Count('id'),
+    'present': Count('id', filter=Q(status='P')),
+    'absent': Count('id', filter=Q(status='A')),
+}
+BREAKDOWNS = ('course', 'month')
+
+
+def _delta(old_status, new_status):
+    """(total, present, absent) change for one attendance row going old -> new"""
+    total = present = absent = 0
+    if old_status is not None:
+        total -= 1
+        if old_status == 'P':
+            present -= 1
+        else:
+            absent -= 1
+    if new_status is not None:
+        total += 1
+        if new_status == 'P':
+            present += 1
+        else:
+            absent += 1
+    return total, present, absent
+
+
+def apply_attendance_changes(changes):
+    """
+    Update the counters for a batch of attendance writes.
+
+    ``changes`` is an iterable of ``(student_id, course_id, old_status,
+    new_status)``; ``old_status`` is None for new rows and ``new_status`` is
+    None for deleted rows. Students with the same change share one UPDATE,
+    so a roll call costs a handful of queries whatever its size.
+    """
+    # (course_id, delta) -> student ids; course_id None is the overall bucket
+    groups = defaultdict(set)
+    for student_id, course_id, old_status, new_status in changes:
+        if old_status == new_status:
+            continue
+        delta = _delta(old_status, new_status)
+        groups[(None, delta)].add(student_id)
+        if course_id is not None:
+            groups[(course_id, delta)].add(student_id)
+    if not groups:
+        return
+
+    with transaction.atomic():
+        buckets = {(student_id, course_id) for (course_id, _), ids in groups.items() for student_id in ids}
+        StudentAttendanceStats.objects.bulk_create(
+            [StudentAttendanceStats(student_id=s, course_id=c) for s, c in buckets],
+            ignore_conflicts=True,
+        )
+        now = timezone.now()
+        for (course_id, (total, present, absent)), student_ids in groups.items():
+            StudentAttendanceStats.objects.filter(
+                student_id__in=student_ids,
+                course_id=course_id,
+            ).update(
+                total=F('total') + total,
+                present=F('present') + present,
+                absent=F('absent') + absent,
+                updated_at=now,
+            )
+
+
+def apply_session_changes(changes, teacher_id=None):
+    """
+    Update the AttendanceSession counters for a batch of attendance writes.
+
+    ``changes`` is an iterable of ``(course_id, date, old_status,
+    new_status)`` as in ``apply_attendance_changes``; rows without a course
+    belong to no session. Call it after the attendance rows are written:
+    sessions that do not exist yet are created from a count of those rows
+    (so attendance marked before sessions were tracked is included), the
+    others get one UPDATE each. ``teacher_id`` is recorded on new sessions.
+    """
+    deltas = defaultdict(lambda: [0, 0, 0])
+    for course_id, day, old_status, new_status in changes:
+        if course_id is None or old_status == new_status:
+            continue
+        for index, change in enumerate(_delta(old_status, new_status)):
+            deltas[(course_id, day)][index] += change
+    if not deltas:
+        return
+
+    course_ids = {course_id for course_id, _ in deltas}
+    days = {day for _, day in deltas}
+    with transaction.atomic():
+        existing = set(
+            AttendanceSession.objects.filter(course_id__in=course_ids, date__in=days)
+            .order_by()
+            .values_list('course_id', 'date')
+        )
+        missing = set(deltas) - existing
+        if missing:
+            counts = {
+                (row['course_id'], row['date']): row
+                for row in Attendance.objects.filter(course_id__in=course_ids, date__in=days)
+                .order_by()
+                .values('course_id', 'date')
+                .annotate(**STATUS_COUNTS)
+            }
+            empty = {'total': 0, 'present': 0, 'absent': 0}
+            AttendanceSession.objects.bulk_create(
+                [
+                    AttendanceSession(
+                        course_id=course_id,
+                        date=day,
+                        teacher_id=teacher_id,
+                        total_students=counts.get((course_id, day), empty)['total'],
+                        present_count=counts.get((course_id, day), empty)['present'],
+                        absent_count=counts.get((course_id, day), empty)['absent'],
+                    )
+                    for course_id, day in missing
+                ],
+                ignore_conflicts=True,
+            )
+
+        now = timezone.now()
+        for (course_id, day), (total, present, absent) in deltas.items():
+            if (course_id, day) in missing or (total, present, absent) == (0, 0, 0):
+                continue
+            AttendanceSession.objects.filter(course_id=course_id, date=day).update(
+                total_students=Coalesce(F('total_students'), 0) + total,
+                present_count=Coalesce(F('present_count'), 0) + present,
+                absent_count=Coalesce(F('absent_count'), 0) + absent,
+                updated_at=now,
+            )
+
+
+def _totals_queryset(student_id, course_id):
+    return (
+        StudentAttendanceStats.objects.filter(student_id=student_id, course_id=course_id)
+        .values('total', 'present', 'absent')
+    )
+
+
+def student_totals(student_id, course_id=None):
+    """Counters for one student (overall, or for one course) as a dict"""
+    row = _totals_queryset(student_id, course_id).first()
+    return row or {'total': 0, 'present': 0, 'absent': 0}
+
+
+async def astudent_totals(student_id, course_id=None):
+    """Async version of ``student_totals``"""
+    row = await _totals_queryset(student_id, course_id).afirst()
+    return row or {'total': 0, 'present': 0, 'absent': 0}
+
+
+def attendance_percentage(present, total, digits=2):
+    return round((present / total) * 100, digits) if total else 0
+
+
+def _with_percentage(row):
+    row['percentage'] = attendance_percentage(row['present'], row['total'])
+    return row
+
+
+def _breakdown_queryset(by, filters):
+    if by not in BREAKDOWNS:
+        raise ValueError(f"by must be one of: {', '.join(BREAKDOWNS)}")
+    queryset = Attendance.objects.filter(**filters).order_by()
+    if by == 'course':
+        return queryset.values('course_id', 'course__name').annotate(**STATUS_COUNTS).order_by('course_id')
+    return queryset.annotate(month=TruncMonth('date')).values('month').annotate(**STATUS_COUNTS).order_by('month')
+
+
+def _breakdown_row(by, row):
+    if by == 'course':
+        row['course_name'] = row.pop('course__name')
+    else:
+        row['month'] = row['month'].strftime('%Y-%m')
+    return _with_percentage(row)
+
+
+def attendance_summary(by=None, **filters):
+    """
+    Total/present/absent/percentage of the Attendance rows matching
+    ``filters``, in one aggregate query. With ``by='course'`` or
+    ``by='month'`` returns one such row per course / month instead.
+    """
+    if by is None:
+        return _with_percentage(Attendance.objects.filter(**filters).aggregate(**STATUS_COUNTS))
+    return [_breakdown_row(by, row) for row in _breakdown_queryset(by, filters)]
+
+
+async def aattendance_summary(by=None, **filters):
+    """Async version of ``attendance_summary``"""
+    if by is None:
+        return _with_percentage(await Attendance.objects.filter(**filters).aaggregate(**STATUS_COUNTS))
+    return [_breakdown_row(by, row) async for row in _breakdown_queryset(by, filters)]
+
+
+def rebuild_attendance_stats(batch_size=1000):
+    """
+    Recompute every counter from the Attendance table.
+
+    Returns the number of counter rows written.
+    """
+    overall = Attendance.objects.order_by().values('student_id').annotate(**STATUS_COUNTS)
+    per_course = (
+        Attendance.objects.filter(course__isnull=False)
+        .order_by()
+        .values('student_id', 'course_id')
+        .annotate(**STATUS_COUNTS)
+    )
+
+    rows = [StudentAttendanceStats(course_id=None, **row) for row in overall.iterator()]
+    rows += [StudentAttendanceStats(**row) for row in per_course.iterator()]
+
+    with transaction.atomic():
+        StudentAttendanceStats.objects.all().delete()
+        StudentAttendanceStats.objects.bulk_create(rows, batch_size=batch_size)
+    return len(rows)
+
+
+def recalculate_sessions(sessions, batch_size=1000):
+    """
+    Recompute total/present/absent of an AttendanceSession queryset.
+
+    One grouped aggregate over Attendance by (course, date) covers every
+    session; the counts are written back with ``bulk_update``. Sessions
+    without attendance get zeros. Returns the number of sessions updated.
+    """
+    sessions = list(sessions.order_by().only('id', 'course_id', 'date'))
+    if not sessions:
+        return 0
+
+    dates = [session.date for session in sessions]
+    grouped = (
+        Attendance.objects.filter(
+            course_id__in={session.course_id for session in sessions},
+            date__range=(min(dates), max(dates)),
+        )
+        .order_by()
+        .values('course_id', 'date')
+        .annotate(**STATUS_COUNTS)
+    )
+    counts = {(row['course_id'], row['date']): row for row in grouped.iterator()}
+
+    # bulk_update does not apply auto_now
+    now = timezone.now()
+    for session in sessions:
+        row = counts.get((session.course_id, session.date))
+        session.total_students = row['total'] if row else 0
+        session.present_count = row['present'] if row else 0
+        session.absent_count = row['absent'] if row else 0
+        session.updated_at = now
+
+    # bulk_update runs all its batches in one transaction
+    AttendanceSession.objects.bulk_update(
+        sessions, ['total_students', 'present_count', 'absent_count', 'updated_at'], batch_size=batch_size
+    )
+    return len(sessions)
+
+
+def _note_cascaded_attendance(sender, instance, **kwargs):
+    """pre_delete receiver for Student and Course: the attendance rows the cascade will remove"""
+    owner = 'student' if sender is Student else 'course'
+    instance._cascaded_attendance = list(
+        Attendance.objects.select_for_update()
+        .filter(**{owner: instance})
+        .order_by('pk')
+        .values_list('student_id', 'course_id', 'date', 'status')
+    )
+
+
+def _forget_cascaded_attendance(sender, instance, **kwargs):
+    """post_delete receiver for Student and Course: take the cascaded rows out of the counters"""
+    rows = instance.__dict__.pop('_cascaded_attendance', None)
+    if not rows:
+        return
+    if sender is Student:
+        # The student's own counters went with them; the sessions stay
+        apply_session_changes([(course_id, day, status, None) for _, course_id, day, status in rows])
+    else:
+        # The course's counters and sessions went with it; the overall totals stay
+        apply_attendance_changes([(student_id, None, status, None) for student_id, _, _, status in rows])
+    invalidate_students({row[0] for row in rows}, ATTENDANCE_VIEWS)
+
+
+def connect_signals():
+    for model in (Student, Course):
+        pre_delete.connect(_note_cascaded_attendance, sender=model,
+                           dispatch_uid=f'attendance-cascade-note-{model.__name__}')
+        post_delete.connect(_forget_cascaded_attendance, sender=model,
+                            dispatch_uid=f'attendance-cascade-forget-{model.__name__}')
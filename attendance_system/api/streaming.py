@@ -0,0 +1,89 @@
+"""
+Streaming (``?stream=``) responses for the attendance history endpoints.
+
+``?stream=1`` sends the same JSON document as the regular response, written
+row by row from ``QuerySet.iterator``; ``?stream=ndjson`` sends one record
+per line instead. Neither builds the full row list, so peak memory stays
+flat however long the history is.
+
+Under ASGI, Django reads a sync iterator into a list before sending any of
+it, so there ``streaming_response`` hands the server an async iterator,
+fetching each chunk in ``sync_to_async`` the way ``QuerySet.aiterator``
+fetches rows.
+"""
+import json
+from itertools import chain
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+
+from .fast_serializers import iter_attendance_rows
+
+STREAM_CHUNK_SIZE = 2000
+ROWS_PER_WRITE = 500
+NDJSON_CONTENT_TYPE = 'application/x-ndjson'
+
+
+def _dumps(value):
+    # Same separators and escaping as DRF's JSONRenderer
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+
+
+def stream_mode(request):
+    """'json', 'ndjson' or None for the ``?stream=`` query parameter"""
+    value = request.query_params.get('stream', '').lower()
+    if value in ('', '0', 'false', 'no'):
+        return None
+    return 'ndjson' if value == 'ndjson' else 'json'
+
+
+def served_by_asgi(request):
+    """Whether ``request`` (Django's or DRF's) came through the ASGI handler"""
+    return isinstance(getattr(request, '_request', request), ASGIRequest)
+
+
+async def _async_chunks(chunks):
+    chunks = iter(chunks)
+    next_chunk = sync_to_async(next)
+    while (chunk := await next_chunk(chunks, None)) is not None:
+        yield chunk
+
+
+def streaming_response(request, chunks, content_type):
+    """``StreamingHttpResponse`` of the byte chunks, async-iterable when served by ASGI"""
+    if served_by_asgi(request):
+        chunks = _async_chunks(chunks)
+    return StreamingHttpResponse(chunks, content_type=content_type)
+
+
+def _batched(lines):
+    buffer = []
+    for line in lines:
+        buffer.append(line)
+        if len(buffer) >= ROWS_PER_WRITE:
+            yield ''.join(buffer).encode()
+            buffer = []
+    if buffer:
+        yield ''.join(buffer).encode()
+
+
+def _json_document(envelope, key, rows):
+    head = _dumps(envelope)[:-1]
+    yield (head + (',' if envelope else '') + _dumps(key) + ':[').encode()
+    rows = iter(rows)
+    first = next(rows, None)
+    if first is not None:
+        yield from _batched(chain([_dumps(first)], (',' + _dumps(row) for row in rows)))
+    yield b']}'
+
+
+def streaming_attendance_response(request, mode, queryset, envelope=None, fields=None):
+    """
+    Stream ``queryset`` as attendance rows. In 'json' mode the rows become the
+    ``records`` list of ``envelope``; in 'ndjson' mode the envelope is dropped.
+    """
+    rows = iter_attendance_rows(queryset, fields, chunk_size=STREAM_CHUNK_SIZE)
+    if mode == 'ndjson':
+        return streaming_response(request, _batched(_dumps(row) + '\n' for row in rows), NDJSON_CONTENT_TYPE)
+    return streaming_response(request, _json_document(envelope or {}, 'records', rows), 'application/json')
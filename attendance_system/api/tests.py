@@ -1,3 +1,1455 @@
-from django.test import TestCase
+import csv
+import importlib
+import json
+import os
+import tempfile
+from datetime import date
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import skipUnless
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.apps import apps
+from django.contrib.auth.signals import user_login_failed
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import AsyncClient, AsyncRequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from . import async_views, metrics, urls
+from django.contrib.auth.models import User
+from .models import (
+    Student, Course, Attendance, AttendanceSession, Exam, ExamType, Marks, StudentAttendanceStats,
+    TeacherProfile,
+)
+from .stats import attendance_summary, student_totals
+from .auth import _identity_key
+from .cache import CACHE_ALIAS, check_shared_cache, get_cache
+from .export import parquet_available
+from .fast_serializers import attendance_rows, course_marks_by_exam, student_marks_rows
+from .admin import DistinctDatesQuerySet, EstimatedCountPaginator
+from .grading import grade_marks
+from .querycheck import RepeatedQueriesError, detect_repeated_queries, fingerprint
+from .serializers import AttendanceSerializer
+from .tokens import issue_tokens
+
+
+def _make_students(count, start=0):
+    students = [
+        Student(id=f'S-{i}', name=f'Student {i}', roll_number=f'{i:04d}')
+        for i in range(start, start + count)
+    ]
+    return Student.objects.bulk_create(students)
+
+
+class TeacherAttendanceSummaryTests(TestCase):
+    """Tests for /api/teacher-attendance-summary/"""
+
+    url = '/api/teacher-attendance-summary/'
+
+    def setUp(self):
+        self.math = Course.objects.create(id='MA101', name='Maths', code='MA101')
+        self.physics = Course.objects.create(id='PH101', name='Physics', code='PH101')
+
+    def _mark(self, student, course, day, status_value):
+        Attendance.objects.create(student=student, course=course, date=day, status=status_value)
+
+    def _query_count(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def test_counts_and_percentage(self):
+        alice, bob = _make_students(2)
+        self._mark(alice, self.math, date(2024, 1, 1), 'P')
+        self._mark(alice, self.math, date(2024, 1, 2), 'A')
+        self._mark(alice, self.physics, date(2024, 1, 2), 'P')
+
+        rows = {row['student_id']: row for row in self.client.get(self.url).json()}
+
+        self.assertEqual(rows[alice.id]['total_classes'], 3)
+        self.assertEqual(rows[alice.id]['present'], 2)
+        self.assertEqual(rows[alice.id]['absent'], 1)
+        self.assertEqual(rows[alice.id]['attendance_percentage'], 66.67)
+        self.assertEqual(rows[bob.id]['total_classes'], 0)
+        self.assertEqual(rows[bob.id]['attendance_percentage'], 0)
+
+    def test_course_date_and_below_filters(self):
+        alice, bob = _make_students(2)
+        self._mark(alice, self.math, date(2024, 1, 1), 'A')
+        self._mark(alice, self.math, date(2024, 2, 1), 'P')
+        self._mark(bob, self.math, date(2024, 1, 1), 'P')
+        self._mark(bob, self.physics, date(2024, 1, 1), 'A')
+
+        rows = self.client.get(self.url, {'course': 'MA101', 'to': '2024-01-31'}).json()
+        by_id = {row['student_id']: row for row in rows}
+        self.assertEqual(by_id[alice.id]['total_classes'], 1)
+        self.assertEqual(by_id[alice.id]['present'], 0)
+        self.assertEqual(by_id[bob.id]['present'], 1)
+
+        defaulters = self.client.get(self.url, {'course': 'MA101', 'below': '75'}).json()
+        self.assertEqual([row['student_id'] for row in defaulters], [alice.id])
+
+    def test_per_course_breakdown(self):
+        (alice,) = _make_students(1)
+        self._mark(alice, self.math, date(2024, 1, 1), 'P')
+        self._mark(alice, self.physics, date(2024, 1, 1), 'A')
+
+        (row,) = self.client.get(self.url, {'by': 'course'}).json()
+        courses = {course['course_id']: course for course in row['courses']}
+        self.assertEqual(courses['MA101']['present'], 1)
+        self.assertEqual(courses['PH101']['absent'], 1)
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.client.get(self.url, {'from': '01-01-2024'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'below': 'abc'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'course': 'NOPE'}).status_code, 404)
+
+    def test_query_count_is_constant(self):
+        for student in _make_students(3):
+            self._mark(student, self.math, date(2024, 1, 1), 'P')
+        small = self._query_count(f'{self.url}?by=course&below=101')
+
+        for student in _make_students(30, start=3):
+            self._mark(student, self.physics, date(2024, 1, 1), 'A')
+        large = self._query_count(f'{self.url}?by=course&below=101')
+
+        self.assertEqual(small, large)
+
+
+class MarkAttendanceTests(TestCase):
+    """Tests for /api/mark-attendance/"""
+
+    url = '/api/mark-attendance/'
+
+    def setUp(self):
+        self.course = Course.objects.create(id='MA101', name='Maths', code='MA101')
+
+    def _post(self, payload):
+        return self.client.post(self.url, payload, content_type='application/json')
+
+    def _roll_call(self, students, status_value, **extra):
+        return {
+            'date': '2024-01-06',
+            'records': [{'student_id': s.id, 'status': status_value} for s in students],
+            **extra,
+        }
+
+    def test_upserts_with_course_and_reports_unknown_ids(self):
+        students = _make_students(3)
+        payload = self._roll_call(students, 'P', course_id='MA101')
+        payload['records'].append({'student_id': 'Ghost-1', 'status': 'A'})
+
+        response = self._post(payload)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['unknown_student_ids'], ['Ghost-1'])
+        self.assertEqual(len(response.json()['records']), 3)
+
+        self._post(self._roll_call(students[:1], 'A', course_id='MA101'))
+        self.assertEqual(Attendance.objects.filter(course=self.course).count(), 3)
+        self.assertEqual(Attendance.objects.get(student=students[0]).status, 'A')
+
+    def test_upserts_without_course(self):
+        students = _make_students(2)
+        self._post(self._roll_call(students, 'P'))
+        self._post(self._roll_call(students, 'A'))
+
+        rows = Attendance.objects.filter(course__isnull=True)
+        self.assertEqual(rows.count(), 2)
+        self.assertEqual(set(rows.values_list('status', flat=True)), {'A'})
+
+    def test_unknown_course(self):
+        (student,) = _make_students(1)
+        response = self._post(self._roll_call([student], 'P', course_id='NOPE'))
+        self.assertEqual(response.status_code, 404)
+
+    def test_query_count_is_constant(self):
+        def queries_for(students):
+            with CaptureQueriesContext(connection) as ctx:
+                self._post(self._roll_call(students, 'P', course_id='MA101'))
+            return len(ctx.captured_queries)
+
+        # The day's first roll call also creates the session
+        queries_for(_make_students(1, start=100))
+        self.assertEqual(queries_for(_make_students(3)), queries_for(_make_students(40, start=3)))
+
+
+class UploadMarksTests(TestCase):
+    """Tests for /api/upload-marks/"""
+
+    url = '/api/upload-marks/'
+
+    def setUp(self):
+        self.course = Course.objects.create(id='MA101', name='Maths', code='MA101')
+
+    def _upload(self, records, **extra):
+        payload = {'course_id': 'MA101', 'exam_type': 'midterm', 'records': records, **extra}
+        return self.client.post(self.url, payload, content_type='application/json')
+
+    def test_creates_updates_and_rejects_rows(self):
+        alice, bob = _make_students(2)
+        self._upload([{'student_id': alice.id, 'marks_obtained': 40, 'max_marks': 50}])
+
+        response = self._upload([
+            {'student_id': alice.id, 'marks_obtained': 45, 'max_marks': 50},
+            {'student_id': bob.id, 'marks_obtained': 30},
+            {'student_id': 'Ghost-1', 'marks_obtained': 10},
+            {'student_id': bob.id, 'marks_obtained': 20},
+            {'student_id': alice.id, 'marks_obtained': 'abc'},
+            {'student_id': alice.id, 'marks_obtained': 60},
+            {'student_id': alice.id, 'marks_obtained': 10, 'max_marks': 100},
+        ])
+        body = response.json()
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((body['created'], body['updated'], body['rejected']), (1, 1, 5))
+        self.assertEqual(
+            [row['status'] for row in body['results']],
+            ['updated', 'created', 'rejected', 'rejected', 'rejected', 'rejected', 'rejected'],
+        )
+        self.assertEqual(body['results'][2]['reason'], 'student not found')
+
+        mark = Marks.objects.get(student=alice)
+        self.assertEqual(float(mark.percentage), 90.0)
+        self.assertEqual(mark.grade, 'A+')
+        self.assertEqual(Marks.objects.get(student=bob).grade, 'C+')
+        self.assertEqual(float(Exam.objects.get().max_marks), 50.0)
+
+    def test_query_count_is_constant(self):
+        def queries_for(students):
+            records = [{'student_id': s.id, 'marks_obtained': 70} for s in students]
+            with CaptureQueriesContext(connection) as ctx:
+                self._upload(records)
+            return len(ctx.captured_queries)
+
+        queries_for(_make_students(2))
+        self.assertEqual(queries_for(_make_students(3, start=2)), queries_for(_make_students(50, start=5)))
+
+    def test_new_max_marks_regrades_stored_marks(self):
+        alice, bob = _make_students(2)
+        self._upload([{'student_id': alice.id, 'marks_obtained': 40}], max_marks=50)
+        self._upload([{'student_id': bob.id, 'marks_obtained': 30}], max_marks=100)
+
+        mark = Marks.objects.get(student=alice)
+        self.assertEqual((float(mark.percentage), mark.grade), (40.0, 'D'))
+
+
+class MarksFileImportTests(TestCase):
+    """Tests for /api/upload-marks/file/ and the import_marks command"""
+
+    csv_content = (
+        'Student_ID,marks_obtained,max_marks\n'
+        'S-0,18,20\n'
+        '\n'
+        'S-1,not-a-number,20\n'
+        'S-9,10,20\n'
+        'S-2,12,20\n'
+    )
+
+    def setUp(self):
+        Course.objects.create(id='MA101', name='Maths', code='MA101')
+        _make_students(3)
+
+    def test_upload_endpoint_reports_line_errors(self):
+        upload = SimpleUploadedFile('marks.csv', self.csv_content.encode(), content_type='text/csv')
+        response = self.client.post('/api/upload-marks/file/', {
+            'file': upload, 'course_id': 'MA101', 'exam_type': 'quiz', 'chunk_size': 2,
+        })
+        body = response.json()
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((body['created'], body['rejected'], body['chunks']), (2, 2, 2))
+        self.assertEqual([error['line'] for error in body['errors']], [4, 5])
+        self.assertEqual(float(Marks.objects.get(student_id='S-0').percentage), 90.0)
+
+    def test_upload_endpoint_rejects_bad_header(self):
+        upload = SimpleUploadedFile('marks.csv', b'id,score\nS-0,1\n', content_type='text/csv')
+        response = self.client.post('/api/upload-marks/file/', {
+            'file': upload, 'course_id': 'MA101', 'exam_type': 'quiz',
+        })
+        self.assertEqual(response.status_code, 400)
+
+    def _upload(self, content, chunk_size):
+        upload = SimpleUploadedFile('marks.csv', content, content_type='text/csv')
+        return self.client.post('/api/upload-marks/file/', {
+            'file': upload, 'course_id': 'MA101', 'exam_type': 'quiz', 'chunk_size': chunk_size,
+        })
+
+    def test_non_utf8_file_is_a_bad_request(self):
+        response = self._upload('student_id,marks_obtained\nRenée,10\n'.encode('cp1252'), 10)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('not UTF-8', response.json()['error'])
+        self.assertFalse(Exam.objects.exists())
+
+        # Decoding fails partway: the chunks already written stay imported and are reported
+        content = 'student_id,marks_obtained\nS-0,18\n' + 'S-9,10\n' * 2000 + 'Renée,10\n'
+        response = self._upload(content.encode('cp1252'), 100)
+        body = response.json()
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('rows before it were imported', body['error'])
+        self.assertEqual(body['created'], 1)
+        self.assertGreater(body['processed'], 0)
+        self.assertTrue(Marks.objects.filter(student_id='S-0').exists())
+
+    def test_duplicates_rejected_whatever_the_chunk_size(self):
+        content = b'student_id,marks_obtained\nS-0,18\nS-1,10\nS-0,5\n'
+        for chunk_size in (1, 2, 10):
+            with self.subTest(chunk_size=chunk_size):
+                body = self._upload(content, chunk_size).json()
+                self.assertEqual((body['created'] + body['updated'], body['rejected']), (2, 1))
+                self.assertEqual(body['errors'], [
+                    {'line': 4, 'student_id': 'S-0', 'reason': 'duplicate student_id in upload'},
+                ])
+                self.assertEqual(Marks.objects.get(student_id='S-0').marks_obtained, Decimal('18'))
+
+    def test_import_command(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as handle:
+            handle.write(self.csv_content)
+        self.addCleanup(os.remove, handle.name)
+
+        out = StringIO()
+        call_command('import_marks', handle.name, course='MA101', exam_type='quiz', chunk_size=10, stdout=out)
+        self.assertIn('created 2, updated 0, rejected 2', out.getvalue())
+        self.assertEqual(Marks.objects.count(), 2)
+
+
+class AttendanceCountersTests(TestCase):
+    """Tests for the StudentAttendanceStats counters"""
+
+    def setUp(self):
+        self.course = Course.objects.create(id='MA101', name='Maths', code='MA101')
+        self.alice, self.bob = _make_students(2)
+
+    def _counts(self, student, course_id=None):
+        totals = student_totals(student.id, course_id)
+        return totals['total'], totals['present'], totals['absent']
+
+    def test_single_row_writes(self):
+        record = Attendance.objects.create(student=self.alice, course=self.course, date=date(2024, 1, 1), status='P')
+        Attendance.objects.create(student=self.alice, date=date(2024, 1, 1), status='A')
+        self.assertEqual(self._counts(self.alice), (2, 1, 1))
+        self.assertEqual(self._counts(self.alice, 'MA101'), (1, 1, 0))
+
+        record.status = 'A'
+        record.save()
+        self.assertEqual(self._counts(self.alice, 'MA101'), (1, 0, 1))
+
+        record.delete()
+        self.assertEqual(self._counts(self.alice), (1, 0, 1))
+        self.assertEqual(self._counts(self.alice, 'MA101'), (0, 0, 0))
+
+    def test_bulk_writes_and_rebuild(self):
+        payload = {
+            'date': '2024-01-06',
+            'course_id': 'MA101',
+            'records': [{'student_id': self.alice.id, 'status': 'P'}, {'student_id': self.bob.id, 'status': 'A'}],
+        }
+        self.client.post('/api/mark-attendance/', payload, content_type='application/json')
+        payload['records'][0]['status'] = 'A'
+        self.client.post('/api/mark-attendance/', payload, content_type='application/json')
+        self.assertEqual(self._counts(self.alice), (1, 0, 1))
+        self.assertEqual(self._counts(self.bob, 'MA101'), (1, 0, 1))
+
+        dashboard = self.client.get(f'/api/student-dashboard/{self.alice.id}/').json()
+        self.assertEqual((dashboard['total_classes'], dashboard['absent_count']), (1, 1))
+
+        expected = set(StudentAttendanceStats.objects.values_list('student_id', 'course_id', 'total', 'present', 'absent'))
+        StudentAttendanceStats.objects.update(total=99)
+        call_command('rebuild_attendance_stats', stdout=StringIO())
+        self.assertEqual(
+            set(StudentAttendanceStats.objects.values_list('student_id', 'course_id', 'total', 'present', 'absent')),
+            expected,
+        )
+
+    def test_admin_bulk_delete(self):
+        payload = {
+            'date': '2024-01-06',
+            'course_id': 'MA101',
+            'records': [{'student_id': self.alice.id, 'status': 'P'}, {'student_id': self.bob.id, 'status': 'A'}],
+        }
+        self.client.post('/api/mark-attendance/', payload, content_type='application/json')
+        Attendance.objects.create(student=self.alice, date=date(2024, 1, 7), status='A')
+        dashboard = self.client.get(f'/api/student-dashboard/{self.alice.id}/').json()
+        self.assertEqual(dashboard['total_classes'], 2)
+
+        self.client.force_login(User.objects.create_superuser('admin', password='x'))
+        response = self.client.post('/admin/api/attendance/', {
+            'action': 'delete_selected',
+            '_selected_action': list(Attendance.objects.filter(course='MA101').values_list('pk', flat=True)),
+            'post': 'yes',
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Attendance.objects.count(), 1)
+        self.assertEqual(self._counts(self.alice), (1, 0, 1))
+        self.assertEqual(self._counts(self.bob), (0, 0, 0))
+        self.assertEqual(self._counts(self.bob, 'MA101'), (0, 0, 0))
+        session = AttendanceSession.objects.get(course='MA101', date=date(2024, 1, 6))
+        self.assertEqual((session.total_students, session.present_count, session.absent_count), (0, 0, 0))
+        dashboard = self.client.get(f'/api/student-dashboard/{self.alice.id}/').json()
+        self.assertEqual(dashboard['total_classes'], 1)
+
+    def test_cascading_deletes(self):
+        other = Course.objects.create(id='PH101', name='Physics', code='PH101')
+        for course in (self.course, other):
+            self.client.post('/api/mark-attendance/', {
+                'date': '2024-01-06', 'course_id': course.id,
+                'records': [{'student_id': self.alice.id, 'status': 'P'}, {'student_id': self.bob.id, 'status': 'A'}],
+            }, content_type='application/json')
+        self.assertEqual(self.client.get(f'/api/student-dashboard/{self.alice.id}/').json()['total_classes'], 2)
+
+        other.delete()
+        self.assertEqual(self._counts(self.alice), (1, 1, 0))
+        self.assertEqual(self._counts(self.bob), (1, 0, 1))
+        self.assertEqual(self.client.get(f'/api/student-dashboard/{self.alice.id}/').json()['total_classes'], 1)
+
+        self.bob.delete()
+        session = AttendanceSession.objects.get(course='MA101', date=date(2024, 1, 6))
+        self.assertEqual((session.total_students, session.present_count, session.absent_count), (1, 1, 0))
+        self.assertEqual(self._counts(self.alice), (1, 1, 0))
+
+
+class SeedBenchmarkDataTests(TestCase):
+    """Tests for the seed_benchmark_data command"""
+
+    def test_generates_requested_scale(self):
+        call_command('seed_benchmark_data', students=4, courses=2, days=3, exams=2, verbosity=0)
+
+        self.assertEqual(Student.objects.count(), 4)
+        self.assertEqual(Attendance.objects.count(), 4 * 2 * 3)
+        self.assertEqual(Marks.objects.count(), 4 * 2 * 2)
+        self.assertEqual(student_totals('B-000000')['total'], 2 * 3)
+        session = AttendanceSession.objects.first()
+        self.assertEqual(session.present_count + session.absent_count, session.total_students)
+        self.assertEqual(AttendanceSession.objects.count(), 2 * 3)
+
+
+class ResponseCacheTests(TestCase):
+    """Tests for the per-student dashboard/marks response cache"""
+
+    def setUp(self):
+        get_cache().clear()
+        self.course = Course.objects.create(id='MA101', name='Maths', code='MA101')
+        (self.student,) = _make_students(1)
+        self.dashboard_url = f'/api/student-dashboard/{self.student.id}/'
+        self.marks_url = f'/api/marks/{self.student.id}/'
+
+    def test_hits_until_attendance_is_marked(self):
+        self.assertEqual(self.client.get(self.dashboard_url)['X-Cache'], 'MISS')
+        self.assertEqual(self.client.get(self.dashboard_url)['X-Cache'], 'HIT')
+
+        self.client.post('/api/mark-attendance/', {
+            'date': '2024-01-06', 'records': [{'student_id': self.student.id, 'status': 'P'}],
+        }, content_type='application/json')
+
+        response = self.client.get(self.dashboard_url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.json()['present_count'], 1)
+
+    def test_marks_invalidated_by_upload_and_admin_edit(self):
+        self.client.post('/api/upload-marks/', {
+            'course_id': 'MA101', 'exam_type': 'quiz',
+            'records': [{'student_id': self.student.id, 'marks_obtained': 50}],
+        }, content_type='application/json')
+        self.client.get(self.marks_url)
+        self.assertEqual(self.client.get(self.marks_url)['X-Cache'], 'HIT')
+
+        mark = Marks.objects.get()
+        mark.marks_obtained = 95
+        mark.save()
+
+        response = self.client.get(self.marks_url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.json()['marks'][0]['grade'], 'A+')
+
+    def test_stats_endpoint(self):
+        before = self.client.get('/api/cache-stats/').json()
+        self.client.get(self.dashboard_url)
+        self.client.get(self.dashboard_url)
+        after = self.client.get('/api/cache-stats/').json()
+        self.assertEqual(after['misses'] - before['misses'], 1)
+        self.assertEqual(after['hits'] - before['hits'], 1)
+
+    def test_locmem_refused_outside_debug(self):
+        locmem = {CACHE_ALIAS: {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+        redis = {CACHE_ALIAS: {'BACKEND': 'django.core.cache.backends.redis.RedisCache'}}
+        with override_settings(DEBUG=False, CACHES=locmem):
+            self.assertEqual([e.id for e in check_shared_cache()], ['api.E001'])
+        with override_settings(DEBUG=True, CACHES=locmem):
+            self.assertEqual(check_shared_cache(), [])
+        with override_settings(DEBUG=False, CACHES=redis):
+            self.assertEqual(check_shared_cache(), [])
+
+
+class ConditionalGetTests(TestCase):
+    """Tests for ETag / If-None-Match handling on the list endpoints"""
+
+    def setUp(self):
+        self.course = Course.objects.create(id='MA101', name='Maths', code='MA101')
+        self.alice, self.bob = _make_students(2)
+        Attendance.objects.create(student=self.alice, course=self.course, date=date(2024, 1, 1), status='P')
+
+    def _revalidate(self, url):
+        etag = self.client.get(url)['ETag']
+        return self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_not_modified_without_running_the_view(self):
+        for url in ('/api/students/', '/api/courses/', '/api/attendance-by-date/2024-01-01/',
+                    '/api/course-marks/MA101/'):
+            first = self.client.get(url)
+            with CaptureQueriesContext(connection) as ctx:
+                second = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+            self.assertEqual(second.status_code, 304, url)
+            self.assertEqual(second.content, b'')
+            self.assertLessEqual(len(ctx.captured_queries), 2, url)
+
+    def test_changes_produce_a_new_etag(self):
+        url = '/api/attendance-by-date/2024-01-01/'
+        etag = self.client.get(url)['ETag']
+
+        self.alice.name = 'Alice Renamed'
+        self.alice.save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        etag = self.client.get(url)['ETag']
+        self.client.post('/api/mark-attendance/', {
+            'date': '2024-01-01', 'course_id': 'MA101', 'records': [{'student_id': self.bob.id, 'status': 'A'}],
+        }, content_type='application/json')
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        self.course.name = 'Mathematics'
+        self.course.save()
+        self.assertEqual(self._revalidate('/api/courses/').status_code, 304)
+        etag = self.client.get('/api/courses/')['ETag']
+        Course.objects.get(id='MA101').save()
+        self.assertEqual(self.client.get('/api/courses/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class ListPaginationTests(TestCase):
+    """Tests for ?page_size=/?cursor= and ?fields= on the list endpoints"""
+
+    def setUp(self):
+        self.course = Course.objects.create(id='MA101', name='Maths', code='MA101')
+        self.students = _make_students(5)
+        Attendance.objects.bulk_create([
+            Attendance(student=self.students[0], course=self.course, date=date(2024, 1, day), status='P')
+            for day in range(1, 6)
+        ])
+
+    def test_unpaginated_by_default(self):
+        response = self.client.get('/api/students/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 5)
+
+    def test_cursor_walks_all_rows_once(self):
+        url = '/api/students/?page_size=2'
+        seen = []
+        while url:
+            body = self.client.get(url).json()
+            self.assertLessEqual(len(body['results']), 2)
+            seen += [row['id'] for row in body['results']]
+            url = body['next']
+        self.assertEqual(seen, [s.id for s in self.students])
+
+    def test_attendance_detail_pages_keep_envelope(self):
+        body = self.client.get('/api/attendance-detail/S-0/?page_size=3').json()
+        self.assertEqual(body['student_id'], 'S-0')
+        self.assertEqual([r['date'] for r in body['records']], ['2024-01-05', '2024-01-04', '2024-01-03'])
+        rest = self.client.get(body['next']).json()
+        self.assertEqual(len(rest['records']), 2)
+        self.assertIsNone(rest['next'])
+
+    def test_sparse_fields(self):
+        rows = self.client.get('/api/attendance-by-date/2024-01-01/?fields=student,status').json()
+        self.assertEqual(rows, [{'student': 'S-0', 'status': 'P'}])
+        rows = self.client.get('/api/courses/?fields=id').json()
+        self.assertEqual(rows, [{'id': 'MA101'}])
+
+    def test_unknown_field_is_rejected(self):
+        response = self.client.get('/api/students/?fields=id,password')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('password', str(response.json()['error']))
+
+
+class FastSerializerTests(TestCase):
+    """The values()-based rows must match the DRF / hand-built output exactly"""
+
+    def setUp(self):
+        self.course = Course.objects.create(id='MA101', name='Maths', code='MA101')
+        self.alice, self.bob = _make_students(2)
+        Attendance.objects.create(student=self.alice, course=self.course, date=date(2024, 1, 1), status='P')
+        Attendance.objects.create(student=self.bob, date=date(2024, 1, 2), status='A')
+        exam_type = ExamType.objects.create(name='Midterm', weightage=30)
+        exam = Exam.objects.create(course=self.course, exam_type=exam_type, name='Midterm', max_marks=50)
+        Marks.objects.create(student=self.alice, exam=exam, marks_obtained=Decimal('41.50'))
+        Marks.objects.create(student=self.bob, exam=exam, marks_obtained=Decimal('12'))
+
+    def test_attendance_rows_match_serializer(self):
+        queryset = Attendance.objects.order_by('id')
+        self.assertEqual(attendance_rows(queryset), AttendanceSerializer(queryset, many=True).data)
+        fields = ['status', 'course_name', 'id']
+        self.assertEqual(
+            attendance_rows(queryset, fields),
+            AttendanceSerializer(queryset, many=True, fields=fields).data,
+        )
+
+    def test_marked_at_is_rendered_as_a_time(self):
+        queryset = Attendance.objects.order_by('id')
+        expected = [row['marked_at'] for row in AttendanceSerializer(queryset, many=True).data]
+        self.assertEqual([row['marked_at'] for row in attendance_rows(queryset)], expected)
+        self.assertEqual(attendance_rows(queryset, ['marked_at']), [{'marked_at': value} for value in expected])
+        self.assertEqual(expected[0], queryset[0].marked_at.isoformat())
+
+    def test_marks_rows_match_previous_dicts(self):
+        marks = Marks.objects.select_related('student', 'exam__course', 'exam__exam_type').order_by('id')
+        expected = [{
+            'id': mark.id,
+            'course_id': mark.exam.course.id,
+            'course_name': mark.exam.course.name,
+            'exam_type': mark.exam.exam_type.name,
+            'marks_obtained': float(mark.marks_obtained),
+            'max_marks': float(mark.exam.max_marks),
+            'percentage': float(mark.percentage) if mark.percentage is not None else 0,
+            'grade': mark.grade,
+        } for mark in marks]
+        self.assertEqual(student_marks_rows(Marks.objects.order_by('id')), expected)
+
+        grouped = course_marks_by_exam(Marks.objects.order_by('id'))
+        self.assertEqual(list(grouped), ['Midterm'])
+        self.assertEqual(grouped['Midterm'][0], {
+            'student_id': 'S-0', 'student_name': 'Student 0', 'roll_number': '0000',
+            'marks_obtained': 41.5, 'max_marks': 50.0, 'percentage': 83.0, 'grade': 'A-',
+        })
+
+
+class StreamingResponseTests(TestCase):
+    """Tests for ?stream= on the attendance history endpoints"""
+
+    def setUp(self):
+        self.course = Course.objects.create(id='MA101', name='Maths', code='MA101')
+        self.alice, = _make_students(1)
+        Attendance.objects.bulk_create([
+            Attendance(student=self.alice, course=self.course if day % 2 else None,
+                       date=date(2024, 1, day), status='PA'[day % 2])
+            for day in range(1, 8)
+        ])
+
+    def _streamed(self, url):
+        response = self.client.get(url)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content)
+
+    def test_stream_matches_regular_json(self):
+        for url in ('/api/attendance-detail/S-0/', '/api/attendance-by-date-range/S-0/?start=2024-01-02&end=2024-01-05'):
+            sep = '&' if '?' in url else '?'
+            regular = self.client.get(url)
+            response, body = self._streamed(f'{url}{sep}stream=1')
+            self.assertEqual(response['Content-Type'], 'application/json')
+            self.assertEqual(body, regular.content)
+
+    def test_ndjson_one_record_per_line(self):
+        response, body = self._streamed('/api/attendance-detail/S-0/?stream=ndjson&fields=date,status')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = [json.loads(line) for line in body.decode().splitlines()]
+        self.assertEqual(lines[0], {'date': '2024-01-07', 'status': 'A'})
+        self.assertEqual(len(lines), 7)
+
+    def test_empty_history_is_valid_json(self):
+        response, body = self._streamed('/api/attendance-by-date-range/S-0/?start=2023-01-01&end=2023-01-31&stream=1')
+        self.assertEqual(json.loads(body)['records'], [])
+
+    def test_errors_are_not_streamed(self):
+        response = self.client.get('/api/attendance-by-date-range/S-0/?start=2024-01-01&stream=1')
+        self.assertEqual(response.status_code, 400)
+
+    async def test_streams_asynchronously_under_asgi(self):
+        regular = await sync_to_async(self.client.get)('/api/attendance-detail/S-0/')
+        for query in ('?stream=1', '?stream=ndjson'):
+            response = await self.async_client.get(f'/api/attendance-detail/S-0/{query}')
+            # A sync iterator would be read into memory whole by the ASGI handler
+            self.assertTrue(response.is_async)
+            body = b''.join([chunk async for chunk in response.streaming_content])
+            if query == '?stream=1':
+                self.assertEqual(body, regular.content)
+            else:
+                self.assertEqual(len(body.splitlines()), 7)
+
+
+class ExportRecordsTests(TestCase):
+    """Tests for /api/export/ and the export_records command"""
+
+    url = '/api/export/'
+
+    def setUp(self):
+        self.course = Course.objects.create(id='MA101', name='Maths', code='MA101')
+        self.other = Course.objects.create(id='PH101', name='Physics', code='PH101')
+        self.alice, self.bob = _make_students(2)
+        for day in (1, 2, 3):
+            Attendance.objects.create(student=self.alice, course=self.course, date=date(2024, 1, day), status='P')
+        Attendance.objects.create(student=self.bob, course=self.other, date=date(2024, 1, 2), status='A')
+        exam_type = ExamType.objects.create(name='Final', weightage=50)
+        for semester in ('2023-S2', '2024-S1'):
+            exam = Exam.objects.create(course=self.course, exam_type=exam_type, name=f'Final {semester}',
+                                       semester=semester, date=date(2024, 1, 10))
+            Marks.objects.create(student=self.alice, exam=exam, marks_obtained=Decimal('77'))
+        teacher = User.objects.create_user('mrs.k')
+        self.client.force_login(teacher)
+        self.async_client.force_login(teacher)
+
+    def _csv(self, query):
+        response = self.client.get(self.url + query)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return list(csv.DictReader(StringIO(b''.join(response.streaming_content).decode())))
+
+    def test_attendance_filtered_by_course_and_dates(self):
+        rows = self._csv('?dataset=attendance&course=MA101&from=2024-01-02&to=2024-01-03')
+        self.assertEqual([(r['date'], r['student_name'], r['course_name']) for r in rows], [
+            ('2024-01-02', 'Student 0', 'Maths'), ('2024-01-03', 'Student 0', 'Maths'),
+        ])
+
+    def test_marks_filtered_by_semester(self):
+        rows = self._csv('?dataset=marks&semester=2024-S1')
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['exam_name'], 'Final 2024-S1')
+        self.assertEqual(rows[0]['marks_obtained'], '77.00')
+
+    def test_rejects_bad_options(self):
+        self.assertEqual(self.client.get(self.url + '?dataset=grades').status_code, 400)
+        self.assertEqual(self.client.get(self.url + '?dataset=attendance&semester=2024-S1').status_code, 400)
+        self.assertEqual(self.client.get(self.url + '?from=01-01-2024').status_code, 400)
+        self.assertEqual(self.client.get(self.url + '?course=XX999').status_code, 404)
+
+    def test_requires_a_teacher(self):
+        self.client.logout()
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+        student_token = issue_tokens('student', self.alice.id, self.alice.name)['token']
+        response = self.client.get(self.url, headers={'authorization': f'Bearer {student_token}'})
+        self.assertEqual(response.status_code, 403)
+        teacher_token = issue_tokens('teacher', 1, 'Mira K')['token']
+        response = self.client.get(self.url, headers={'authorization': f'Bearer {teacher_token}'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_command_writes_in_chunks(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'attendance.csv')
+            call_command('export_records', 'attendance', output=path, chunk_size=2, stdout=StringIO())
+            with open(path, newline='') as handle:
+                rows = list(csv.DictReader(handle))
+        self.assertEqual(len(rows), 4)
+        self.assertEqual(rows[0]['student_id'], 'S-0')
+
+    async def test_streams_asynchronously_under_asgi(self):
+        response = await self.async_client.get(f'{self.url}?dataset=attendance')
+        self.assertTrue(response.is_async)
+        body = b''.join([chunk async for chunk in response.streaming_content])
+        self.assertEqual(len(list(csv.DictReader(StringIO(body.decode())))), 4)
+
+    @skipUnless(parquet_available(), 'pyarrow is not installed')
+    def test_parquet_export(self):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        tables = {}
+        for dataset in ('attendance', 'marks'):
+            response = self.client.get(f'{self.url}?dataset={dataset}&file_format=parquet')
+            self.assertEqual(response.status_code, 200)
+            tables[dataset] = pq.read_table(BytesIO(b''.join(response.streaming_content)))
+        self.assertEqual(tables['attendance'].num_rows, 4)
+        self.assertEqual(tables['marks'].num_rows, 2)
+        self.assertEqual(tables['attendance'].schema.field('marked_at').type, pa.time64('us'))
+        first = Attendance.objects.order_by('date', 'id').first()
+        self.assertEqual(tables['attendance'].column('marked_at')[0].as_py(), first.marked_at)
+
+
+class AsyncViewsTests(TestCase):
+    """The async read views must answer exactly like the sync ones"""
+
+    def setUp(self):
+        self.course = Course.objects.create(id='MA101', name='Maths', code='MA101')
+        self.alice, = _make_students(1)
+        for day, mark in ((1, 'P'), (2, 'A'), (3, 'P')):
+            Attendance.objects.create(student=self.alice, course=self.course, date=date(2024, 1, day), status=mark)
+        exam_type = ExamType.objects.create(name='Midterm', weightage=30)
+        exam = Exam.objects.create(course=self.course, exam_type=exam_type, name='Midterm')
+        Marks.objects.create(student=self.alice, exam=exam, marks_obtained=Decimal('64.5'))
+        self.factory = AsyncRequestFactory()
+
+    async def _compare(self, view, path, *args):
+        get_cache().clear()
+        expected = await sync_to_async(self.client.get)(path)
+        get_cache().clear()
+        response = await view(self.factory.get(path), *args)
+        self.assertEqual(response.status_code, expected.status_code, path)
+        self.assertEqual(response.content, expected.content, path)
+        return response
+
+    async def test_same_body_as_sync_views(self):
+        await self._compare(async_views.student_dashboard, '/api/student-dashboard/S-0/', 'S-0')
+        await self._compare(async_views.attendance_statistics, '/api/attendance-statistics/S-0/', 'S-0')
+        await self._compare(async_views.attendance_statistics, '/api/attendance-statistics/S-0/?by=month', 'S-0')
+        await self._compare(async_views.student_dashboard, '/api/student-dashboard/S-0/?by=course', 'S-0')
+        await self._compare(async_views.get_marks, '/api/marks/S-0/', 'S-0')
+        await self._compare(async_views.get_attendance_by_date, '/api/attendance-by-date/2024-01-02/', '2024-01-02')
+        await self._compare(async_views.get_attendance_by_date,
+                            '/api/attendance-by-date/2024-01-02/?fields=student,status', '2024-01-02')
+
+    async def test_cache_and_etag(self):
+        get_cache().clear()
+        first = await async_views.student_dashboard(self.factory.get('/'), 'S-0')
+        second = await async_views.student_dashboard(self.factory.get('/'), 'S-0')
+        self.assertEqual((first['X-Cache'], second['X-Cache']), ('MISS', 'HIT'))
+
+        response = await async_views.get_attendance_by_date(self.factory.get('/'), '2024-01-01')
+        again = await async_views.get_attendance_by_date(
+            self.factory.get('/', headers={'If-None-Match': response['ETag']}), '2024-01-01'
+        )
+        self.assertEqual(again.status_code, 304)
+
+    async def test_unknown_student(self):
+        response = await async_views.attendance_statistics(self.factory.get('/'), 'Ghost-1')
+        self.assertEqual(response.status_code, 404)
+
+
+class AttendanceSummaryTests(TestCase):
+    """Tests for the attendance_summary service and ?by= breakdowns"""
+
+    def setUp(self):
+        self.course = Course.objects.create(id='MA101', name='Maths', code='MA101')
+        self.other = Course.objects.create(id='PH101', name='Physics', code='PH101')
+        self.alice, = _make_students(1)
+        rows = [(self.course, date(2024, 1, 5), 'P'), (self.course, date(2024, 2, 5), 'A'),
+                (self.other, date(2024, 2, 6), 'P'), (self.other, date(2024, 2, 7), 'P')]
+        for course, day, mark in rows:
+            Attendance.objects.create(student=self.alice, course=course, date=day, status=mark)
+
+    def test_summary_in_one_query(self):
+        with self.assertNumQueries(1):
+            summary = attendance_summary(student_id='S-0')
+        self.assertEqual(summary, {'total': 4, 'present': 3, 'absent': 1, 'percentage': 75.0})
+        with self.assertNumQueries(1):
+            months = attendance_summary(by='month', student_id='S-0')
+        self.assertEqual([(m['month'], m['total'], m['percentage']) for m in months],
+                         [('2024-01', 1, 100.0), ('2024-02', 3, 66.67)])
+
+    def test_statistics_by_course(self):
+        body = self.client.get('/api/attendance-statistics/S-0/?by=course').json()
+        self.assertEqual(body['attendance_percentage'], 75.0)
+        self.assertEqual(body['breakdown'], [
+            {'course_id': 'MA101', 'course_name': 'Maths', 'total': 2, 'present': 1, 'absent': 1, 'percentage': 50.0},
+            {'course_id': 'PH101', 'course_name': 'Physics', 'total': 2, 'present': 2, 'absent': 0, 'percentage': 100.0},
+        ])
+        self.assertNotIn('breakdown', self.client.get('/api/attendance-statistics/S-0/').json())
+
+    def test_dashboard_by_month_and_bad_value(self):
+        body = self.client.get('/api/student-dashboard/S-0/?by=month').json()
+        self.assertEqual(body['attendance_percentage'], 75)
+        self.assertEqual(len(body['breakdown']), 2)
+        self.assertEqual(self.client.get('/api/student-dashboard/S-0/?by=week').status_code, 400)
+        self.assertEqual(self.client.get('/api/attendance-statistics/S-0/?by=').status_code, 400)
+        self.assertEqual(self.client.get('/api/teacher-attendance-summary/?by=month').status_code, 400)
+
+    def test_session_stats_use_one_aggregate(self):
+        session = AttendanceSession.objects.get(course=self.other, date=date(2024, 2, 6))
+        session.total_students = session.present_count = 0
+        with self.assertNumQueries(2):  # aggregate + save
+            session.calculate_stats()
+        self.assertEqual((session.total_students, session.present_count, session.absent_count), (1, 1, 0))
+
+
+class RecalculateSessionsTests(TestCase):
+    """Tests for the set-based AttendanceSession recompute"""
+
+    def setUp(self):
+        self.course = Course.objects.create(id='MA101', name='Maths', code='MA101')
+        self.other = Course.objects.create(id='PH101', name='Physics', code='PH101')
+        students = _make_students(3)
+        for day in (date(2024, 3, 1), date(2024, 3, 2)):
+            for i, student in enumerate(students):
+                Attendance.objects.create(student=student, course=self.course, date=day,
+                                          status='P' if i or day.day == 1 else 'A')
+        Attendance.objects.create(student=students[0], course=self.other, date=date(2024, 3, 2), status='A')
+        AttendanceSession.objects.create(course=self.other, date=date(2024, 3, 9))
+        # Drift, e.g. from raw SQL
+        AttendanceSession.objects.update(total_students=99, present_count=0, absent_count=0)
+
+    def counts(self):
+        return list(AttendanceSession.objects.order_by('course_id', 'date').values_list(
+            'total_students', 'present_count', 'absent_count'))
+
+    def test_queryset_recalculates_in_constant_queries(self):
+        # sessions + grouped aggregate + one bulk UPDATE, however many sessions
+        with self.assertNumQueries(3):
+            self.assertEqual(AttendanceSession.objects.all().recalculate_stats(), 4)
+        self.assertEqual(self.counts(), [(3, 3, 0), (3, 2, 1), (1, 0, 1), (0, 0, 0)])
+
+    def test_command_filters_by_date_and_course(self):
+        out = StringIO()
+        call_command('recalculate_sessions', '--from', '2024-03-02', '--course', 'MA101', stdout=out)
+        self.assertIn('Recalculated stats for 1 sessions', out.getvalue())
+        self.assertEqual(self.counts(), [(99, 0, 0), (3, 2, 1), (99, 0, 0), (99, 0, 0)])
+
+    def test_migration_recounts_and_adds_missing_sessions(self):
+        migration = importlib.import_module('api.migrations.0008_recalculate_session_counts')
+        AttendanceSession.objects.filter(course=self.course, date=date(2024, 3, 2)).delete()
+        migration.recalculate_sessions(apps, None)
+        self.assertEqual(self.counts(), [(3, 3, 0), (3, 2, 1), (1, 0, 1), (0, 0, 0)])
+
+    def test_session_added_in_admin_is_counted(self):
+        AttendanceSession.objects.filter(course=self.course).delete()
+        self.client.force_login(User.objects.create_superuser('admin', password='x'))
+        response = self.client.post('/admin/api/attendancesession/add/', {
+            'course': 'MA101', 'date': '2024-03-02', 'teacher': '',
+        })
+        self.assertEqual(response.status_code, 302)
+        session = AttendanceSession.objects.get(course=self.course)
+        self.assertEqual((session.total_students, session.present_count, session.absent_count), (3, 2, 1))
+
+
+class AttendanceSessionMaintenanceTests(TestCase):
+    """Tests for session upserts on attendance writes and /api/sessions/"""
+
+    def setUp(self):
+        self.course = Course.objects.create(id='MA101', name='Maths', code='MA101')
+        self.students = _make_students(3)
+
+    def _roll_call(self, day, statuses):
+        return self.client.post('/api/mark-attendance/', {
+            'date': day, 'course_id': 'MA101',
+            'records': [{'student_id': s.id, 'status': v} for s, v in zip(self.students, statuses)],
+        }, content_type='application/json')
+
+    def _counts(self, day):
+        session = AttendanceSession.objects.get(course=self.course, date=day)
+        return session.total_students, session.present_count, session.absent_count
+
+    def test_roll_calls_upsert_the_session(self):
+        self._roll_call('2024-01-06', 'PPA')
+        self.assertEqual(self._counts(date(2024, 1, 6)), (3, 2, 1))
+        self._roll_call('2024-01-06', 'AAA')
+        self.assertEqual(self._counts(date(2024, 1, 6)), (3, 0, 3))
+        self.assertEqual(AttendanceSession.objects.count(), 1)
+
+    def test_model_writes_and_existing_attendance(self):
+        day = date(2024, 1, 7)
+        # Rows written before sessions were tracked are counted on creation
+        Attendance.objects.bulk_create([Attendance(student=self.students[0], course=self.course, date=day, status='P')])
+        record = Attendance.objects.create(student=self.students[1], course=self.course, date=day, status='A')
+        self.assertEqual(self._counts(day), (2, 1, 1))
+        record.date = date(2024, 1, 8)
+        record.save()
+        self.assertEqual((self._counts(day), self._counts(record.date)), ((1, 1, 0), (1, 0, 1)))
+        record.delete()
+        self.assertEqual(self._counts(record.date), (0, 0, 0))
+
+    def test_sessions_endpoint(self):
+        self._roll_call('2024-01-06', 'PPA')
+        self._roll_call('2024-01-09', 'PPP')
+        with self.assertNumQueries(2):  # course check + sessions
+            body = self.client.get('/api/sessions/?course=MA101&from=2024-01-07').json()
+        self.assertEqual(len(body), 1)
+        self.assertEqual((body[0]['date'], body[0]['course_name'], body[0]['percentage']), ('2024-01-09', 'Maths', 100.0))
+        self.assertEqual(len(self.client.get('/api/sessions/').json()), 2)
+        self.assertEqual(self.client.get('/api/sessions/?from=01-07-2024').status_code, 400)
+        self.assertEqual(self.client.get('/api/sessions/?course=NOPE').status_code, 404)
+
+
+class GradingTests(TestCase):
+    """Tests for weighted course totals, GPA and their cached endpoints"""
+
+    def setUp(self):
+        get_cache().clear()
+        maths = Course.objects.create(id='MA101', name='Maths', code='MA101', credits=4)
+        physics = Course.objects.create(id='PH101', name='Physics', code='PH101', credits=2)
+        midterm = ExamType.objects.create(name='Midterm', weightage=40)
+        final = ExamType.objects.create(name='Final', weightage=60)
+        quiz = ExamType.objects.create(name='Quiz', weightage=0)
+        self.alice, self.bob = _make_students(2)
+
+        def exam(course, exam_type, semester, max_marks=100):
+            return Exam.objects.create(course=course, exam_type=exam_type, name=exam_type.name,
+                                       semester=semester, max_marks=max_marks)
+
+        self.midterm = exam(maths, midterm, 'Sem 1', max_marks=50)
+        marks = [
+            (self.alice, self.midterm, '35'), (self.alice, exam(maths, final, 'Sem 1'), '90'),
+            (self.alice, exam(physics, quiz, 'Sem 1', max_marks=10), '6'),
+            (self.alice, exam(maths, midterm, 'Sem 2', max_marks=50), '45'),
+            (self.bob, self.midterm, '25'),
+        ]
+        for student, sat, obtained in marks:
+            Marks.objects.create(student=student, exam=sat, marks_obtained=Decimal(obtained))
+
+    def test_student_gpa(self):
+        body = self.client.get('/api/gpa/S-0/').json()
+        sem1, sem2 = body['semesters']
+        # Maths: (70 * 40 + 90 * 60) / 100 = 82 -> A-; Physics has no weightage: plain 60 -> C+
+        self.assertEqual([(c['course_id'], c['total'], c['grade']) for c in sem1['courses']],
+                         [('MA101', 82.0, 'A-'), ('PH101', 60.0, 'C+')])
+        self.assertEqual((sem1['gpa'], sem1['credits'], sem2['gpa']), (2.87, 6, 4.0))
+        self.assertEqual((body['cgpa'], body['total_credits']), (3.32, 10))
+        self.assertEqual(self.client.get('/api/gpa/NOPE/').status_code, 404)
+
+    def test_course_results_in_one_aggregate(self):
+        with self.assertNumQueries(2):  # course + aggregate
+            body = self.client.get('/api/course-results/MA101/?semester=Sem 1').json()
+        self.assertEqual([(r['student_id'], r['total'], r['grade_point']) for r in body['results']],
+                         [('S-0', 82.0, 3.3), ('S-1', 50.0, 1.3)])
+        self.assertEqual(body['average'], 66.0)
+        self.assertEqual(len(self.client.get('/api/course-results/MA101/').json()['results']), 3)
+
+    def test_results_invalidated_by_marks_and_weightage(self):
+        for url in ('/api/gpa/S-1/', '/api/course-results/MA101/'):
+            self.client.get(url)
+            self.assertEqual(self.client.get(url)['X-Cache'], 'HIT')
+
+        mark = Marks.objects.get(student=self.bob)
+        mark.marks_obtained = Decimal('50')
+        mark.save()
+        response = self.client.get('/api/gpa/S-1/')
+        self.assertEqual((response['X-Cache'], response.json()['cgpa']), ('MISS', 4.0))
+        self.assertEqual(self.client.get('/api/course-results/MA101/')['X-Cache'], 'MISS')
+
+        final = ExamType.objects.get(name='Final')
+        final.weightage = 0
+        final.save()
+        body = self.client.get('/api/gpa/S-0/').json()
+        self.assertEqual(body['semesters'][0]['courses'][0]['total'], 70.0)
+        self.assertEqual(self.client.get('/api/course-results/MA101/')['X-Cache'], 'MISS')
+
+    def test_grade_marks_uses_the_configured_scale(self):
+        marks = [Decimal('45'), Decimal('44.99'), Decimal('0')]
+        percentages, grades = grade_marks(marks, Decimal('50'))
+        self.assertEqual(percentages, [Decimal('90.00'), Decimal('89.98'), Decimal('0.00')])
+        self.assertEqual(grades, ['A+', 'A', 'F'])
+        self.assertEqual(grade_marks([Decimal('5')], [Decimal('0')]), ([None], [None]))
+        with override_settings(GRADING_SCALE=[(50, 'P'), (0, 'F')]):
+            self.assertEqual(grade_marks(marks, Decimal('50'))[1], ['P', 'P', 'F'])
+            self.assertEqual(Marks.grade_for_percentage(None), 'F')
+
+    def test_regrade_exam_command(self):
+        self.client.get('/api/gpa/S-1/')
+        with override_settings(GRADING_SCALE=[(50, 'P'), (0, 'F')]):
+            out = StringIO()
+            call_command('regrade_exam', str(self.midterm.id), stdout=out)
+        self.assertIn('Regraded 2 marks', out.getvalue())
+        self.assertEqual(sorted(self.midterm.student_marks.values_list('grade', flat=True)), ['P', 'P'])
+        self.assertEqual(self.client.get('/api/gpa/S-1/')['X-Cache'], 'MISS')
+        with self.assertRaises(CommandError):
+            call_command('regrade_exam', '999', stdout=StringIO())
+
+
+class MarksAnalyticsTests(TestCase):
+    """Tests for /api/course-marks/<course_id>/analytics/"""
+
+    url = '/api/course-marks/MA101/analytics/'
+
+    def setUp(self):
+        get_cache().clear()
+        course = Course.objects.create(id='MA101', name='Maths', code='MA101')
+        self.midterm = Exam.objects.create(course=course, exam_type=ExamType.objects.create(name='Midterm'),
+                                           name='Midterm', max_marks=50)
+        Exam.objects.create(course=course, exam_type=ExamType.objects.create(name='Quiz'), name='Quiz')
+        for student, obtained in zip(_make_students(5), (10, 20, 30, 40, 50)):
+            Marks.objects.create(student=student, exam=self.midterm, marks_obtained=Decimal(obtained))
+
+    def test_per_exam_statistics(self):
+        with self.assertNumQueries(5):  # course, exams, summary, histogram, ordered percentages
+            midterm, quiz = self.client.get(self.url).json()['exams']
+        self.assertEqual((midterm['count'], midterm['mean'], midterm['median'], midterm['std_dev']),
+                         (5, 60.0, 60.0, 28.28))
+        self.assertEqual(midterm['percentiles'], {'10': 28.0, '25': 40.0, '50': 60.0, '75': 80.0, '90': 92.0})
+        self.assertEqual([midterm['grade_histogram'][g] for g in ('A+', 'A', 'A-', 'C+', 'D', 'F')], [1, 0, 1, 1, 1, 1])
+        self.assertEqual([s['student_id'] for s in midterm['top']], ['S-4', 'S-3', 'S-2', 'S-1', 'S-0'])
+        self.assertEqual((quiz['count'], quiz['median'], quiz['top']), (0, None, []))
+
+        body = self.client.get(f'{self.url}?percentiles=50,99&k=1').json()
+        self.assertEqual(body['exams'][0]['percentiles'], {'50': 60.0, '99': 99.2})
+        self.assertEqual([s['student_id'] for s in body['exams'][0]['bottom']], ['S-0'])
+        self.assertEqual(self.client.get(f'{self.url}?percentiles=150').status_code, 400)
+
+    def test_cached_per_exam_until_marks_change(self):
+        self.client.get(self.url)
+        with self.assertNumQueries(2):
+            self.client.get(self.url)
+
+        (newcomer,) = _make_students(1, start=5)
+        Marks.objects.create(student=newcomer, exam=self.midterm, marks_obtained=Decimal(0))
+        midterm = self.client.get(self.url).json()['exams'][0]
+        self.assertEqual((midterm['count'], midterm['min']), (6, 0.0))
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class LoginTests(TestCase):
+    """Tests for /api/login/ identity resolution"""
+
+    url = '/api/login/'
+
+    def setUp(self):
+        get_cache().clear()
+        self.teacher = User.objects.create_user('mrs.k', password='secret', first_name='Mira', last_name='K')
+        TeacherProfile.objects.create(user=self.teacher, employee_id='T-1', subject='Maths')
+        (self.student,) = _make_students(1)
+
+    def _login(self, username, password='anything'):
+        return self.client.post(self.url, {'id': username, 'password': password}, content_type='application/json')
+
+    def test_teacher_resolved_in_one_query(self):
+        with self.assertNumQueries(1):
+            body = self._login('mrs.k', 'secret').json()
+        self.assertEqual((body['role'], body['user_id'], body['user_name']), ('teacher', str(self.teacher.id), 'Mira K'))
+        response = self._login('mrs.k', 'wrong')
+        self.assertEqual((response.status_code, response.json()['error']), (401, 'The password you entered is incorrect'))
+
+    def test_student_and_unknown_ids_are_cached(self):
+        self._login('S-0')
+        # Only authenticate()'s User lookup is left
+        with self.assertNumQueries(1):
+            body = self._login('S-0').json()
+        self.assertEqual((body['role'], body['user_name']), ('student', 'Student 0'))
+
+        self.assertEqual(self._login('S-9').json()['error'], 'Invalid credentials')
+        with self.assertNumQueries(1):
+            self.assertEqual(self._login('S-9').status_code, 401)
+        Student.objects.create(id='S-9', name='Late Joiner', roll_number='0009')
+        self.assertEqual(self._login('S-9').json()['role'], 'student')
+
+    def test_identity_key_is_safe_for_any_backend(self):
+        key = _identity_key('a name\twith spaces')
+        self.assertRegex(key, r'^identity:[0-9a-f]{64}$')
+        self.assertNotEqual(key, _identity_key('S-0'))
+
+    def test_goes_through_authenticate(self):
+        failed = []
+        user_login_failed.connect(lambda sender, credentials, **kwargs: failed.append(credentials['username']),
+                                  dispatch_uid='test-login-failed', weak=False)
+        self.addCleanup(user_login_failed.disconnect, dispatch_uid='test-login-failed')
+        self.teacher.is_active = False
+        self.teacher.save()
+        response = self._login('mrs.k', 'secret')
+        self.assertEqual((response.status_code, response.json()['error']), (401, 'The password you entered is incorrect'))
+        self.assertEqual(failed, ['mrs.k'])
+
+        # The configured backends decide, not a password check of our own
+        with override_settings(AUTHENTICATION_BACKENDS=['django.contrib.auth.backends.AllowAllUsersModelBackend']):
+            self.assertEqual(self._login('mrs.k', 'secret').json()['role'], 'teacher')
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class AsyncLoginTests(TransactionTestCase):
+    """The async login view authenticates on the login thread pool, which needs committed rows"""
+
+    url = '/api/login/'
+
+    def setUp(self):
+        get_cache().clear()
+        User.objects.create_user('mrs.k', password='secret')
+
+    async def test_async_login(self):
+        factory = AsyncRequestFactory()
+        request = factory.post(self.url, {'id': 'mrs.k', 'password': 'secret'}, content_type='application/json')
+        response = await async_views.login(request)
+        self.assertEqual((response.status_code, json.loads(response.content)['role']), (200, 'teacher'))
+        request = factory.post(self.url, {'id': 'mrs.k', 'password': 'wrong'}, content_type='application/json')
+        self.assertEqual((await async_views.login(request)).status_code, 401)
+        request = factory.post(self.url, {'id': 'mrs.k'}, content_type='application/json')
+        self.assertEqual((await async_views.login(request)).status_code, 400)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class TokenAuthenticationTests(TestCase):
+    """Tests for the signed tokens issued by /api/login/"""
+
+    def setUp(self):
+        get_cache().clear()
+        self.teacher = User.objects.create_user('mrs.k', password='secret', first_name='Mira', last_name='K')
+        _make_students(1)
+
+    def _login(self, username, password='anything'):
+        return self.client.post('/api/login/', {'id': username, 'password': password},
+                                content_type='application/json').json()
+
+    def _me(self, token):
+        return self.client.get('/api/me/', headers={'authorization': f'Bearer {token}'})
+
+    def test_access_token_is_verified_without_queries(self):
+        body = self._login('S-0')
+        with self.assertNumQueries(0):
+            response = self._me(body['token'])
+        self.assertEqual(response.json(), {'role': 'student', 'user_id': 'S-0', 'user_name': 'Student 0'})
+        self.assertEqual(self.client.get('/api/me/').status_code, 401)
+        self.assertEqual(self._me(body['token'][:-2] + 'xx').status_code, 401)
+        # A refresh token is not an access token
+        self.assertEqual(self._me(body['refresh_token']).status_code, 401)
+
+    def test_expired_token_is_rejected(self):
+        with override_settings(API_ACCESS_TOKEN_TTL=-1):
+            body = self._login('S-0')
+        self.assertEqual(self._me(body['token']).json()['detail'], 'Token expired')
+
+    def test_bad_token_leaves_public_endpoints_open(self):
+        for token in ('expired', 'not-a-token'):
+            response = self.client.get('/api/students/', headers={'authorization': f'Bearer {token}'})
+            self.assertEqual(response.status_code, 200)
+        response = self._me('not-a-token')
+        self.assertEqual((response.status_code, response.json()['detail']), (401, 'Invalid token'))
+        self.assertEqual(response['WWW-Authenticate'], 'Bearer')
+
+    def test_refresh_rotates_and_logout_revokes(self):
+        body = self._login('mrs.k', 'secret')
+        refreshed = self.client.post('/api/token/refresh/', {'refresh_token': body['refresh_token']},
+                                     content_type='application/json').json()
+        self.assertEqual(self._me(refreshed['token']).json()['user_name'], 'Mira K')
+        reused = self.client.post('/api/token/refresh/', {'refresh_token': body['refresh_token']},
+                                  content_type='application/json')
+        self.assertEqual(reused.status_code, 401)
+
+        self.client.post('/api/logout/', {'refresh_token': refreshed['refresh_token']},
+                         content_type='application/json', headers={'authorization': f"Bearer {refreshed['token']}"})
+        self.assertEqual(self._me(refreshed['token']).status_code, 401)
+        self.assertEqual(self._me(body['token']).status_code, 200)
+
+        # A session login (which saves last_login) or a profile edit keeps the tokens
+        self.assertTrue(self.client.login(username='mrs.k', password='secret'))
+        self.teacher.refresh_from_db()
+        self.teacher.first_name = 'Mira J'
+        self.teacher.save()
+        self.assertEqual(self._me(body['token']).status_code, 200)
+
+        # Changing the password revokes every token issued so far
+        self.teacher.set_password('new-secret')
+        self.teacher.save()
+        self.assertEqual(self._me(body['token']).status_code, 401)
+
+    def test_deactivation_revokes_tokens(self):
+        body = self._login('mrs.k', 'secret')
+        User.objects.get(pk=self.teacher.pk).save(update_fields=['last_login'])
+        self.assertEqual(self._me(body['token']).status_code, 200)
+        self.teacher.is_active = False
+        self.teacher.save(update_fields=['is_active'])
+        self.assertEqual(self._me(body['token']).status_code, 401)
+
+    def test_teacher_token_records_marked_by(self):
+        token = self._login('mrs.k', 'secret')['token']
+        response = self.client.post(
+            '/api/mark-attendance/',
+            {'date': '2024-01-08', 'records': [{'student_id': 'S-0', 'status': 'P'}]},
+            content_type='application/json', headers={'authorization': f'Bearer {token}'},
+        )
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(Attendance.objects.get().marked_by, self.teacher)
+
+
+class RequestMetricsTests(TestCase):
+    """Tests for the request metrics middleware and /api/_metrics"""
+
+    def setUp(self):
+        get_cache().clear()
+        metrics.reset()
+        _make_students(2)
+
+    def _metrics(self):
+        response = self.client.get('/api/_metrics')
+        self.assertEqual(response['Content-Type'], 'text/plain; version=0.0.4; charset=utf-8')
+        return response.content.decode()
+
+    @override_settings(API_METRICS_SERVER_TIMING=True)
+    def test_records_queries_and_timing_per_view(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/students/')
+        count = len(queries)
+        self.assertRegex(response['Server-Timing'], rf'^total;dur=[\d.]+, db;dur=[\d.]+;desc="{count} queries", render;dur=[\d.]+$')
+
+        text = self._metrics()
+        self.assertIn('api_responses_total{view="get_students",status="200"} 1', text)
+        self.assertIn(f'api_request_queries_sum{{view="get_students"}} {count}', text)
+        self.assertIn('api_request_duration_seconds_bucket{view="get_students",le="+Inf"} 1', text)
+        self.assertIn(f'api_response_size_bytes_sum{{view="get_students"}} {len(response.content)}', text)
+        # The metrics endpoint does not measure itself
+        self.assertNotIn('view="metrics"', self._metrics())
+
+    async def test_counts_queries_of_sync_views_under_asgi(self):
+        response = await AsyncClient().get('/api/students/')
+        self.assertEqual(response.status_code, 200)
+        text = await sync_to_async(self._metrics)()
+        self.assertIn('api_request_queries_count{view="get_students"} 1', text)
+        self.assertNotIn('api_request_queries_sum{view="get_students"} 0\n', text)
+
+    @override_settings(API_METRICS_SAMPLE_RATE=0)
+    def test_sample_rate_zero_disables_middleware(self):
+        response = self.client.get('/api/students/')
+        self.assertNotIn('Server-Timing', response)
+        self.assertNotIn('get_students', self._metrics())
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class QueryPatternTests(TestCase):
+    """Every endpoint in api/urls.py, run under the N+1 query detector"""
+
+    students = 8  # above the repeat threshold, so a per-row query is caught
+
+    def setUp(self):
+        get_cache().clear()
+        self.teacher = User.objects.create_user('mrs.k', password='secret')
+        TeacherProfile.objects.create(user=self.teacher, employee_id='T-1', subject='Maths')
+        students = _make_students(self.students)
+        courses = [Course.objects.create(id=code, name=code, code=code, credits=3) for code in ('MA101', 'PH101')]
+        exam_types = [ExamType.objects.create(name=name, weightage=50) for name in ('Midterm', 'Final')]
+        Attendance.objects.bulk_create([
+            Attendance(student=student, course=course, date=date(2024, 1, day), status='PA'[(i + day) % 2])
+            for i, student in enumerate(students) for course in courses for day in (1, 2, 3)
+        ])
+        for course in courses:
+            AttendanceSession.objects.create(course=course, date=date(2024, 1, 1), total_students=self.students)
+            for exam_type in exam_types:
+                exam = Exam.objects.create(course=course, exam_type=exam_type, name=exam_type.name,
+                                           semester='2024-S1', max_marks=50)
+                Marks.objects.bulk_create([
+                    Marks(student=student, exam=exam, marks_obtained=Decimal(20 + i), percentage=Decimal(40 + 2 * i),
+                          grade='C')
+                    for i, student in enumerate(students)
+                ])
+
+    def _json(self, method, url, data):
+        return getattr(self.client, method)(url, data, content_type='application/json')
+
+    def _requests(self):
+        """(url name, callable making the request) for every endpoint"""
+        records = [{'student_id': f'S-{i}', 'status': 'P'} for i in range(self.students)]
+        marks = [{'student_id': f'S-{i}', 'marks_obtained': 30} for i in range(self.students)]
+        marks_file = 'student_id,marks_obtained\n' + ''.join(f'S-{i},{i}\n' for i in range(self.students))
+        login = self._json('post', '/api/login/', {'id': 'mrs.k', 'password': 'secret'}).json()
+        bearer = {'authorization': f"Bearer {login['token']}"}
+        return [
+            ('login', lambda: self._json('post', '/api/login/', {'id': 'S-1', 'password': 'x'})),
+            ('refresh_token', lambda: self._json('post', '/api/token/refresh/',
+                                                 {'refresh_token': login['refresh_token']})),
+            ('current_user', lambda: self.client.get('/api/me/', headers=bearer)),
+            ('get_students', lambda: self.client.get('/api/students/?page_size=5')),
+            ('get_courses', lambda: self.client.get('/api/courses/')),
+            ('mark_attendance', lambda: self.client.post(
+                '/api/mark-attendance/', {'date': '2024-01-04', 'course_id': 'MA101', 'records': records},
+                content_type='application/json', headers=bearer)),
+            ('student_dashboard', lambda: self.client.get('/api/student-dashboard/S-0/?by=course')),
+            ('attendance_by_date', lambda: self.client.get('/api/attendance-by-date/2024-01-01/')),
+            ('attendance_detail', lambda: self.client.get('/api/attendance-detail/S-0/?stream=1')),
+            ('attendance_statistics', lambda: self.client.get('/api/attendance-statistics/S-0/?by=month')),
+            ('teacher_attendance_summary', lambda: self.client.get('/api/teacher-attendance-summary/?by=course')),
+            ('attendance_by_date_range', lambda: self.client.get(
+                '/api/attendance-by-date-range/S-0/?start=2024-01-01&end=2024-01-31')),
+            ('attendance_report', lambda: self.client.get('/api/attendance-report/?course=MA101&date=2024-01-01')),
+            ('attendance_sessions', lambda: self.client.get('/api/sessions/')),
+            ('get_marks', lambda: self.client.get('/api/marks/S-0/')),
+            ('upload_marks', lambda: self._json('post', '/api/upload-marks/',
+                                                {'course_id': 'MA101', 'exam_type': 'quiz', 'records': marks})),
+            ('upload_marks_file', lambda: self.client.post('/api/upload-marks/file/', {
+                'file': SimpleUploadedFile('marks.csv', marks_file.encode(), content_type='text/csv'),
+                'course_id': 'PH101', 'exam_type': 'midterm', 'max_marks': 50,
+            })),
+            ('get_course_marks', lambda: self.client.get('/api/course-marks/MA101/')),
+            ('get_course_marks_analytics', lambda: self.client.get('/api/course-marks/MA101/analytics/')),
+            ('get_student_gpa', lambda: self.client.get('/api/gpa/S-0/')),
+            ('get_course_results', lambda: self.client.get('/api/course-results/MA101/')),
+            ('export_records', lambda: self.client.get('/api/export/?dataset=marks', headers=bearer)),
+            ('cache_stats', lambda: self.client.get('/api/cache-stats/')),
+            ('metrics', lambda: self.client.get('/api/_metrics')),
+            ('logout', lambda: self.client.post('/api/logout/', headers=bearer)),
+        ]
+
+    def test_every_endpoint_is_free_of_repeated_queries(self):
+        requests = self._requests()
+        self.assertEqual({name for name, _ in requests}, {pattern.name for pattern in urls.urlpatterns})
+        for name, make_request in requests:
+            with self.subTest(endpoint=name), detect_repeated_queries(label=name):
+                response = make_request()
+                if response.streaming:
+                    b''.join(response.streaming_content)
+                self.assertLess(response.status_code, 400, response.content if not response.streaming else name)
+
+    def test_detector_reports_per_row_queries(self):
+        with self.assertRaises(RepeatedQueriesError) as raised, detect_repeated_queries(label='loop'):
+            for record in Attendance.objects.filter(date=date(2024, 1, 1)):
+                record.student.name
+        self.assertIn(f'{self.students * 2}x SELECT', str(raised.exception))
+        self.assertIn('in test_detector_reports_per_row_queries', str(raised.exception))
+
+        with self.assertLogs('api.querycheck', 'WARNING'):
+            with detect_repeated_queries(action='warn'):
+                for student in Student.objects.all():
+                    student.attendance_records.count()
+
+    def test_fingerprint_ignores_literals_and_in_list_length(self):
+        self.assertEqual(fingerprint("SELECT * FROM t WHERE id = 5 AND name = 'x''y'"),
+                         'SELECT * FROM t WHERE id = ? AND name = ?')
+        self.assertEqual(fingerprint('SELECT 1 FROM t WHERE id IN (%s, %s, %s)'),
+                         fingerprint('SELECT 1 FROM t WHERE id IN (%s)'))
+
+    @override_settings(API_QUERY_PATTERN_CHECK='raise')
+    def test_attendance_report_passes_middleware_in_raise_mode(self):
+        self.assertEqual(self.client.get('/api/attendance-report/?course=MA101&date=2024-01-01').status_code, 200)
+
+
+class AdminChangelistTests(TestCase):
+    """Tests for the Student, Attendance and Marks admin changelists"""
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser('admin', password='x'))
+        course = Course.objects.create(id='MA101', name='Maths', code='MA101')
+        students = _make_students(8)
+        Attendance.objects.bulk_create([
+            Attendance(student=student, course=course, date=day, status='P')
+            for student in students for day in (date(2023, 12, 29), date(2024, 1, 2), date(2024, 2, 5))
+        ])
+        AttendanceSession.objects.bulk_create([
+            AttendanceSession(course=course, date=day) for day in (date(2023, 12, 29), date(2024, 1, 2), date(2024, 2, 5))
+        ])
+        exam = Exam.objects.create(course=course, exam_type=ExamType.objects.create(name='Final'), name='Final')
+        Marks.objects.bulk_create([Marks(student=student, exam=exam, marks_obtained=50) for student in students])
+
+    def _changelist(self, url):
+        with detect_repeated_queries(label=url):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_changelists_render_without_per_row_queries(self):
+        for url in ('/admin/api/student/', '/admin/api/attendance/', '/admin/api/marks/',
+                    '/admin/api/attendancesession/', '/admin/api/attendance/?date__year=2024&date__month=1'):
+            with self.subTest(url=url):
+                self._changelist(url)
+        self.assertEqual(self._changelist('/admin/api/attendance/?date__year=2024').context['cl'].result_count, 16)
+
+    def test_date_search_is_an_exact_match(self):
+        cl = self._changelist('/admin/api/attendance/?q=2024-02-05').context['cl']
+        self.assertEqual(cl.result_count, 8)
+        self.assertIsNone(cl.full_result_count)  # show_full_result_count = False
+
+    def test_date_hierarchy_reads_sessions_not_attendance(self):
+        # Attendance without a course has no session
+        Attendance.objects.create(student_id='S-0', date=date(2022, 6, 1), status='P')
+        with CaptureQueriesContext(connection) as queries:
+            response = self._changelist('/admin/api/attendance/?status__exact=P')
+        hierarchy = [query['sql'] for query in queries if 'MIN(' in query['sql'] or 'DISTINCT' in query['sql']]
+        self.assertEqual(len(hierarchy), 4)
+        for sql in hierarchy:
+            self.assertTrue('FROM "api_attendancesession"' in sql or '"course_id" IS NULL' in sql, sql)
+        for year in (2022, 2023, 2024):
+            self.assertContains(response, f'date__year={year}')
+        self.assertEqual(response.context['cl'].result_count, 25)
+
+        response = self._changelist('/admin/api/attendance/?date__year=2022')
+        self.assertContains(response, 'date__month=6')
+
+    def test_distinct_dates_match_queryset_dates(self):
+        queryset = DistinctDatesQuerySet(Attendance)
+        for kind in ('year', 'month', 'week', 'day'):
+            self.assertEqual(queryset.dates('date', kind, 'DESC'), list(Attendance.objects.dates('date', kind, 'DESC')))
+
+    def test_large_unfiltered_table_count_is_estimated(self):
+        paginator = EstimatedCountPaginator(Attendance.objects.order_by('-date'), 100)
+        paginator.estimate_above = 1
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(paginator.count, Attendance.objects.order_by().last().pk)
+        self.assertIn('MAX(rowid)', queries[0]['sql'])
+        filtered = EstimatedCountPaginator(Attendance.objects.filter(status='P'), 100)
+        filtered.estimate_above = 1
+        self.assertEqual(filtered.count, 24)
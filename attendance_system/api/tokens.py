@@ -0,0 +1,233 @@
+"""
+Signed, stateless API tokens.
+
+``/api/login/`` issues an access token and a refresh token, both made with
+``django.core.signing`` (HMAC over SECRET_KEY, with a separate salt per kind
+so one cannot be used as the other). An access token carries everything a
+request needs -- role, id and name -- so ``TokenAuthentication`` checks the
+signature, expiry and revocation list without touching the database. A bad
+token leaves the request anonymous, so public endpoints keep answering a
+client whose token went stale; ``IsAuthenticated`` turns it into a 401 that
+says why.
+Verified payloads are memoised per token string, so a client reusing its
+token pays for the HMAC once.
+
+``/api/token/refresh/`` trades a refresh token for a new pair and revokes
+the old refresh token; ``/api/logout/`` revokes the tokens it is given.
+Revocations are held in memory until the token would have expired anyway,
+so with several worker processes a revoked access token stays usable on the
+other workers for at most ``API_ACCESS_TOKEN_TTL`` seconds. Changing a
+User's password, deactivating or deleting them, and deleting a Student
+revoke every token issued to them before that moment, in this process.
+Other saves (``last_login`` on a session login, say) leave tokens alone.
+"""
+import threading
+import time
+import uuid
+from functools import lru_cache
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core import signing
+from django.db.models.signals import post_delete, post_save, pre_save
+from rest_framework import exceptions, permissions
+from rest_framework.authentication import BaseAuthentication, get_authorization_header
+
+from .models import Student
+
+ACCESS = 'access'
+REFRESH = 'refresh'
+SALTS = {ACCESS: 'api.tokens.access', REFRESH: 'api.tokens.refresh'}
+KEYWORD = b'bearer'
+
+_lock = threading.Lock()
+_revoked_ids = {}  # token id -> expiry; dropped once the token expires anyway
+_revoked_before = {}  # (role, subject) -> time before which their tokens are revoked
+
+
+def access_ttl():
+    return getattr(settings, 'API_ACCESS_TOKEN_TTL', 15 * 60)
+
+
+def refresh_ttl():
+    return getattr(settings, 'API_REFRESH_TOKEN_TTL', 7 * 24 * 60 * 60)
+
+
+def _sign(kind, role, subject, name, ttl, now):
+    return signing.dumps(
+        {'typ': kind, 'role': role, 'sub': subject, 'name': name,
+         'jti': uuid.uuid4().hex, 'iat': now, 'exp': now + ttl},
+        salt=SALTS[kind],
+    )
+
+
+def issue_tokens(role, subject, name):
+    """``{'token', 'refresh_token', 'expires_in'}`` for a logged-in teacher or student"""
+    now = time.time()
+    return {
+        'token': _sign(ACCESS, role, str(subject), name, access_ttl(), now),
+        'refresh_token': _sign(REFRESH, role, str(subject), name, refresh_ttl(), now),
+        'expires_in': access_ttl(),
+    }
+
+
+@lru_cache(maxsize=4096)
+def _unsign(token, kind):
+    # Only good signatures are memoised; BadSignature propagates uncached
+    return signing.loads(token, salt=SALTS[kind])
+
+
+def _purge(now):
+    for token_id, expires in list(_revoked_ids.items()):
+        if expires <= now:
+            del _revoked_ids[token_id]
+
+
+def is_revoked(payload):
+    revoked_before = _revoked_before.get((payload['role'], payload['sub']))
+    return payload['jti'] in _revoked_ids or (revoked_before is not None and payload['iat'] <= revoked_before)
+
+
+def verify(token, kind=ACCESS):
+    """The payload of a valid ``kind`` token; raises ``signing.BadSignature`` otherwise"""
+    payload = _unsign(token, kind)
+    if payload.get('typ') != kind:
+        raise signing.BadSignature('Wrong token type')
+    if payload['exp'] <= time.time():
+        raise signing.SignatureExpired('Token expired')
+    if is_revoked(payload):
+        raise signing.BadSignature('Token revoked')
+    return payload
+
+
+def revoke(payload):
+    """Reject the token of ``payload`` from now until it expires"""
+    now = time.time()
+    with _lock:
+        _purge(now)
+        _revoked_ids[payload['jti']] = payload['exp']
+
+
+def revoke_subject(role, subject):
+    """Reject every token issued to ``subject`` so far"""
+    with _lock:
+        _revoked_before[(role, str(subject))] = time.time()
+
+
+def refresh(token):
+    """A new token pair for a valid refresh token, which is revoked"""
+    payload = verify(token, REFRESH)
+    revoke(payload)
+    return issue_tokens(payload['role'], payload['sub'], payload['name'])
+
+
+class TokenUser:
+    """The identity of an access token; ``request.user`` for token-authenticated requests"""
+
+    is_authenticated = True
+    is_anonymous = False
+    is_active = True
+
+    def __init__(self, payload):
+        self.role = payload['role']
+        self.pk = self.id = payload['sub']
+        self.name = payload['name']
+
+    def __str__(self):
+        return self.name
+
+    @property
+    def is_teacher(self):
+        return self.role == 'teacher'
+
+
+def acting_user(request):
+    """The User to record as marked_by/uploaded_by for ``request``, without a query"""
+    user = request.user
+    if isinstance(user, User):
+        return user if user.is_authenticated else None
+    if isinstance(user, TokenUser) and user.is_teacher:
+        return User(pk=int(user.id), username=user.name)
+    return None
+
+
+class TokenAuthentication(BaseAuthentication):
+    """
+    ``Authorization: Bearer <access token>``. Requests without the header, or
+    with a bad token, fall through to the next authentication class; the
+    reason a token was refused is kept as ``request.token_error``.
+    """
+
+    def authenticate(self, request):
+        request.token_error = None
+        header = get_authorization_header(request).split()
+        if not header or header[0].lower() != KEYWORD:
+            return None
+        if len(header) != 2:
+            request.token_error = 'Invalid Authorization header'
+            return None
+        try:
+            payload = verify(header[1].decode())
+        except signing.SignatureExpired:
+            request.token_error = 'Token expired'
+            return None
+        except (signing.BadSignature, UnicodeDecodeError):
+            request.token_error = 'Invalid token'
+            return None
+        return TokenUser(payload), payload
+
+    def authenticate_header(self, request):
+        return 'Bearer'
+
+
+class IsAuthenticated(permissions.IsAuthenticated):
+    """DRF's IsAuthenticated, answering a refused bearer token with its reason"""
+
+    def has_permission(self, request, view):
+        if super().has_permission(request, view):
+            return True
+        error = getattr(request, 'token_error', None)
+        if error:
+            raise exceptions.AuthenticationFailed(error)
+        return False
+
+
+class IsTeacher(IsAuthenticated):
+    """Teachers only: a teacher's access token or a logged-in Django User"""
+
+    def has_permission(self, request, view):
+        if not super().has_permission(request, view):
+            return False
+        user = request.user
+        return isinstance(user, User) or getattr(user, 'is_teacher', False)
+
+
+def _note_credentials(sender, instance, update_fields=None, **kwargs):
+    # The stored password hash and is_active, for _revoke_changed_user to compare
+    instance._api_token_credentials = None
+    if instance.pk is None or (update_fields is not None and not {'password', 'is_active'} & set(update_fields)):
+        return
+    instance._api_token_credentials = (
+        User.objects.filter(pk=instance.pk).values_list('password', 'is_active').first()
+    )
+
+
+def _revoke_changed_user(sender, instance, **kwargs):
+    stored = getattr(instance, '_api_token_credentials', None)
+    if stored is not None and stored != (instance.password, instance.is_active):
+        revoke_subject('teacher', instance.pk)
+
+
+def _revoke_user(sender, instance, **kwargs):
+    revoke_subject('teacher', instance.pk)
+
+
+def _revoke_student(sender, instance, **kwargs):
+    revoke_subject('student', instance.pk)
+
+
+def connect_signals():
+    pre_save.connect(_note_credentials, sender=User, dispatch_uid='api-tokens-user-credentials')
+    post_save.connect(_revoke_changed_user, sender=User, dispatch_uid='api-tokens-user-save')
+    post_delete.connect(_revoke_user, sender=User, dispatch_uid='api-tokens-user-delete')
+    post_delete.connect(_revoke_student, sender=Student, dispatch_uid='api-tokens-student-delete')
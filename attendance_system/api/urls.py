@@ -1,11 +1,18 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, views
+
+# Async versions of the hot read views and login under ASGI (see API_ASYNC_VIEWS)
+read_views = async_views if settings.API_ASYNC_VIEWS else views
 
 app_name = 'api'
 
 urlpatterns = [
     # Authentication
-    path('login/', views.login, name='login'),
+    path('login/', read_views.login, name='login'),
+    path('token/refresh/', views.refresh_token, name='refresh_token'),
+    path('logout/', views.logout, name='logout'),
+    path('me/', views.current_user, name='current_user'),
     
     # Student endpoints
     path('students/', views.get_students, name='get_students'),
@@ -15,16 +22,16 @@ urlpatterns = [
     path('mark-attendance/', views.mark_attendance, name='mark_attendance'),
     
     # Student dashboard
-    path('student-dashboard/<str:student_id>/', views.student_dashboard, name='student_dashboard'),
+    path('student-dashboard/<str:student_id>/', read_views.student_dashboard, name='student_dashboard'),
     
     # Attendance by date
-    path('attendance-by-date/<str:attendance_date>/', views.get_attendance_by_date, name='attendance_by_date'),
+    path('attendance-by-date/<str:attendance_date>/', read_views.get_attendance_by_date, name='attendance_by_date'),
     
     # Attendance detail view
     path('attendance-detail/<str:student_id>/', views.attendance_detail, name='attendance_detail'),
     
     # Attendance statistics
-    path('attendance-statistics/<str:student_id>/', views.attendance_statistics, name='attendance_statistics'),
+    path('attendance-statistics/<str:student_id>/', read_views.attendance_statistics, name='attendance_statistics'),
     
     # Teacher attendance summary (all students)
     path('teacher-attendance-summary/', views.teacher_attendance_summary, name='teacher_attendance_summary'),
@@ -34,9 +41,28 @@ urlpatterns = [
     
     # Attendance report
     path('attendance-report/', views.attendance_report, name='attendance_report'),
+
+    # Per-session counts (one session per course and date)
+    path('sessions/', views.attendance_sessions, name='attendance_sessions'),
     
     # Marks endpoints
-    path('marks/<str:student_id>/', views.get_marks, name='get_marks'),
+    path('marks/<str:student_id>/', read_views.get_marks, name='get_marks'),
     path('upload-marks/', views.upload_marks, name='upload_marks'),
+    path('upload-marks/file/', views.upload_marks_file, name='upload_marks_file'),
     path('course-marks/<str:course_id>/', views.get_course_marks, name='get_course_marks'),
+    path('course-marks/<str:course_id>/analytics/', views.get_course_marks_analytics,
+         name='get_course_marks_analytics'),
+
+    # Weighted results and GPA
+    path('gpa/<str:student_id>/', views.get_student_gpa, name='get_student_gpa'),
+    path('course-results/<str:course_id>/', views.get_course_results, name='get_course_results'),
+
+    # Bulk export for institutional reporting
+    path('export/', views.export_records, name='export_records'),
+
+    # Response cache counters
+    path('cache-stats/', views.get_cache_stats, name='cache_stats'),
+
+    # Request timing and query histograms (Prometheus text format)
+    path('_metrics', views.get_metrics, name='metrics'),
 ]
\ No newline at end of file
@@ -2,14 +2,33 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from rest_framework import status
+from rest_framework.exceptions import APIException
 from django.shortcuts import get_object_or_404
-from django.contrib.auth import authenticate
-from django.contrib.auth.models import User
+from django.http import HttpResponse
+from django.views.decorators.http import require_GET
+from django.core import signing
+from django.db import transaction
+from django.db.models import Count, ExpressionWrapper, F, FloatField, Max, Q, Sum
+from django.db.models.functions import Coalesce
 from datetime import datetime
-from .models import Student, Attendance, Course, ExamType, Exam, Marks
+from .models import Student, Attendance, AttendanceSession, Course, ExamType, Marks, StudentAttendanceStats
+from .bulk import upsert_attendance, prepare_exam, write_marks, to_decimal
+from .stats import BREAKDOWNS, attendance_percentage, attendance_summary, student_totals
+from .grading import course_results, student_gpa
+from .analytics import DEFAULT_PERCENTILES, DEFAULT_TOP_K, exam_analytics
+from .auth import resolve_login
+from .tokens import IsAuthenticated, IsTeacher, TokenUser, acting_user, refresh as refresh_tokens, revoke, verify as verify_token
+from .cache import cached_course_response, cached_student_response, cache_stats
+from .metrics import render_prometheus
+from .conditional import conditional_get, table_version
+from .marks_import import DEFAULT_CHUNK_SIZE, MarksImportError, import_marks, iter_rows
+from .pagination import paginate, requested_fields
+from .fast_serializers import attendance_rows, attendance_values, course_marks_by_exam, student_marks_rows
+from .streaming import stream_mode, streaming_attendance_response, streaming_response
+from .export import CONTENT_TYPES as EXPORT_CONTENT_TYPES, ExportError, export_queryset, iter_export
 from .serializers import (
     LoginSerializer, StudentSerializer, AttendanceSerializer,
-    AttendanceCreateSerializer, AttendanceReportSerializer
+    AttendanceCreateSerializer, AttendanceReportSerializer, AttendanceSessionSerializer
 )
 import logging
 
@@ -17,14 +36,22 @@ logger = logging.getLogger(__name__)
 
 @api_view(['GET'])
 @permission_classes([AllowAny])
+@cached_student_response('dashboard')
 def student_dashboard(request, student_id):
     """
     GET: Get student's attendance data for dashboard
     
-    URL: /api/student-dashboard/<student_id>/
-    Returns: Complete student dashboard with all attendance statistics
+    URL: /api/student-dashboard/<student_id>/?by=course|month
+    Returns: Complete student dashboard with all attendance statistics;
+    ``by`` adds a per-course or per-month ``breakdown``
     """
     try:
+        by = request.query_params.get('by')
+        if by is not None and by not in BREAKDOWNS:
+            return Response(
+                {'error': f"by must be one of: {', '.join(BREAKDOWNS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         student = get_object_or_404(Student, id=student_id)
         
         # Get all attendance records for this student
@@ -32,15 +59,14 @@ def student_dashboard(request, student_id):
             student=student
         ).order_by('-date')
         
-        # Calculate statistics
-        total_classes = attendance_records.count()
-        present_classes = attendance_records.filter(status='P').count()
-        absent_classes = attendance_records.filter(status='A').count()
+        # Statistics come from the maintained counters, not a recount
+        totals = student_totals(student.id)
+        total_classes = totals['total']
+        present_classes = totals['present']
+        absent_classes = totals['absent']
         
-        if total_classes > 0:
-            attendance_percentage = round((present_classes / total_classes) * 100)
-        else:
-            attendance_percentage = 0
+        # Whole percent on the dashboard
+        percentage = attendance_percentage(present_classes, total_classes, digits=None)
         
         # Format attendance history
         attendance_history = []
@@ -58,9 +84,11 @@ def student_dashboard(request, student_id):
             'total_classes': total_classes,
             'present_count': present_classes,
             'absent_count': absent_classes,
-            'attendance_percentage': attendance_percentage,
+            'attendance_percentage': percentage,
             'attendance_history': attendance_history
         }
+        if by:
+            response_data['breakdown'] = attendance_summary(by=by, student_id=student.id)
         
         return Response(response_data, status=status.HTTP_200_OK)
     
@@ -102,90 +130,10 @@ def login(request):
         
         logger.info(f"Login attempt for username: {username}")
         
-        # Try to authenticate as Django User first (for teachers/admin)
-        # This takes priority over student login for security
-        user = authenticate(username=username, password=password)
-        
-        if user:
-            logger.info(f"User authenticated: {user.username}")
-            # Determine user role
-            role = None
-            user_id = None
-            user_name = None
-            
-            # Check if user is a teacher (has TeacherProfile)
-            try:
-                from .models import TeacherProfile
-                teacher_profile = TeacherProfile.objects.get(user=user)
-                role = 'teacher'
-                # FIXED: Convert to string for consistency
-                user_id = str(user.id)
-                user_name = user.get_full_name() or user.username
-                logger.info(f"User is a teacher: {user_name}")
-            except TeacherProfile.DoesNotExist:
-                # Check if user is staff (admin/teacher)
-                if user.is_staff or user.is_superuser:
-                    role = 'teacher'
-                    # FIXED: Convert to string for consistency
-                    user_id = str(user.id)
-                    user_name = user.get_full_name() or user.username
-                    logger.info(f"User is staff/teacher: {user_name}")
-                else:
-                    # Default to teacher for authenticated users
-                    role = 'teacher'
-                    # FIXED: Convert to string for consistency
-                    user_id = str(user.id)
-                    user_name = user.get_full_name() or user.username
-                    logger.info(f"User authenticated as teacher (default): {user_name}")
-            
-            return Response({
-                'success': True,
-                'role': role,
-                'user_id': user_id,
-                'user_name': user_name,
-                'message': 'Login successful',
-                'token': None  # Can add JWT token here if needed
-            }, status=status.HTTP_200_OK)
-        
-        # If Django User authentication failed, check if it's a student ID
-        # (students can login with just their ID for demo purposes)
-        try:
-            student = Student.objects.get(id=username)
-            logger.info(f"Found student: {student.name} (ID: {student.id})")
-            # For demo: allow login with student ID and any password
-            # In production, create User accounts for students
-            return Response({
-                'success': True,
-                'role': 'student',
-                'user_id': student.id,  # Already string (CharField)
-                'user_name': student.name,
-                'message': 'Login successful',
-                'token': None
-            }, status=status.HTTP_200_OK)
-        except Student.DoesNotExist:
-            logger.debug(f"Student with ID '{username}' not found")
-            pass
-        
-        # Both authentication methods failed
-        logger.warning(f"Authentication failed for username: {username}")
-        
-        # Check if username exists but password is wrong
-        try:
-            from django.contrib.auth.models import User
-            if User.objects.filter(username=username).exists():
-                return Response({
-                    'success': False,
-                    'message': 'Invalid password. Please check your password.',
-                    'error': 'The password you entered is incorrect'
-                }, status=status.HTTP_401_UNAUTHORIZED)
-        except Exception as e:
-            logger.error(f"Error checking user existence: {str(e)}")
-        
-        return Response({
-            'success': False,
-            'message': 'Invalid credentials. Username not found. Please check your username and password, or run "python manage.py setup_default_users" to create default users.',
-            'error': 'Invalid credentials'
-        }, status=status.HTTP_401_UNAUTHORIZED)
+        # Django Users (teachers/admin) take priority over student ids; the
+        # student lookup after a failed authenticate() is cached
+        status_code, body = resolve_login(username, password, request)
+        return Response(body, status=status_code)
             
     except Exception as e:
         logger.error(f"Error in login: {str(e)}", exc_info=True)
@@ -196,6 +144,69 @@ def login(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@api_view(['POST'])
+@permission_classes([AllowAny])
+def refresh_token(request):
+    """
+    POST: Exchange a refresh token for a new access and refresh token
+
+    URL: /api/token/refresh/
+    Body: {"refresh_token": "..."}
+    Returns: New token, refresh_token and expires_in; the old refresh token is revoked
+    """
+    token = request.data.get('refresh_token')
+    if not token:
+        return Response({'error': 'refresh_token is required'}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        return Response({'success': True, **refresh_tokens(token)}, status=status.HTTP_200_OK)
+    except signing.SignatureExpired:
+        return Response({'error': 'Refresh token expired'}, status=status.HTTP_401_UNAUTHORIZED)
+    except signing.BadSignature:
+        return Response({'error': 'Invalid refresh token'}, status=status.HTTP_401_UNAUTHORIZED)
+
+
+@api_view(['POST'])
+@permission_classes([AllowAny])
+def logout(request):
+    """
+    POST: Revoke the request's access token and, if given, its refresh token
+
+    URL: /api/logout/
+    Body: {"refresh_token": "..."} (optional)
+    Returns: Success message
+    """
+    if isinstance(request.auth, dict):
+        revoke(request.auth)
+    token = request.data.get('refresh_token')
+    if token:
+        try:
+            revoke(verify_token(token, 'refresh'))
+        except signing.BadSignature:
+            pass  # already expired, revoked or never valid
+    return Response({'success': True, 'message': 'Logged out'}, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def current_user(request):
+    """
+    GET: The identity the request is authenticated as
+
+    URL: /api/me/
+    Returns: role, user_id and user_name (from the access token, without a query)
+    """
+    user = request.user
+    if isinstance(user, TokenUser):
+        return Response({'role': user.role, 'user_id': user.id, 'user_name': user.name})
+    return Response({'role': 'teacher', 'user_id': str(user.id), 'user_name': user.get_full_name() or user.username})
+
+
+def _students_version(request):
+    stamp = Student.objects.aggregate(count=Count('id'), last=Max('updated_at'))
+    return (stamp['count'], stamp['last']), stamp['last']
+
+
+@conditional_get(_students_version)
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def get_students(request):
@@ -203,12 +214,18 @@ def get_students(request):
     GET: Get list of all students
     
     URL: /api/students/
-    Returns: List of all students
+    Query: ?page_size=&cursor= (paginate), ?fields=id,name (sparse rows)
+    Returns: List of all students, or {next, previous, results} when paginated
     """
     try:
-        students = Student.objects.all()
-        serializer = StudentSerializer(students, many=True)
+        fields = requested_fields(request, StudentSerializer)
+        students, paginator = paginate(request, Student.objects.all(), ('roll_number', 'id'))
+        serializer = StudentSerializer(students, many=True, fields=fields)
+        if paginator:
+            return paginator.get_paginated_response(serializer.data)
         return Response(serializer.data, status=status.HTTP_200_OK)
+    except APIException as e:
+        return Response({'error': e.detail}, status=e.status_code)
     except Exception as e:
         logger.error(f"Error in get_students: {str(e)}", exc_info=True)
         return Response(
@@ -224,45 +241,39 @@ def mark_attendance(request):
     POST: Mark attendance for students
     
     URL: /api/mark-attendance/
-    Body: {"date": "2024-01-06", "records": [{"student_id": "Arjun-101", "status": "P"}, ...]}
-    Returns: Created attendance records
+    Body: {"date": "2024-01-06", "course_id": "CS201", "records": [{"student_id": "Arjun-101", "status": "P"}, ...]}
+    Returns: Created/updated attendance records and the student ids that were not found
+    (course_id is optional)
     """
     try:
         serializer = AttendanceCreateSerializer(data=request.data)
         if serializer.is_valid():
             date = serializer.validated_data['date']
             records = serializer.validated_data['records']
-            
-            created_records = []
-            for record_data in records:
-                student_id = record_data['student_id']
-                status_value = record_data['status']
-                
+            course_id = serializer.validated_data.get('course_id')
+
+            course = None
+            if course_id:
                 try:
-                    student = Student.objects.get(id=student_id)
-                    # Get or create attendance record (course can be None)
-                    attendance, created = Attendance.objects.get_or_create(
-                        student=student,
-                        date=date,
-                        course=None,  # Allow None for course
-                        defaults={'status': status_value}
+                    course = Course.objects.get(id=course_id)
+                except Course.DoesNotExist:
+                    return Response(
+                        {'error': f'Course {course_id} not found'},
+                        status=status.HTTP_404_NOT_FOUND
                     )
-                    if not created:
-                        attendance.status = status_value
-                        attendance.save()
-                    
-                    created_records.append(AttendanceSerializer(attendance).data)
-                except Student.DoesNotExist:
-                    logger.warning(f"Student {student_id} not found")
-                    continue
-                except Exception as e:
-                    logger.error(f"Error creating attendance for student {student_id}: {str(e)}")
-                    continue
-            
+
+            marked_by = acting_user(request)
+            stored, unknown_ids = upsert_attendance(date, records, course=course, marked_by=marked_by)
+            if unknown_ids:
+                logger.warning(f"Unknown student ids in mark_attendance: {unknown_ids}")
+
+            created_records = AttendanceSerializer(stored, many=True).data
+
             return Response({
                 'success': True,
                 'message': f'Attendance marked for {len(created_records)} students',
-                'records': created_records
+                'records': created_records,
+                'unknown_student_ids': unknown_ids
             }, status=status.HTTP_201_CREATED)
         
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -274,6 +285,18 @@ def mark_attendance(request):
         )
 
 
+def _attendance_by_date_version(request, attendance_date):
+    try:
+        date_obj = datetime.strptime(attendance_date, '%Y-%m-%d').date()
+    except ValueError:
+        return None, None
+    stamp = Attendance.objects.filter(date=date_obj).aggregate(count=Count('id'), last=Max('updated_at'))
+    # Student and course names are part of every row
+    versions = (table_version(Student), table_version(Course))
+    return (stamp['count'], stamp['last'], versions), None
+
+
+@conditional_get(_attendance_by_date_version)
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def get_attendance_by_date(request, attendance_date):
@@ -281,7 +304,8 @@ def get_attendance_by_date(request, attendance_date):
     GET: Get attendance records for a specific date
     
     URL: /api/attendance-by-date/<attendance_date>/
-    Returns: List of attendance records for the date
+    Query: ?page_size=&cursor= (paginate), ?fields=student_id,status (sparse rows)
+    Returns: List of attendance records for the date, or {next, previous, results} when paginated
     
     FIXED: Now returns actual attendance records instead of empty list
     """
@@ -289,23 +313,28 @@ def get_attendance_by_date(request, attendance_date):
         # Parse the date string
         date_obj = datetime.strptime(attendance_date, '%Y-%m-%d').date()
         
+        fields = requested_fields(request, AttendanceSerializer)
+        
         # Query attendance records for this date
-        attendance_records = Attendance.objects.filter(
-            date=date_obj
-        ).select_related('student', 'course')
+        attendance_records = attendance_values(Attendance.objects.filter(date=date_obj), fields)
+        attendance_records, paginator = paginate(request, attendance_records, ('id',))
         
         # Serialize and return
-        serializer = AttendanceSerializer(attendance_records, many=True)
+        data = attendance_rows(attendance_records, fields)
         
-        logger.info(f"Retrieved {len(attendance_records)} attendance records for {attendance_date}")
+        logger.info(f"Retrieved {len(data)} attendance records for {attendance_date}")
         
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        if paginator:
+            return paginator.get_paginated_response(data)
+        return Response(data, status=status.HTTP_200_OK)
     
     except ValueError:
         return Response(
             {'error': 'Invalid date format. Use YYYY-MM-DD'},
             status=status.HTTP_400_BAD_REQUEST
         )
+    except APIException as e:
+        return Response({'error': e.detail}, status=e.status_code)
     except Exception as e:
         logger.error(f"Error in get_attendance_by_date: {str(e)}", exc_info=True)
         return Response(
@@ -321,23 +350,30 @@ def attendance_detail(request, student_id):
     GET: Detailed attendance records for a student
 
     URL: /api/attendance-detail/<student_id>/
+    Query: ?page_size=&cursor= (paginate, adds next/previous), ?fields= (sparse records),
+           ?stream=1 or ?stream=ndjson (stream the whole history instead of paginating)
     """
     try:
+        fields = requested_fields(request, AttendanceSerializer)
         student = get_object_or_404(Student, id=student_id)
-        records = (
-            Attendance.objects.filter(student=student)
-            .select_related('course')
-            .order_by('-date')
-        )
-        serializer = AttendanceSerializer(records, many=True)
-        return Response(
-            {
-                'student_id': student.id,
-                'student_name': student.name,
-                'records': serializer.data,
-            },
-            status=status.HTTP_200_OK,
-        )
+        history = Attendance.objects.filter(student=student).order_by('-date')
+        mode = stream_mode(request)
+        if mode:
+            envelope = {'student_id': student.id, 'student_name': student.name}
+            return streaming_attendance_response(request, mode, history, envelope, fields)
+        records = attendance_values(history, fields)
+        records, paginator = paginate(request, records, ('-date', '-id'))
+        data = {
+            'student_id': student.id,
+            'student_name': student.name,
+        }
+        if paginator:
+            data['next'] = paginator.get_next_link()
+            data['previous'] = paginator.get_previous_link()
+        data['records'] = attendance_rows(records, fields)
+        return Response(data, status=status.HTTP_200_OK)
+    except APIException as e:
+        return Response({'error': e.detail}, status=e.status_code)
     except Exception as e:
         logger.error(f"Error in attendance_detail: {str(e)}", exc_info=True)
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -349,27 +385,33 @@ def attendance_statistics(request, student_id):
     """
     GET: Summary statistics for a student's attendance
 
-    URL: /api/attendance-statistics/<student_id>/
+    URL: /api/attendance-statistics/<student_id>/?by=course|month
+    Returns: Totals and percentage; ``by`` adds a per-course or per-month ``breakdown``
     """
     try:
+        by = request.query_params.get('by')
+        if by is not None and by not in BREAKDOWNS:
+            return Response(
+                {'error': f"by must be one of: {', '.join(BREAKDOWNS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         student = get_object_or_404(Student, id=student_id)
-        qs = Attendance.objects.filter(student=student)
-        total = qs.count()
-        present = qs.filter(status='P').count()
-        absent = qs.filter(status='A').count()
-        percentage = round((present / total) * 100, 2) if total else 0
+        totals = student_totals(student.id)
+        total = totals['total']
+        present = totals['present']
+        absent = totals['absent']
 
-        return Response(
-            {
-                'student_id': student.id,
-                'student_name': student.name,
-                'total_classes': total,
-                'present': present,
-                'absent': absent,
-                'attendance_percentage': percentage,
-            },
-            status=status.HTTP_200_OK,
-        )
+        data = {
+            'student_id': student.id,
+            'student_name': student.name,
+            'total_classes': total,
+            'present': present,
+            'absent': absent,
+            'attendance_percentage': attendance_percentage(present, total),
+        }
+        if by:
+            data['breakdown'] = attendance_summary(by=by, student_id=student.id)
+        return Response(data, status=status.HTTP_200_OK)
     except Exception as e:
         logger.error(f"Error in attendance_statistics: {str(e)}", exc_info=True)
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -381,28 +423,149 @@ def teacher_attendance_summary(request):
     """
     GET: Attendance summary for all students (teacher view)
 
-    URL: /api/teacher-attendance-summary/
+    URL: /api/teacher-attendance-summary/?course=<course_id>&from=YYYY-MM-DD&to=YYYY-MM-DD&below=<pct>&by=course
+    Returns: One row per student. ``below`` keeps only students with at least one
+    class whose percentage is under the threshold (defaulter list); ``by=course``
+    adds a per-course breakdown to every row.
     """
     try:
-        students = Student.objects.all()
+        by = request.query_params.get('by')
+        if by is not None and by != 'course':
+            return Response({'error': 'by must be: course'}, status=status.HTTP_400_BAD_REQUEST)
+
+        # The same conditions are needed against Attendance directly and through
+        # the Student -> attendance_records join used by the aggregates.
+        attendance_filter = Q()
+        student_filter = Q()
+        course_id = request.query_params.get('course')
+        if course_id:
+            if not Course.objects.filter(id=course_id).exists():
+                return Response({'error': 'Course not found'}, status=status.HTTP_404_NOT_FOUND)
+            attendance_filter &= Q(course_id=course_id)
+            student_filter &= Q(attendance_records__course_id=course_id)
+
+        try:
+            date_from = request.query_params.get('from')
+            date_to = request.query_params.get('to')
+            if date_from:
+                date_from = datetime.strptime(date_from, '%Y-%m-%d').date()
+                attendance_filter &= Q(date__gte=date_from)
+                student_filter &= Q(attendance_records__date__gte=date_from)
+            if date_to:
+                date_to = datetime.strptime(date_to, '%Y-%m-%d').date()
+                attendance_filter &= Q(date__lte=date_to)
+                student_filter &= Q(attendance_records__date__lte=date_to)
+        except ValueError:
+            return Response(
+                {'error': 'Invalid date format. Use YYYY-MM-DD'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        below = request.query_params.get('below')
+        if below is not None:
+            try:
+                below = float(below)
+            except ValueError:
+                return Response(
+                    {'error': 'below must be a number (percentage)'},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+
+        use_counters = not (date_from or date_to)
+        if use_counters:
+            # Without a date range the maintained counters answer directly:
+            # one counter row per student (overall, or the requested course).
+            stats_filter = (
+                Q(attendance_stats__course_id=course_id) if course_id
+                else Q(attendance_stats__course__isnull=True)
+            )
+            students = Student.objects.annotate(
+                total=Coalesce(Sum('attendance_stats__total', filter=stats_filter), 0),
+                present=Coalesce(Sum('attendance_stats__present', filter=stats_filter), 0),
+                absent=Coalesce(Sum('attendance_stats__absent', filter=stats_filter), 0),
+            )
+        else:
+            # Single GROUP BY over students LEFT JOIN attendance; the filters live in
+            # the aggregates so students without matching records still report zeros.
+            students = Student.objects.annotate(
+                total=Count('attendance_records', filter=student_filter),
+                present=Count('attendance_records', filter=student_filter & Q(attendance_records__status='P')),
+                absent=Count('attendance_records', filter=student_filter & Q(attendance_records__status='A')),
+            )
+        if below is not None:
+            students = students.filter(total__gt=0).alias(
+                present_pct=ExpressionWrapper(
+                    F('present') * 100.0 / F('total'), output_field=FloatField()
+                )
+            ).filter(present_pct__lt=below)
+
         summary = []
-        for student in students:
-            qs = Attendance.objects.filter(student=student)
-            total = qs.count()
-            present = qs.filter(status='P').count()
-            absent = qs.filter(status='A').count()
-            percentage = round((present / total) * 100, 2) if total else 0
+        for student in students.values('id', 'name', 'roll_number', 'total', 'present', 'absent'):
+            total = student['total']
             summary.append(
                 {
-                    'student_id': student.id,
-                    'student_name': student.name,
-                    'roll_number': student.roll_number,
+                    'student_id': student['id'],
+                    'student_name': student['name'],
+                    'roll_number': student['roll_number'],
                     'total_classes': total,
-                    'present': present,
-                    'absent': absent,
-                    'attendance_percentage': percentage,
+                    'present': student['present'],
+                    'absent': student['absent'],
+                    'attendance_percentage': round((student['present'] / total) * 100, 2) if total else 0,
                 }
             )
+
+        if by == 'course' and summary:
+            if use_counters:
+                breakdown = (
+                    StudentAttendanceStats.objects.filter(
+                        attendance_filter, course__isnull=False, student_id__in=students.values('id')
+                    )
+                    .values('student_id', 'course_id', 'course__name', 'total', 'present', 'absent')
+                    .order_by('student_id', 'course_id')
+                )
+            else:
+                breakdown = (
+                    Attendance.objects.filter(attendance_filter, student_id__in=students.values('id'))
+                    .values('student_id', 'course_id', 'course__name')
+                    .annotate(
+                        total=Count('id'),
+                        present=Count('id', filter=Q(status='P')),
+                        absent=Count('id', filter=Q(status='A')),
+                    )
+                    .order_by('student_id', 'course_id')
+                )
+            courses_by_student = {}
+            for row in breakdown:
+                total = row['total']
+                courses_by_student.setdefault(row['student_id'], []).append(
+                    {
+                        'course_id': row['course_id'],
+                        'course_name': row['course__name'],
+                        'total_classes': total,
+                        'present': row['present'],
+                        'absent': row['absent'],
+                        'attendance_percentage': round((row['present'] / total) * 100, 2) if total else 0,
+                    }
+                )
+            for row in summary:
+                courses = courses_by_student.get(row['student_id'], [])
+                if use_counters and not course_id:
+                    # Attendance taken without a course only shows up in the overall counter
+                    uncounted = {
+                        key: row[key] - sum(course[key] for course in courses)
+                        for key in ('total_classes', 'present', 'absent')
+                    }
+                    if uncounted['total_classes'] > 0:
+                        courses.insert(0, {
+                            'course_id': None,
+                            'course_name': None,
+                            **uncounted,
+                            'attendance_percentage': round(
+                                (uncounted['present'] / uncounted['total_classes']) * 100, 2
+                            ),
+                        })
+                row['courses'] = courses
+
         return Response(summary, status=status.HTTP_200_OK)
     except Exception as e:
         logger.error(f"Error in teacher_attendance_summary: {str(e)}", exc_info=True)
@@ -416,6 +579,7 @@ def attendance_by_date_range(request, student_id):
     GET: Attendance records for a student within a date range.
 
     URL: /api/attendance-by-date-range/<student_id>/?start=YYYY-MM-DD&end=YYYY-MM-DD
+    Query: ?stream=1 (same JSON, streamed) or ?stream=ndjson (one record per line)
     """
     try:
         student = get_object_or_404(Student, id=student_id)
@@ -432,20 +596,18 @@ def attendance_by_date_range(request, student_id):
 
         records = (
             Attendance.objects.filter(student=student, date__range=(start_date, end_date))
-            .select_related('course')
             .order_by('-date')
         )
-        serializer = AttendanceSerializer(records, many=True)
-        return Response(
-            {
-                'student_id': student.id,
-                'student_name': student.name,
-                'start': start,
-                'end': end,
-                'records': serializer.data,
-            },
-            status=status.HTTP_200_OK,
-        )
+        envelope = {
+            'student_id': student.id,
+            'student_name': student.name,
+            'start': start,
+            'end': end,
+        }
+        mode = stream_mode(request)
+        if mode:
+            return streaming_attendance_response(request, mode, records, envelope)
+        return Response({**envelope, 'records': attendance_rows(records)}, status=status.HTTP_200_OK)
     except ValueError:
         return Response(
             {'error': 'Invalid date format. Use YYYY-MM-DD'},
@@ -489,25 +651,24 @@ def attendance_report(request):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        attendance_records = Attendance.objects.filter(
-            course=course,
-            date=date_obj
-        )
+        # One query: the student columns are joined in and the counts taken from the rows
+        student_records = [
+            {
+                'student_id': record['student_id'],
+                'student_name': record['student__name'],
+                'roll_number': record['student__roll_number'],
+                'status': record['status']
+            }
+            for record in Attendance.objects.filter(course=course, date=date_obj).values(
+                'student_id', 'student__name', 'student__roll_number', 'status'
+            )
+        ]
         
-        total_students = attendance_records.count()
-        present = attendance_records.filter(status='P').count()
-        absent = attendance_records.filter(status='A').count()
+        total_students = len(student_records)
+        present = sum(1 for record in student_records if record['status'] == 'P')
+        absent = sum(1 for record in student_records if record['status'] == 'A')
         present_percentage = (present / total_students * 100) if total_students > 0 else 0
         
-        student_records = []
-        for record in attendance_records:
-            student_records.append({
-                'student_id': record.student.id,
-                'student_name': record.student.name,
-                'roll_number': record.student.roll_number,
-                'status': record.status
-            })
-        
         report_data = {
             'course': course.name,
             'date': date_str,
@@ -525,11 +686,54 @@ def attendance_report(request):
             {'error': str(e)},
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def attendance_sessions(request):
+    """
+    GET: Per-session attendance counts, maintained on every attendance write
+
+    URL: /api/sessions/?course=<course_id>&from=YYYY-MM-DD&to=YYYY-MM-DD
+    Query: ?page_size=&cursor= (paginate)
+    Returns: One row per course and date with total/present/absent and percentage,
+    newest first; the Attendance table is not read
+    """
+    try:
+        sessions = AttendanceSession.objects.select_related('course')
+        course_id = request.query_params.get('course')
+        if course_id:
+            if not Course.objects.filter(id=course_id).exists():
+                return Response({'error': 'Course not found'}, status=status.HTTP_404_NOT_FOUND)
+            sessions = sessions.filter(course_id=course_id)
+
+        try:
+            date_from = request.query_params.get('from')
+            date_to = request.query_params.get('to')
+            if date_from:
+                sessions = sessions.filter(date__gte=datetime.strptime(date_from, '%Y-%m-%d').date())
+            if date_to:
+                sessions = sessions.filter(date__lte=datetime.strptime(date_to, '%Y-%m-%d').date())
+        except ValueError:
+            return Response(
+                {'error': 'Invalid date format. Use YYYY-MM-DD'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        sessions, paginator = paginate(request, sessions.order_by('-date', 'course_id'), ('-date', 'course_id'))
+        data = AttendanceSessionSerializer(sessions, many=True).data
+        if paginator:
+            return paginator.get_paginated_response(data)
+        return Response(data, status=status.HTTP_200_OK)
+    except Exception as e:
+        logger.error(f"Error in attendance_sessions: {str(e)}", exc_info=True)
+        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
  
 # ==================== marks management ====================
 
 @api_view(['GET'])
 @permission_classes([AllowAny])
+@cached_student_response('marks')
 def get_marks(request, student_id):
     """
     GET: Get all marks for a student
@@ -539,24 +743,8 @@ def get_marks(request, student_id):
     """
     try:
         student = get_object_or_404(Student, id=student_id)
-        marks = (
-            Marks.objects.filter(student=student)
-            .select_related('exam', 'exam__course', 'exam__exam_type')
-            .order_by('-created_at')
-        )
-
-        marks_data = []
-        for mark in marks:
-            marks_data.append({
-                'id': mark.id,
-                'course_id': mark.exam.course.id,
-                'course_name': mark.exam.course.name,
-                'exam_type': mark.exam.exam_type.name,
-                'marks_obtained': float(mark.marks_obtained),
-                'max_marks': float(mark.exam.max_marks),
-                'percentage': float(mark.percentage) if mark.percentage is not None else 0,
-                'grade': mark.grade,
-            })
+        marks = Marks.objects.filter(student=student).order_by('-created_at')
+        marks_data = student_marks_rows(marks)
         
         return Response({
             'student_id': student.id,
@@ -586,14 +774,15 @@ def upload_marks(request):
             ...
         ]
     }
-    Returns: Created/Updated marks records
+    Returns: Created/updated/rejected counts and a per-row result (with the
+    rejection reason). max_marks may also be given once at the top level.
     """
     try:
         course_id = request.data.get('course_id')
         exam_type = request.data.get('exam_type')
         records = request.data.get('records', [])
         
-        if not course_id or not exam_type or not records:
+        if not course_id or not exam_type or not records or not isinstance(records, list):
             return Response({
                 'success': False,
                 'error': 'course_id, exam_type, and records are required'
@@ -607,66 +796,39 @@ def upload_marks(request):
                 'error': f'Course {course_id} not found'
             }, status=status.HTTP_404_NOT_FOUND)
         
-        created_records = []
-        updated_count = 0
+        # One max_marks per exam: the request-level value, else the first record's
+        max_marks = request.data.get('max_marks')
+        if max_marks in (None, ''):
+            max_marks = next(
+                (r.get('max_marks') for r in records if isinstance(r, dict) and r.get('max_marks') not in (None, '')),
+                100
+            )
+        max_marks = to_decimal(max_marks)
+        if max_marks is None or max_marks <= 0:
+            return Response({
+                'success': False,
+                'error': 'max_marks must be a positive number'
+            }, status=status.HTTP_400_BAD_REQUEST)
 
-        # Ensure ExamType + Exam exist for this course/exam_type
-        exam_type_obj, _ = ExamType.objects.get_or_create(
-            name=str(exam_type).strip().title()
-        )
-        exam, _ = Exam.objects.get_or_create(
-            course=course,
-            exam_type=exam_type_obj,
-            defaults={
-                'name': f'{exam_type_obj.name} - {course.code}',
-                'max_marks': 100,
-            }
-        )
-        
-        for record in records:
-            student_id = record.get('student_id')
-            marks_obtained = record.get('marks_obtained')
-            max_marks = record.get('max_marks', 100)
-            
-            if not student_id or marks_obtained is None:
-                continue
-            
-            try:
-                student = Student.objects.get(id=student_id)
+        records = [r if isinstance(r, dict) else {} for r in records]
+        uploaded_by = acting_user(request)
+        with transaction.atomic():
+            exam = prepare_exam(course, exam_type, max_marks)
+            results = write_marks(exam, records, uploaded_by=uploaded_by)
 
-                # Update exam max marks for this upload batch
-                try:
-                    exam.max_marks = max_marks
-                    exam.save()
-                except Exception:
-                    # Non-fatal; marks can still save
-                    pass
-
-                mark, created = Marks.objects.get_or_create(
-                    student=student,
-                    exam=exam,
-                    defaults={'marks_obtained': marks_obtained},
-                )
-                
-                if not created:
-                    mark.marks_obtained = marks_obtained
-                    mark.save()
-                    updated_count += 1
-                else:
-                    created_records.append(mark)
-                
-            except Student.DoesNotExist:
-                logger.warning(f"Student {student_id} not found")
-                continue
-            except Exception as e:
-                logger.error(f"Error creating mark for student {student_id}: {str(e)}")
-                continue
+        created_count = sum(1 for r in results if r['status'] == 'created')
+        updated_count = sum(1 for r in results if r['status'] == 'updated')
+        rejected_count = sum(1 for r in results if r['status'] == 'rejected')
+        if rejected_count:
+            logger.warning(f"upload_marks rejected {rejected_count} rows for {course_id}/{exam_type}")
         
         return Response({
             'success': True,
-            'message': f'Marks uploaded. Created: {len(created_records)}, Updated: {updated_count}',
-            'created': len(created_records),
-            'updated': updated_count
+            'message': f'Marks uploaded. Created: {created_count}, Updated: {updated_count}, Rejected: {rejected_count}',
+            'created': created_count,
+            'updated': updated_count,
+            'rejected': rejected_count,
+            'results': results
         }, status=status.HTTP_201_CREATED)
     
     except Exception as e:
@@ -677,6 +839,95 @@ def upload_marks(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@api_view(['POST'])
+@permission_classes([AllowAny])
+def upload_marks_file(request):
+    """
+    POST: Import marks from a CSV or XLSX spreadsheet
+    
+    URL: /api/upload-marks/file/
+    Body (multipart): file=<spreadsheet>, course_id=CS201, exam_type=midterm,
+                      max_marks=100 (optional), chunk_size=500 (optional)
+    Columns: student_id, marks_obtained, max_marks (optional)
+    Returns: Import summary with per-line errors
+    """
+    try:
+        upload = request.FILES.get('file')
+        course_id = request.data.get('course_id')
+        exam_type = request.data.get('exam_type')
+
+        if not upload or not course_id or not exam_type:
+            return Response({
+                'success': False,
+                'error': 'file, course_id and exam_type are required'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            course = Course.objects.get(id=course_id)
+        except Course.DoesNotExist:
+            return Response({
+                'success': False,
+                'error': f'Course {course_id} not found'
+            }, status=status.HTTP_404_NOT_FOUND)
+
+        try:
+            chunk_size = int(request.data.get('chunk_size') or DEFAULT_CHUNK_SIZE)
+        except ValueError:
+            chunk_size = 0
+        if chunk_size <= 0:
+            return Response({
+                'success': False,
+                'error': 'chunk_size must be a positive integer'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        def log_progress(summary):
+            logger.info(f"upload_marks_file {upload.name}: {summary['processed']} rows processed")
+
+        try:
+            rows = iter_rows(upload.file, upload.name, request.data.get('format'))
+            summary = import_marks(
+                course,
+                exam_type,
+                rows,
+                max_marks=request.data.get('max_marks'),
+                uploaded_by=acting_user(request),
+                chunk_size=chunk_size,
+                progress=log_progress,
+            )
+        except MarksImportError as e:
+            # A file that fails partway keeps the chunks written before it (see e.summary)
+            return Response({
+                'success': False,
+                'error': str(e),
+                **(e.summary or {})
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            'success': True,
+            'message': (
+                f"Marks imported. Created: {summary['created']}, "
+                f"Updated: {summary['updated']}, Rejected: {summary['rejected']}"
+            ),
+            **summary
+        }, status=status.HTTP_201_CREATED)
+
+    except Exception as e:
+        logger.error(f"Error in upload_marks_file: {str(e)}", exc_info=True)
+        return Response({
+            'success': False,
+            'error': str(e)
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+def _course_marks_version(request, course_id):
+    stamp = Marks.objects.filter(exam__course_id=course_id).aggregate(
+        count=Count('id'), last=Max('updated_at'), exam_last=Max('exam__updated_at')
+    )
+    versions = tuple(table_version(model) for model in (Student, Course, ExamType))
+    return (stamp['count'], stamp['last'], stamp['exam_last'], versions), None
+
+
+@conditional_get(_course_marks_version)
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def get_course_marks(request, course_id):
@@ -691,26 +942,11 @@ def get_course_marks(request, course_id):
 
         marks = (
             Marks.objects.filter(exam__course=course)
-            .select_related('student', 'exam', 'exam__exam_type')
             .order_by('exam__exam_type__name', 'student__name')
         )
 
         # Group by exam type name
-        marks_by_exam = {}
-        for mark in marks:
-            exam_type_name = mark.exam.exam_type.name
-            if exam_type_name not in marks_by_exam:
-                marks_by_exam[exam_type_name] = []
-
-            marks_by_exam[exam_type_name].append({
-                'student_id': mark.student.id,
-                'student_name': mark.student.name,
-                'roll_number': mark.student.roll_number,
-                'marks_obtained': float(mark.marks_obtained),
-                'max_marks': float(mark.exam.max_marks),
-                'percentage': float(mark.percentage) if mark.percentage is not None else 0,
-                'grade': mark.grade,
-            })
+        marks_by_exam = course_marks_by_exam(marks)
         
         return Response({
             'course_id': course.id,
@@ -725,6 +961,108 @@ def get_course_marks(request, course_id):
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def get_course_marks_analytics(request, course_id):
+    """
+    GET: Class-wide marks analytics per exam (teacher view)
+
+    URL: /api/course-marks/<course_id>/analytics/?semester=<semester>&percentiles=10,25,50,75,90&k=5
+    Returns: Per exam: count, mean, median, std_dev, min, max and percentiles of the
+    percentage, a grade histogram and the top/bottom ``k`` students
+    """
+    try:
+        course = Course.objects.get(id=course_id)
+
+        try:
+            raw = request.query_params.get('percentiles')
+            points = DEFAULT_PERCENTILES
+            if raw:
+                points = tuple(int(float(p)) if float(p).is_integer() else float(p) for p in raw.split(','))
+            k = int(request.query_params.get('k', DEFAULT_TOP_K))
+            if not all(0 <= p <= 100 for p in points) or not 0 <= k <= 100:
+                raise ValueError
+        except ValueError:
+            return Response(
+                {'error': 'percentiles must be numbers between 0 and 100 and k an integer between 0 and 100'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        exams = course.exams.select_related('exam_type').order_by('semester', 'exam_type__name', 'id')
+        semester = request.query_params.get('semester')
+        if semester:
+            exams = exams.filter(semester=semester)
+
+        return Response({
+            'course_id': course.id,
+            'course_name': course.name,
+            'exams': exam_analytics(list(exams), points, k),
+        }, status=status.HTTP_200_OK)
+    except Course.DoesNotExist:
+        return Response({'error': 'Course not found'}, status=status.HTTP_404_NOT_FOUND)
+    except Exception as e:
+        logger.error(f"Error in get_course_marks_analytics: {str(e)}", exc_info=True)
+        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+@cached_student_response('gpa')
+def get_student_gpa(request, student_id):
+    """
+    GET: Credit-weighted GPA of a student
+
+    URL: /api/gpa/<student_id>/
+    Returns: Cumulative GPA and, per semester, the GPA and each course's
+    weightage-weighted total, grade and grade point
+    """
+    try:
+        student = Student.objects.get(id=student_id)
+        return Response({
+            'student_id': student.id,
+            'student_name': student.name,
+            **student_gpa(student.id),
+        }, status=status.HTTP_200_OK)
+    except Student.DoesNotExist:
+        return Response({'error': 'Student not found'}, status=status.HTTP_404_NOT_FOUND)
+    except Exception as e:
+        logger.error(f"Error in get_student_gpa: {str(e)}", exc_info=True)
+        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+@cached_course_response('results')
+def get_course_results(request, course_id):
+    """
+    GET: Every student's weighted total in a course (teacher view)
+
+    URL: /api/course-results/<course_id>/?semester=<semester>
+    Returns: One row per student and semester with total, grade and grade
+    point, plus the class average
+    """
+    try:
+        course = Course.objects.get(id=course_id)
+        return Response({
+            'course_id': course.id,
+            'course_name': course.name,
+            'credits': course.credits,
+            **course_results(course.id, request.query_params.get('semester')),
+        }, status=status.HTTP_200_OK)
+    except Course.DoesNotExist:
+        return Response({'error': 'Course not found'}, status=status.HTTP_404_NOT_FOUND)
+    except Exception as e:
+        logger.error(f"Error in get_course_results: {str(e)}", exc_info=True)
+        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+def _courses_version(request):
+    # Course has no updated_at; edits are tracked by the table version counter
+    stamp = Course.objects.aggregate(count=Count('id'), last=Max('created_at'))
+    return (stamp['count'], stamp['last'], table_version(Course)), None
+
+
+@conditional_get(_courses_version)
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def get_courses(request):
@@ -732,13 +1070,81 @@ def get_courses(request):
     GET: Get all courses
     
     URL: /api/courses/
-    Returns: List of all courses
+    Query: ?page_size=&cursor= (paginate), ?fields=id,name (sparse rows)
+    Returns: List of all courses, or {next, previous, results} when paginated
     """
     try:
-        courses = Course.objects.all()
         from .serializers import CourseSerializer
-        serializer = CourseSerializer(courses, many=True)
+        fields = requested_fields(request, CourseSerializer)
+        courses, paginator = paginate(request, Course.objects.all(), ('id',))
+        serializer = CourseSerializer(courses, many=True, fields=fields)
+        if paginator:
+            return paginator.get_paginated_response(serializer.data)
         return Response(serializer.data, status=status.HTTP_200_OK)
+    except APIException as e:
+        return Response({'error': e.detail}, status=e.status_code)
     except Exception as e:
         logger.error(f"Error in get_courses: {str(e)}", exc_info=True)
+        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def get_cache_stats(request):
+    """
+    GET: Response cache hit/miss counters
+    
+    URL: /api/cache-stats/
+    Returns: Hits, misses, invalidations and hit rate for this process
+    """
+    return Response(cache_stats(), status=status.HTTP_200_OK)
+
+
+@require_GET
+def get_metrics(request):
+    """
+    GET: Request timing and query metrics of this process
+
+    URL: /api/_metrics
+    Returns: Histograms per view in the Prometheus text format
+    """
+    return HttpResponse(render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+@api_view(['GET'])
+@permission_classes([IsTeacher])
+def export_records(request):
+    """
+    GET: Download attendance or marks joined with student/course/exam details (teachers only)
+    
+    URL: /api/export/?dataset=attendance|marks&from=YYYY-MM-DD&to=YYYY-MM-DD
+         &course=<course_id>&semester=<semester>&file_format=csv|parquet
+    Returns: A streamed CSV (or Parquet, when pyarrow is installed) attachment
+    """
+    try:
+        dataset = request.query_params.get('dataset', 'attendance')
+        file_format = request.query_params.get('file_format', 'csv')
+        date_from = request.query_params.get('from')
+        date_to = request.query_params.get('to')
+        date_from = datetime.strptime(date_from, '%Y-%m-%d').date() if date_from else None
+        date_to = datetime.strptime(date_to, '%Y-%m-%d').date() if date_to else None
+
+        course_id = request.query_params.get('course')
+        if course_id and not Course.objects.filter(id=course_id).exists():
+            return Response({'error': 'Course not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        queryset = export_queryset(
+            dataset, date_from, date_to, course_id, request.query_params.get('semester')
+        )
+        chunks = iter_export(dataset, file_format, queryset)
+
+        response = streaming_response(request, chunks, EXPORT_CONTENT_TYPES[file_format])
+        response['Content-Disposition'] = f'attachment; filename="{dataset}-export.{file_format}"'
+        logger.info(f"Export of {dataset} as {file_format} started")
+        return response
+    except ExportError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    except ValueError:
+        return Response({'error': 'Invalid date format. Use YYYY-MM-DD'}, status=status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        logger.error(f"Error in export_records: {str(e)}", exc_info=True)
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'attendance_system.settings')
+# Route the hot read views to their async versions (api/async_views.py)
+os.environ.setdefault('API_ASYNC_VIEWS', '1')
 
 application = get_asgi_application()
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -44,6 +45,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.metrics.RequestMetricsMiddleware',  # first, so it times the whole stack
+    'api.querycheck.QueryPatternMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -87,6 +90,58 @@ DATABASES = {
 # This is probably already there or empty
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# The 'api' cache holds per-student dashboard/marks responses and the table
+# versions behind the list ETags. Pick the backend with
+# API_CACHE_BACKEND=locmem|file|db|redis|memcached (db needs
+# `python manage.py createcachetable`; redis and memcached read
+# API_CACHE_LOCATION, e.g. redis://127.0.0.1:6379/1 or 127.0.0.1:11211, and
+# need the redis or pymemcache package installed).
+# locmem lives inside one process: with several workers an invalidation or a
+# version bump only reaches the worker that made it, and the others keep
+# serving stale responses and ETags. It is therefore only the default under
+# DEBUG (runserver is a single process); otherwise the default is file, which
+# every worker on the host shares and needs no extra package, and
+# `python manage.py check --deploy` fails with api.E001 if locmem is chosen.
+
+API_CACHE_BACKENDS = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'api-responses',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('API_CACHE_LOCATION', str(BASE_DIR / '.cache' / 'api')),
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+    'db': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'api_cache',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+    'redis': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ.get('API_CACHE_LOCATION', 'redis://127.0.0.1:6379/1'),
+    },
+    'memcached': {
+        'BACKEND': 'django.core.cache.backends.memcached.PyMemcacheCache',
+        'LOCATION': os.environ.get('API_CACHE_LOCATION', '127.0.0.1:11211'),
+    },
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'api': {
+        **API_CACHE_BACKENDS[os.environ.get('API_CACHE_BACKEND', 'locmem' if DEBUG else 'file')],
+        'TIMEOUT': int(os.environ.get('API_CACHE_TIMEOUT', 300)),
+    },
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -129,11 +184,59 @@ STATIC_URL = 'static/'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
+    # Bearer tokens from /api/login/ are verified without a query; sessions
+    # (admin, browsable API) are only looked up for requests without one
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        'api.tokens.TokenAuthentication',
+        'rest_framework.authentication.SessionAuthentication',
+    ],
+    # JSONRenderer that reports its time to api.metrics
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.metrics.TimedJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',
     ]
 }
 
+# Lifetimes in seconds of the access and refresh tokens issued at login
+API_ACCESS_TOKEN_TTL = int(os.environ.get('API_ACCESS_TOKEN_TTL', 15 * 60))
+API_REFRESH_TOKEN_TTL = int(os.environ.get('API_REFRESH_TOKEN_TTL', 7 * 24 * 60 * 60))
+
+# Fraction of requests timed into the /api/_metrics histograms (0 disables
+# the middleware), and whether those responses carry a Server-Timing header.
+API_METRICS_SAMPLE_RATE = float(os.environ.get('API_METRICS_SAMPLE_RATE', 1.0))
+API_METRICS_SERVER_TIMING = os.environ.get('API_METRICS_SERVER_TIMING', '1' if DEBUG else '0') == '1'
+
+# Requests running one query template this many times or more are reported
+# as N+1 queries: 'warn' logs them with a stack summary, 'raise' fails the
+# request, 'off' removes the check (see api/querycheck.py).
+API_QUERY_PATTERN_CHECK = os.environ.get('API_QUERY_PATTERN_CHECK', 'warn')
+API_QUERY_REPEAT_THRESHOLD = int(os.environ.get('API_QUERY_REPEAT_THRESHOLD', 5))
+
+# List endpoints (students, courses, attendance) return plain lists unless the
+# client sends ?page_size= or ?cursor=. Set to False to always paginate.
+API_LEGACY_LIST_RESPONSES = True
+
+# Serve the hot read views (dashboard, marks, statistics, attendance by date)
+# from api/async_views.py. asgi.py turns this on; WSGI keeps the sync views.
+API_ASYNC_VIEWS = os.environ.get('API_ASYNC_VIEWS', '0') == '1'
+
+# Seconds a login remembers that an id is a student (or unknown), and the
+# threads that hash passwords for the async login view.
+LOGIN_IDENTITY_CACHE_TTL = int(os.environ.get('LOGIN_IDENTITY_CACHE_TTL', 60))
+LOGIN_HASH_WORKERS = int(os.environ.get('LOGIN_HASH_WORKERS', min(4, os.cpu_count() or 1)))
+
+# Letter grades by minimum percentage, used for every mark and course total.
+# A percentage below the lowest step gets the lowest grade.
+GRADING_SCALE = [
+    (90, 'A+'), (85, 'A'), (80, 'A-'),
+    (75, 'B+'), (70, 'B'), (65, 'B-'),
+    (60, 'C+'), (55, 'C'), (50, 'C-'),
+    (40, 'D'), (0, 'F'),
+]
+
 CORS_ALLOWED_ORIGINS = [
     'http://localhost:4200',
     'http://127.0.0.1:4200',
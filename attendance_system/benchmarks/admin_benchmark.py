@@ -0,0 +1,168 @@
+"""
+Render time of the admin changelists on a large table: the original
+ModelAdmin options ("before", reproduced below) against api/admin.py.
+
+The default data is 1000 students x 5 courses x 200 days = 1M attendance
+rows from ``seed_benchmark_data``; seeding takes a few minutes, so pass
+``--reuse`` on later runs.
+
+    python benchmarks/admin_benchmark.py [--students 1000 --courses 5 --days 200]
+                                         [--repeat 5] [--reuse] [--json results.json]
+"""
+import argparse
+import importlib
+import json
+import sys
+from pathlib import Path
+
+from common import DEFAULT_DB, migrate, setup_django, summarize, time_calls
+
+
+def legacy_admins():
+    """The changelist options of Student, Attendance and AttendanceSession before api/admin.py was reworked"""
+    from django.contrib import admin
+    from django.utils.html import format_html
+
+    class StudentAdmin(admin.ModelAdmin):
+        list_display = ['id', 'name', 'roll_number', 'email', 'attendance_count', 'created_at']
+        search_fields = ['name', 'id', 'roll_number', 'email']
+        list_filter = ['created_at']
+        ordering = ['roll_number']
+
+        def attendance_count(self, obj):
+            return format_html('<span>{}</span>', obj.attendance_records.count())
+
+    class AttendanceAdmin(admin.ModelAdmin):
+        list_display = ['student', 'date', 'status', 'marked_at', 'course']
+        search_fields = ['student__name', 'student__id', 'date']
+        list_filter = ['date', 'status', 'course', 'created_at']
+        ordering = ['-date']
+
+        def get_queryset(self, request):
+            return super().get_queryset(request).select_related('student', 'course')
+
+    class AttendanceSessionAdmin(admin.ModelAdmin):
+        list_display = ['course', 'date', 'teacher', 'present_count', 'absent_count', 'total_students']
+        search_fields = ['course__name', 'date']
+        list_filter = ['date', 'course', 'teacher', 'created_at']
+        ordering = ['-date']
+
+    class MarksAdmin(admin.ModelAdmin):
+        list_display = ['student', 'exam', 'marks_obtained', 'percentage', 'grade', 'updated_at']
+
+    return {
+        'Student': StudentAdmin,
+        'Attendance': AttendanceAdmin,
+        'AttendanceSession': AttendanceSessionAdmin,
+        'Marks': MarksAdmin,
+    }
+
+
+def use_admins(admins):
+    from django.apps import apps
+    from django.conf import settings
+    from django.contrib import admin
+    from django.urls import clear_url_caches
+
+    for name, admin_class in admins.items():
+        model = apps.get_model('api', name)
+        if admin.site.is_registered(model):
+            admin.site.unregister(model)
+        admin.site.register(model, admin_class)
+    # admin.site.urls binds the ModelAdmin instances when the URLconf is imported
+    if settings.ROOT_URLCONF in sys.modules:
+        importlib.reload(sys.modules[settings.ROOT_URLCONF])
+        clear_url_caches()
+
+
+def count_queries(connection, request):
+    """Run ``request()``; return how many queries it made"""
+    count = 0
+
+    def counter(execute, sql, params, many, context):
+        nonlocal count
+        count += 1
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(counter):
+        response = request()
+    assert response.status_code == 200, response.status_code
+    return count
+
+
+def changelists(start_date, rows):
+    year, month, _ = start_date.split('-')
+    return {
+        'students': '/admin/api/student/',
+        'attendance': '/admin/api/attendance/',
+        'attendance mid page': f'/admin/api/attendance/?p={rows // 100 // 2}',
+        'attendance month': f'/admin/api/attendance/?date__year={year}&date__month={int(month)}',
+        'attendance status': '/admin/api/attendance/?status__exact=A',
+        'attendance search date': f'/admin/api/attendance/?q={start_date}',
+        'attendance search name': '/admin/api/attendance/?q=Student%2042',
+        'sessions': '/admin/api/attendancesession/',
+        'marks': '/admin/api/marks/',
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--students', type=int, default=1000)
+    parser.add_argument('--courses', type=int, default=5)
+    parser.add_argument('--days', type=int, default=200)
+    parser.add_argument('--start-date', default='2024-01-01')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--db', default=str(DEFAULT_DB))
+    parser.add_argument('--reuse', action='store_true', help='Reuse an already seeded --db file')
+    parser.add_argument('--json', help='Write the results to this file')
+    args = parser.parse_args()
+
+    if not args.reuse:
+        Path(args.db).unlink(missing_ok=True)
+    settings = setup_django(args.db)
+    # The legacy StudentAdmin is an N+1 by design; don't log it on every render
+    settings.API_QUERY_PATTERN_CHECK = 'off'
+    migrate()
+
+    from django.contrib import admin
+    from django.contrib.auth.models import User
+    from django.core.management import call_command
+    from django.db import connection
+    from django.test import Client
+    from api.models import Attendance
+
+    if not args.reuse:
+        call_command('seed_benchmark_data', students=args.students, courses=args.courses, days=args.days,
+                     start_date=args.start_date, verbosity=0)
+    user, _ = User.objects.get_or_create(username='bench-admin', defaults={'is_staff': True, 'is_superuser': True})
+    client = Client()
+    client.force_login(user)
+    rows = Attendance.objects.count()
+    print(f'{rows:,} attendance rows')
+
+    current = {name: type(admin.site._registry[model]) for model in admin.site._registry
+               for name in [model.__name__] if name in ('Student', 'Attendance', 'AttendanceSession', 'Marks')}
+    results = {}
+    print(f"{'changelist':<24}{'before p50':>12}{'after p50':>12}{'queries':>12}")
+    for mode, admins in (('before', legacy_admins()), ('after', current)):
+        use_admins(admins)
+        for name, url in changelists(args.start_date, rows).items():
+            queries = count_queries(connection, lambda: client.get(url))
+            results.setdefault(name, {})[mode] = {
+                **summarize(time_calls(lambda: client.get(url), args.repeat)),
+                'queries': queries,
+            }
+
+    for name, row in results.items():
+        before, after = row['before'], row['after']
+        print(f"{name:<24}{before['p50_ms']:>10.1f}ms{after['p50_ms']:>10.1f}ms"
+              f"{before['queries']:>6} -> {after['queries']:<4}")
+
+    if args.json:
+        with open(args.json, 'w') as handle:
+            json.dump({'students': args.students, 'courses': args.courses, 'days': args.days,
+                       'changelists': results}, handle, indent=2)
+
+
+if __name__ == '__main__':
+    main()
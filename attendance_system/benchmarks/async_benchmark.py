@@ -0,0 +1,208 @@
+"""
+Concurrent-client throughput of the hot read views under WSGI and ASGI.
+
+The WSGI run calls the real WSGI application from a pool of ``--threads``
+worker threads (a threaded WSGI server) with the sync views; the ASGI run
+calls the real ASGI application from ``--clients`` concurrent coroutines
+with the async views (``API_ASYNC_VIEWS=1``, as asgi.py sets). Each mode
+runs in its own process because urls.py picks the views at import time.
+
+``--db-latency-ms`` adds a sleep to every SQL statement to stand in for a
+networked database; local SQLite answers in microseconds, which hides the
+time a request spends waiting on the database.
+
+    python benchmarks/async_benchmark.py [--clients 32 --threads 8 --requests 50]
+                                         [--db-latency-ms 2] [--json results.json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from io import BytesIO
+from pathlib import Path
+from wsgiref.util import setup_testing_defaults
+
+from common import DEFAULT_DB, migrate, percentile, quiet_logging, setup_django
+
+START_DATE = date(2024, 1, 1)
+STUDENTS = 500
+
+
+def routes(days):
+    middle = START_DATE + timedelta(days=days // 2)
+    # Any query parameter bypasses the per-student response cache, so every
+    # request reaches the database
+    return [
+        (f'/api/student-dashboard/B-{i:06d}/', 'bench=1') for i in range(0, 40, 4)
+    ] + [
+        (f'/api/marks/B-{i:06d}/', 'bench=1') for i in range(1, 40, 4)
+    ] + [
+        (f'/api/attendance-statistics/B-{i:06d}/', 'bench=1') for i in range(2, 40, 4)
+    ] + [
+        (f'/api/attendance-by-date/{middle}/', 'bench=1'),
+    ]
+
+
+def add_db_latency(latency_ms):
+    from django.db.backends.signals import connection_created
+
+    def slow(execute, sql, params, many, context):
+        time.sleep(latency_ms / 1000)
+        return execute(sql, params, many, context)
+
+    def install(sender, connection, **kwargs):
+        if slow not in connection.execute_wrappers:
+            connection.execute_wrappers.append(slow)
+
+    connection_created.connect(install, weak=False)
+
+
+def wsgi_get(app, path, query):
+    environ = {'PATH_INFO': path, 'QUERY_STRING': query, 'REQUEST_METHOD': 'GET',
+               'HTTP_HOST': 'localhost', 'wsgi.input': BytesIO()}
+    setup_testing_defaults(environ)
+    status = []
+    body = app(environ, lambda code, headers, exc_info=None: status.append(code))
+    try:
+        for _ in body:
+            pass
+    finally:
+        if hasattr(body, 'close'):
+            body.close()
+    return int(status[0].split()[0])
+
+
+async def asgi_get(app, path, query):
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+        'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'query_string': query.encode(),
+        'headers': [(b'host', b'localhost')], 'client': ('127.0.0.1', 0), 'server': ('localhost', 80),
+    }
+    messages = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+    status = []
+
+    async def receive():
+        if messages:
+            return messages.pop()
+        await asyncio.Event().wait()  # no disconnect; Django cancels this once it has answered
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            status.append(message['status'])
+
+    await app(scope, receive, send)
+    return status[0]
+
+
+def run_wsgi(targets, clients, threads, requests):
+    from django.core.wsgi import get_wsgi_application
+    app = get_wsgi_application()  # runs django.setup() again, which resets the log levels
+    quiet_logging()
+    latencies, statuses = [], []
+
+    def one(index):
+        path, query = targets[index % len(targets)]
+        start = time.perf_counter()
+        statuses.append(wsgi_get(app, path, query))
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(one, range(clients * requests)))
+    return latencies, statuses, time.perf_counter() - started
+
+
+def run_asgi(targets, clients, requests):
+    from django.core.asgi import get_asgi_application
+    app = get_asgi_application()
+    quiet_logging()
+    latencies, statuses = [], []
+
+    async def client(offset):
+        for step in range(requests):
+            path, query = targets[(offset + step * clients) % len(targets)]
+            start = time.perf_counter()
+            statuses.append(await asgi_get(app, path, query))
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    async def main():
+        await asyncio.gather(*(client(offset) for offset in range(clients)))
+
+    started = time.perf_counter()
+    asyncio.run(main())
+    return latencies, statuses, time.perf_counter() - started
+
+
+def worker(args):
+    """Run one mode in this process and print its results as JSON"""
+    setup_django(args.db)
+    if args.db_latency_ms:
+        add_db_latency(args.db_latency_ms)
+    targets = routes(args.days)
+    if args.worker == 'wsgi':
+        latencies, statuses, elapsed = run_wsgi(targets, args.clients, args.threads, args.requests)
+    else:
+        latencies, statuses, elapsed = run_asgi(targets, args.clients, args.requests)
+    print(json.dumps({
+        'requests': len(latencies),
+        'errors': sum(1 for code in statuses if code != 200),
+        'seconds': round(elapsed, 3),
+        'req_per_s': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 50), 2),
+        'p95_ms': round(percentile(latencies, 95), 2),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', type=int, default=32, help='Concurrent clients')
+    parser.add_argument('--threads', type=int, default=8, help='WSGI worker threads')
+    parser.add_argument('--requests', type=int, default=50, help='Requests per client')
+    parser.add_argument('--db-latency-ms', type=float, default=0)
+    parser.add_argument('--days', type=int, default=60)
+    parser.add_argument('--db', default=str(DEFAULT_DB))
+    parser.add_argument('--reuse', action='store_true', help='Reuse an already seeded --db file')
+    parser.add_argument('--json', help='Write the results to this file')
+    parser.add_argument('--worker', choices=['wsgi', 'asgi'], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(args)
+        return
+
+    if not args.reuse:
+        Path(args.db).unlink(missing_ok=True)
+        setup_django(args.db)
+        from django.core.management import call_command
+        migrate()
+        call_command('seed_benchmark_data', students=STUDENTS, courses=5, days=args.days,
+                     start_date=START_DATE.isoformat(), verbosity=0)
+
+    forwarded = [a for a in sys.argv[1:] if a not in ('--reuse',)]
+    results = {}
+    for mode in ('wsgi', 'asgi'):
+        env = dict(os.environ, API_ASYNC_VIEWS='1' if mode == 'asgi' else '0')
+        output = subprocess.run(
+            [sys.executable, __file__, *forwarded, '--reuse', '--worker', mode],
+            env=env, capture_output=True, text=True, check=True,
+        ).stdout
+        results[mode] = json.loads(output.strip().splitlines()[-1])
+
+    print(f"{'mode':<6}{'requests':>10}{'errors':>8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}")
+    for mode, row in results.items():
+        print(f"{mode:<6}{row['requests']:>10}{row['errors']:>8}{row['req_per_s']:>10.1f}"
+              f"{row['p50_ms']:>10.2f}{row['p95_ms']:>10.2f}")
+
+    if args.json:
+        with open(args.json, 'w') as handle:
+            json.dump({'clients': args.clients, 'threads': args.threads,
+                       'db_latency_ms': args.db_latency_ms, 'modes': results}, handle, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""
+Shared setup for the benchmark scripts in this directory.
+
+Benchmarks never touch the development database: ``setup_django`` points
+the default connection at a separate SQLite file (``benchmark.sqlite3`` by
+default) before Django opens any connection.
+"""
+import logging
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_DB = PROJECT_DIR / 'benchmark.sqlite3'
+
+
+def setup_django(db_path=DEFAULT_DB):
+    """Configure Django against ``db_path`` and return the settings object"""
+    sys.path.insert(0, str(PROJECT_DIR))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'attendance_system.settings')
+
+    from django.conf import settings
+    settings.DATABASES['default']['NAME'] = str(db_path)
+    settings.ALLOWED_HOSTS = ['*']
+
+    import django
+    django.setup()
+    quiet_logging()
+    return settings
+
+
+def quiet_logging():
+    """Silence request logging, which would dominate the timings; call again after django.setup()"""
+    logging.getLogger('api').setLevel(logging.WARNING)
+    logging.getLogger('django').setLevel(logging.ERROR)
+
+
+def migrate():
+    from django.core.management import call_command
+    call_command('migrate', verbosity=0)
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def time_calls(func, repeat, setup=None):
+    """
+    Run ``func`` ``repeat`` times; return the latencies in milliseconds.
+    ``setup``, if given, runs untimed before every call.
+    """
+    samples = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def summarize(samples):
+    return {
+        'p50_ms': round(statistics.median(samples), 3),
+        'p95_ms': round(percentile(samples, 95), 3),
+        'mean_ms': round(statistics.fmean(samples), 3),
+    }
@@ -0,0 +1,266 @@
+"""
+Drive every route in api/urls.py through the Django test client and record
+p50/p95 latency, query count and peak Python memory per route.
+
+Streamed bodies are read to the end inside the measured window, since their
+queries run lazily. Routes behind the ``api`` response cache are measured with
+the cache cleared before every call (the miss path), and their hit path is
+reported separately under ``cache_hit``. A route whose warm-up request does not
+answer 2xx is reported as failed, without timings, and fails the run.
+
+Results are written as JSON (with the current git commit) so two runs can be
+compared:
+
+    python benchmarks/endpoint_benchmark.py --json before.json
+    ... change code ...
+    python benchmarks/endpoint_benchmark.py --json after.json --compare before.json
+
+The data comes from ``seed_benchmark_data`` in a separate SQLite database;
+pass ``--reuse`` to keep an already seeded file between runs.
+"""
+import argparse
+import json
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import date, timedelta
+from pathlib import Path
+
+from common import DEFAULT_DB, PROJECT_DIR, migrate, setup_django, summarize, time_calls
+
+START_DATE = date(2024, 1, 1)
+BATCH = 300  # students per write request, i.e. one large roll call
+
+
+def sample_kwargs(days):
+    """Values for the URL converters used in api/urls.py"""
+    return {
+        'student_id': 'B-000001',
+        'course_id': 'BC001',
+        'attendance_date': (START_DATE + timedelta(days=days // 2)).isoformat(),
+    }
+
+
+def request_specs(days, students, calls):
+    """
+    Per-route query string, headers or request body; routes not listed are
+    plain GETs. ``calls`` is how many requests a route gets, so single-use
+    refresh tokens can be issued before the timings start.
+    """
+    from api.tokens import issue_tokens
+
+    end = (START_DATE + timedelta(days=min(days - 1, 30))).isoformat()
+    batch_ids = [f'B-{i:06d}' for i in range(min(BATCH, students))]
+
+    def token_pairs():
+        return iter([issue_tokens('student', 'B-000001', 'Benchmark Student') for _ in range(calls)])
+
+    refresh_pairs = token_pairs()
+    logout_pairs = token_pairs()
+
+    def logout_request():
+        pair = next(logout_pairs)
+        return {'refresh_token': pair['refresh_token']}, {'authorization': f"Bearer {pair['token']}"}
+
+    def marks_csv():
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        lines = ['student_id,marks_obtained'] + [f'{sid},{50 + i % 50}' for i, sid in enumerate(batch_ids)]
+        return SimpleUploadedFile('marks.csv', '\n'.join(lines).encode(), content_type='text/csv')
+
+    return {
+        'login': {'method': 'post', 'json': {'id': 'B-000001', 'password': 'benchmark'}},
+        'refresh_token': {'method': 'post', 'request': lambda: ({'refresh_token': next(refresh_pairs)['refresh_token']}, {})},
+        'logout': {'method': 'post', 'request': logout_request},
+        'current_user': {'headers': {'authorization': f"Bearer {next(token_pairs())['token']}"}},
+        'export_records': {'headers': {
+            'authorization': f"Bearer {issue_tokens('teacher', 1, 'Benchmark Teacher')['token']}",
+        }},
+        'mark_attendance': {'method': 'post', 'json': {
+            'date': START_DATE.isoformat(),
+            'course_id': 'BC001',
+            'records': [{'student_id': sid, 'status': 'PA'[i % 2]} for i, sid in enumerate(batch_ids)],
+        }},
+        'upload_marks': {'method': 'post', 'json': {
+            'course_id': 'BC001',
+            'exam_type': 'Midterm',
+            'records': [{'student_id': sid, 'marks_obtained': 40 + i % 60} for i, sid in enumerate(batch_ids)],
+        }},
+        'upload_marks_file': {'method': 'multipart', 'data': lambda: {
+            'file': marks_csv(), 'course_id': 'BC001', 'exam_type': 'Midterm',
+        }},
+        'teacher_attendance_summary': {'query': f'?from={START_DATE}&to={end}'},
+        'attendance_by_date_range': {'query': f'?start={START_DATE}&end={end}'},
+        'attendance_report': {'query': f"?course=BC001&date={sample_kwargs(days)['attendance_date']}"},
+    }
+
+
+def make_caller(client, url, spec):
+    """A function making one request and reading its (possibly streamed) body"""
+    send = _make_sender(client, url, spec)
+
+    def call():
+        response = send()
+        if response.streaming:
+            for _ in response.streaming_content:
+                pass
+        return response
+    return call
+
+
+def _make_sender(client, url, spec):
+    method = spec.get('method', 'get')
+    if method == 'post' and 'request' in spec:
+        # A fresh (body, headers) per call, for single-use tokens
+        def call():
+            body, headers = spec['request']()
+            return client.post(url, json.dumps(body), content_type='application/json', headers=headers)
+        return call
+    if method == 'post':
+        body = json.dumps(spec['json'])
+        return lambda: client.post(url, body, content_type='application/json')
+    if method == 'multipart':
+        return lambda: client.post(url, spec['data']())
+    headers = spec.get('headers', {})
+    return lambda: client.get(url, headers=headers)
+
+
+def peak_memory_kib(call):
+    tracemalloc.start()
+    try:
+        call()
+        return round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+    finally:
+        tracemalloc.stop()
+
+
+def run(client, days, students, repeat):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from django.urls import reverse
+    from api.cache import get_cache
+    from api.urls import app_name, urlpatterns
+
+    kwargs_pool = sample_kwargs(days)
+    # Warm-up, query count and memory runs come on top of the timed ones
+    specs = request_specs(days, students, calls=repeat + 3)
+    clear_cache = get_cache().clear
+    results = {}
+    for pattern in urlpatterns:
+        name = pattern.name
+        converters = list(pattern.pattern.converters)
+        missing = [key for key in converters if key not in kwargs_pool]
+        if missing:
+            results[name] = {'skipped': f'no sample value for {", ".join(missing)}'}
+            continue
+
+        spec = specs.get(name, {})
+        url = reverse(f'{app_name}:{name}', kwargs={key: kwargs_pool[key] for key in converters})
+        url += spec.get('query', '')
+        call = make_caller(client, url, spec)
+
+        response = call()  # warm-up, also records the status code
+        if not 200 <= response.status_code < 300:
+            results[name] = {'url': url, 'status': response.status_code, 'failed': True}
+            continue
+
+        # Cached routes are measured on the miss path, which does the work
+        reset = clear_cache if response.has_header('X-Cache') else None
+        if reset:
+            reset()
+        with CaptureQueriesContext(connection) as ctx:
+            call()
+        if reset:
+            reset()
+        row = results[name] = {
+            'url': url,
+            'status': response.status_code,
+            'queries': len(ctx.captured_queries),
+            'peak_memory_kib': peak_memory_kib(call),
+            **summarize(time_calls(call, repeat, setup=reset)),
+        }
+        if reset:
+            call()
+            row['cache_hit'] = summarize(time_calls(call, repeat))
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=PROJECT_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_table(results, baseline=None):
+    header = f"{'route':<30}{'status':>7}{'queries':>9}{'p50 ms':>10}{'p95 ms':>10}{'peak KiB':>11}{'hit p50':>9}"
+    if baseline:
+        header += f"{'d p50':>9}{'d queries':>11}"
+    print(header)
+    for name, row in results.items():
+        if 'skipped' in row:
+            print(f"{name:<30}  skipped: {row['skipped']}")
+            continue
+        if row.get('failed'):
+            print(f"{name:<30}{row['status']:>7}  FAILED: warm-up request was not 2xx")
+            continue
+        hit = f"{row['cache_hit']['p50_ms']:>9.2f}" if 'cache_hit' in row else f"{'-':>9}"
+        line = (f"{name:<30}{row['status']:>7}{row['queries']:>9}{row['p50_ms']:>10.2f}"
+                f"{row['p95_ms']:>10.2f}{row['peak_memory_kib']:>11.1f}{hit}")
+        old = (baseline or {}).get(name)
+        if old and 'p50_ms' in old:
+            change = (row['p50_ms'] - old['p50_ms']) / old['p50_ms'] * 100 if old['p50_ms'] else 0
+            line += f"{change:>+8.1f}%{row['queries'] - old['queries']:>+11d}"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--students', type=int, default=500)
+    parser.add_argument('--courses', type=int, default=5)
+    parser.add_argument('--days', type=int, default=60)
+    parser.add_argument('--repeat', type=int, default=30)
+    parser.add_argument('--db', default=str(DEFAULT_DB))
+    parser.add_argument('--reuse', action='store_true', help='Reuse an already seeded --db file')
+    parser.add_argument('--json', help='Write the results to this file')
+    parser.add_argument('--compare', help='Earlier results file to compare against')
+    args = parser.parse_args()
+
+    if not args.reuse:
+        Path(args.db).unlink(missing_ok=True)
+    setup_django(args.db)
+    from django.core.management import call_command
+    from django.test import Client
+
+    migrate()
+    if not args.reuse:
+        call_command('seed_benchmark_data', students=args.students, courses=args.courses,
+                     days=args.days, start_date=START_DATE.isoformat(), verbosity=0)
+
+    results = run(Client(), args.days, args.students, args.repeat)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as handle:
+            baseline = json.load(handle)['routes']
+    print_table(results, baseline)
+
+    if args.json:
+        report = {
+            'commit': git_commit(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'scale': {'students': args.students, 'courses': args.courses, 'days': args.days, 'repeat': args.repeat},
+            'routes': results,
+        }
+        with open(args.json, 'w') as handle:
+            json.dump(report, handle, indent=2)
+
+    failed = [name for name, row in results.items() if row.get('failed')]
+    if failed:
+        sys.exit(f"Failed routes (not 2xx): {', '.join(failed)}")
+
+
+if __name__ == '__main__':
+    main()
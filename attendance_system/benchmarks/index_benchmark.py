@@ -0,0 +1,164 @@
+"""
+Measure the read endpoints with and without the composite indexes.
+
+Seeds a separate SQLite database with ~1M attendance rows (1000 students x
+5 courses x 200 days by default, via ``seed_benchmark_data``), then for every endpoint prints the query
+plan of each SQL statement and the latency, first with the indexes added by
+migration 0006 dropped ("before") and then with them recreated ("after").
+
+    python benchmarks/index_benchmark.py [--students 1000 --courses 5 --days 200]
+                                         [--repeat 20] [--json results.json] [--reuse]
+"""
+import argparse
+import importlib
+import json
+from datetime import date, timedelta
+
+from common import DEFAULT_DB, migrate, setup_django, summarize, time_calls
+
+INDEX_MIGRATION = 'api.migrations.0006_attendance_marks_indexes'
+START_DATE = date(2024, 1, 1)
+
+
+def endpoints(days):
+    student = 'B-000001'
+    course = 'BC001'
+    middle = START_DATE + timedelta(days=days // 2)
+    month_end = START_DATE + timedelta(days=min(days - 1, 30))
+    return {
+        'student-dashboard': f'/api/student-dashboard/{student}/',
+        'attendance-by-date': f'/api/attendance-by-date/{middle}/',
+        'attendance-detail': f'/api/attendance-detail/{student}/',
+        'attendance-statistics': f'/api/attendance-statistics/{student}/',
+        'teacher-attendance-summary': f'/api/teacher-attendance-summary/?from={START_DATE}&to={month_end}&below=75',
+        'attendance-by-date-range': f'/api/attendance-by-date-range/{student}/?start={START_DATE}&end={month_end}',
+        'attendance-report': f'/api/attendance-report/?course={course}&date={middle}',
+        'marks': f'/api/marks/{student}/',
+        'course-marks': f'/api/course-marks/{course}/',
+    }
+
+
+def toggle_indexes(create):
+    """
+    Drop or recreate the indexes that INDEX_MIGRATION adds; indexes a later
+    migration has since removed from the schema are skipped
+    """
+    from django.apps import apps
+    from django.db import connection
+
+    operations = importlib.import_module(INDEX_MIGRATION).Migration.operations
+    with connection.schema_editor() as editor:
+        for operation in operations:
+            model = apps.get_model('api', operation.model_name)
+            if operation.index.name not in {index.name for index in model._meta.indexes}:
+                continue
+            with connection.cursor() as cursor:
+                exists = operation.index.name in connection.introspection.get_constraints(cursor, model._meta.db_table)
+            if create and not exists:
+                editor.add_index(model, operation.index)
+            elif not create and exists:
+                editor.remove_index(model, operation.index)
+
+
+def capture_sql(client, url):
+    """Raw (sql, params) for every statement one request executes"""
+    from django.db import connection
+
+    statements = []
+
+    def wrapper(execute, sql, params, many, context):
+        statements.append((sql, params))
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(wrapper):
+        client.get(url)
+    return statements
+
+
+def explain(statements):
+    from django.db import connection
+
+    prefix = 'EXPLAIN QUERY PLAN ' if connection.vendor == 'sqlite' else 'EXPLAIN '
+    plans = []
+    seen = set()
+    with connection.cursor() as cursor:
+        for sql, params in statements:
+            # N+1 patterns repeat one statement; its plan is only shown once
+            if sql in seen or not sql.lstrip().upper().startswith('SELECT'):
+                continue
+            seen.add(sql)
+            cursor.execute(prefix + sql, params)
+            plans.append({
+                'sql': sql,
+                'plan': [' '.join(str(part) for part in row) for row in cursor.fetchall()],
+            })
+    return plans
+
+
+def measure(client, urls, repeat):
+    results = {}
+    for name, url in urls.items():
+        statements = capture_sql(client, url)
+        samples = time_calls(lambda: client.get(url), repeat)
+        results[name] = {
+            'url': url,
+            'queries': len(statements),
+            **summarize(samples),
+            'plans': explain(statements),
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--students', type=int, default=1000)
+    parser.add_argument('--courses', type=int, default=5)
+    parser.add_argument('--days', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--db', default=str(DEFAULT_DB))
+    parser.add_argument('--reuse', action='store_true', help='Reuse an already seeded --db file')
+    parser.add_argument('--json', help='Also write the results to this file')
+    args = parser.parse_args()
+
+    from pathlib import Path
+    if not args.reuse:
+        Path(args.db).unlink(missing_ok=True)
+    setup_django(args.db)
+    from django.core.management import call_command
+    from django.test import Client
+
+    migrate()
+    if not args.reuse:
+        print(f'Seeding {args.students * args.courses * args.days:,} attendance rows...')
+        call_command('seed_benchmark_data', students=args.students, courses=args.courses,
+                     days=args.days, start_date=START_DATE.isoformat())
+
+    client = Client()
+    urls = endpoints(args.days)
+
+    toggle_indexes(create=False)
+    try:
+        before = measure(client, urls, args.repeat)
+    finally:
+        toggle_indexes(create=True)
+    after = measure(client, urls, args.repeat)
+
+    print(f"\n{'endpoint':<28}{'queries':>8}{'before p50':>12}{'after p50':>12}{'speedup':>9}")
+    for name in urls:
+        b, a = before[name], after[name]
+        speedup = b['p50_ms'] / a['p50_ms'] if a['p50_ms'] else 0
+        print(f"{name:<28}{a['queries']:>8}{b['p50_ms']:>10.2f}ms{a['p50_ms']:>10.2f}ms{speedup:>8.1f}x")
+
+    for name in urls:
+        print(f'\n== {name} ({urls[name]})')
+        for label, result in (('before', before[name]), ('after', after[name])):
+            for plan in result['plans']:
+                print(f'  [{label}] ' + ' | '.join(plan['plan']))
+
+    if args.json:
+        with open(args.json, 'w') as handle:
+            json.dump({'before': before, 'after': after}, handle, indent=2, default=str)
+
+
+if __name__ == '__main__':
+    main()
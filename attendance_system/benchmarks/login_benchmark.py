@@ -0,0 +1,198 @@
+"""
+A "9am login storm": a whole class of students plus a few teachers logging
+in at once, comparing the old login sequence with the fast path.
+
+Modes, each starting from a cold identity cache:
+
+- ``legacy``: the previous view logic (``authenticate()`` -- which hashes
+  even for student ids -- then TeacherProfile, Student and User lookups)
+  from ``--threads`` worker threads, as a threaded WSGI server runs it.
+- ``fast``: ``auth.resolve_login`` from the same threads.
+- ``sync-under-asgi``: ``resolve_login`` called the way ASGI serves a sync
+  view, through ``sync_to_async`` and its single shared thread.
+- ``async``: ``auth.aresolve_login`` as the async login view runs it, with
+  the hashing on the ``LOGIN_HASH_WORKERS`` thread pool.
+
+Teachers use the project's real password hasher.
+
+    python benchmarks/login_benchmark.py [--students 300 --teachers 30 --threads 8]
+                                         [--db-latency-ms 2] [--json results.json]
+"""
+import argparse
+import asyncio
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from async_benchmark import add_db_latency
+from common import DEFAULT_DB, migrate, percentile, setup_django
+
+TEACHER_PASSWORD = 'bench-pass'
+
+
+def seed(students, teachers):
+    from django.contrib.auth.hashers import make_password
+    from django.contrib.auth.models import User
+    from django.core.management import call_command
+    from api.models import TeacherProfile
+
+    call_command('seed_benchmark_data', students=students, courses=1, days=1, exams=0, verbosity=0)
+    password = make_password(TEACHER_PASSWORD)  # one hash, shared by every teacher
+    users = User.objects.bulk_create(
+        [User(username=f'bench-teacher-{i}', password=password, first_name='Bench') for i in range(teachers)]
+    )
+    TeacherProfile.objects.bulk_create(
+        [TeacherProfile(user=user, employee_id=f'BT{i:04d}', subject='Bench') for i, user in enumerate(users)]
+    )
+
+
+def storm(students, teachers):
+    """(username, password) per login, teachers spread through the class"""
+    logins = [(f'B-{i:06d}', 'any') for i in range(students)]
+    step = max(1, students // max(1, teachers))
+    for i in range(teachers):
+        logins.insert(min(len(logins), i * (step + 1)), (f'bench-teacher-{i}', TEACHER_PASSWORD))
+    return logins
+
+
+def legacy_login(username, password):
+    """The lookups /api/login/ made before the fast path, returning the role"""
+    from django.contrib.auth import authenticate
+    from django.contrib.auth.models import User
+    from api.models import Student, TeacherProfile
+
+    user = authenticate(username=username, password=password)
+    if user:
+        TeacherProfile.objects.filter(user=user).first()
+        return 'teacher'
+    if Student.objects.filter(id=username).first():
+        return 'student'
+    User.objects.filter(username=username).exists()
+    return None
+
+
+def fast_login(username, password):
+    from api.auth import resolve_login
+    status_code, body = resolve_login(username, password)
+    return body.get('role')
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        with self.lock:
+            self.count += 1
+        return execute(sql, params, many, context)
+
+
+def install_counter(counter):
+    from django.db.backends.signals import connection_created
+
+    def install(sender, connection, **kwargs):
+        if counter not in connection.execute_wrappers:
+            connection.execute_wrappers.append(counter)
+
+    connection_created.connect(install, weak=False)
+
+
+def run_threads(login, logins, threads):
+    latencies, roles = [], []
+
+    def one(credentials):
+        start = time.perf_counter()
+        roles.append(login(*credentials))
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(one, logins))
+    return latencies, roles, time.perf_counter() - started
+
+
+def run_async(make_call, logins):
+    latencies, roles = [], []
+
+    async def one(credentials):
+        start = time.perf_counter()
+        roles.append(await make_call(*credentials))
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    async def main():
+        await asyncio.gather(*(one(credentials) for credentials in logins))
+
+    started = time.perf_counter()
+    asyncio.run(main())
+    return latencies, roles, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--students', type=int, default=300)
+    parser.add_argument('--teachers', type=int, default=30)
+    parser.add_argument('--threads', type=int, default=8, help='WSGI worker threads')
+    parser.add_argument('--db-latency-ms', type=float, default=0)
+    parser.add_argument('--db', default=str(DEFAULT_DB))
+    parser.add_argument('--reuse', action='store_true', help='Reuse an already seeded --db file')
+    parser.add_argument('--json', help='Write the results to this file')
+    args = parser.parse_args()
+
+    if not args.reuse:
+        Path(args.db).unlink(missing_ok=True)
+    settings = setup_django(args.db)
+    migrate()
+    if not args.reuse:
+        seed(args.students, args.teachers)
+    if args.db_latency_ms:
+        add_db_latency(args.db_latency_ms)
+    counter = QueryCounter()
+    install_counter(counter)
+
+    from asgiref.sync import sync_to_async
+    from api.auth import aresolve_login
+    from api.cache import get_cache
+
+    async def async_login(username, password):
+        status_code, body = await aresolve_login(username, password)
+        return body.get('role')
+
+    logins = storm(args.students, args.teachers)
+    modes = {
+        'legacy': lambda: run_threads(legacy_login, logins, args.threads),
+        'fast': lambda: run_threads(fast_login, logins, args.threads),
+        'sync-under-asgi': lambda: run_async(sync_to_async(fast_login), logins),
+        'async': lambda: run_async(async_login, logins),
+    }
+
+    print(f'{len(logins)} logins ({args.teachers} teachers), hash workers: {settings.LOGIN_HASH_WORKERS}')
+    print(f"{'mode':<16}{'logins/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'queries':>9}{'failed':>8}")
+    results = {}
+    for mode, run in modes.items():
+        get_cache().clear()
+        counter.count = 0
+        latencies, roles, elapsed = run()
+        results[mode] = {
+            'logins': len(latencies),
+            'failed': sum(1 for role in roles if role is None),
+            'seconds': round(elapsed, 3),
+            'logins_per_s': round(len(latencies) / elapsed, 1),
+            'p50_ms': round(percentile(latencies, 50), 2),
+            'p95_ms': round(percentile(latencies, 95), 2),
+            'queries': counter.count,
+        }
+        row = results[mode]
+        print(f"{mode:<16}{row['logins_per_s']:>10.1f}{row['p50_ms']:>10.2f}{row['p95_ms']:>10.2f}"
+              f"{row['queries']:>9}{row['failed']:>8}")
+
+    if args.json:
+        with open(args.json, 'w') as handle:
+            json.dump({'students': args.students, 'teachers': args.teachers, 'threads': args.threads,
+                       'db_latency_ms': args.db_latency_ms, 'modes': results}, handle, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""
+Compare the DRF / per-instance serialization of attendance and marks rows
+with the ``.values()`` fast path in ``api/fast_serializers.py``.
+
+Each case serializes the same rows both ways (query included, JSON rendering
+excluded), checks that the rendered JSON is byte-identical, and reports the
+timings and speedup:
+
+    python benchmarks/serializer_benchmark.py [--rows 10000] [--repeat 10] [--json results.json]
+"""
+import argparse
+import json
+from datetime import date
+from pathlib import Path
+
+from common import DEFAULT_DB, migrate, setup_django, summarize, time_calls
+
+START_DATE = date(2024, 1, 1)
+STUDENTS = 500
+COURSES = 5
+
+
+def legacy_student_marks(queryset):
+    """The loop get_marks used before the fast path"""
+    rows = []
+    for mark in queryset.select_related('exam', 'exam__course', 'exam__exam_type'):
+        rows.append({
+            'id': mark.id,
+            'course_id': mark.exam.course.id,
+            'course_name': mark.exam.course.name,
+            'exam_type': mark.exam.exam_type.name,
+            'marks_obtained': float(mark.marks_obtained),
+            'max_marks': float(mark.exam.max_marks),
+            'percentage': float(mark.percentage) if mark.percentage is not None else 0,
+            'grade': mark.grade,
+        })
+    return rows
+
+
+def cases(rows):
+    from api.fast_serializers import attendance_rows, student_marks_rows
+    from api.models import Attendance, Marks
+    from api.serializers import AttendanceSerializer
+
+    attendance = Attendance.objects.order_by('-date', 'id')[:rows]
+    marks = Marks.objects.order_by('-created_at', 'id')[:rows]
+    return {
+        'attendance': (
+            lambda: AttendanceSerializer(attendance.select_related('student', 'course'), many=True).data,
+            lambda: attendance_rows(attendance),
+        ),
+        'attendance ?fields=': (
+            lambda: AttendanceSerializer(
+                attendance.select_related('student'), many=True, fields=['student', 'student_name', 'status']
+            ).data,
+            lambda: attendance_rows(attendance, ['student', 'student_name', 'status']),
+        ),
+        'marks': (
+            lambda: legacy_student_marks(marks),
+            lambda: student_marks_rows(marks),
+        ),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--db', default=str(DEFAULT_DB))
+    parser.add_argument('--reuse', action='store_true', help='Reuse an already seeded --db file')
+    parser.add_argument('--json', help='Write the results to this file')
+    args = parser.parse_args()
+
+    if not args.reuse:
+        Path(args.db).unlink(missing_ok=True)
+    setup_django(args.db)
+    from django.core.management import call_command
+    from rest_framework.renderers import JSONRenderer
+
+    migrate()
+    if not args.reuse:
+        # Enough attendance days and exams to have --rows of each
+        days = -(-args.rows // (STUDENTS * COURSES))
+        exams = min(4, -(-args.rows // (STUDENTS * COURSES)))
+        call_command('seed_benchmark_data', students=STUDENTS, courses=COURSES, days=days, exams=exams,
+                     start_date=START_DATE.isoformat(), verbosity=0)
+
+    renderer = JSONRenderer()
+    results = {}
+    print(f"{'case':<22}{'rows':>7}{'drf p50 ms':>12}{'fast p50 ms':>13}{'speedup':>9}")
+    for name, (slow, fast) in cases(args.rows).items():
+        slow_data, fast_data = slow(), fast()
+        if renderer.render(slow_data) != renderer.render(fast_data):
+            raise SystemExit(f'{name}: fast path JSON differs from the serializer output')
+        slow_timing = summarize(time_calls(slow, args.repeat))
+        fast_timing = summarize(time_calls(fast, args.repeat))
+        speedup = slow_timing['p50_ms'] / fast_timing['p50_ms'] if fast_timing['p50_ms'] else 0
+        results[name] = {'rows': len(fast_data), 'drf': slow_timing, 'fast': fast_timing,
+                         'speedup': round(speedup, 2)}
+        print(f"{name:<22}{len(fast_data):>7}{slow_timing['p50_ms']:>12.2f}"
+              f"{fast_timing['p50_ms']:>13.2f}{speedup:>8.1f}x")
+
+    if args.json:
+        with open(args.json, 'w') as handle:
+            json.dump(results, handle, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+"""
+Peak Python memory of attendance-by-date-range with and without ``?stream=``
+as the requested history grows.
+
+One student gets ``--courses`` records per day for ``--days`` days; the
+endpoint is then asked for windows of increasing length, and the response
+body is consumed chunk by chunk while tracemalloc records the peak. With
+``--asgi`` the requests go through Django's ASGI handler, as under uvicorn,
+instead of the WSGI test client:
+
+    python benchmarks/streaming_benchmark.py [--days 4000 --courses 5] [--asgi] [--json results.json]
+"""
+import argparse
+import asyncio
+import json
+import time
+import tracemalloc
+from datetime import date, timedelta
+from pathlib import Path
+
+from common import DEFAULT_DB, migrate, setup_django
+
+START_DATE = date(2024, 1, 1)
+STUDENT = 'B-000000'
+MODES = {'list': '', 'stream=1': '&stream=1', 'stream=ndjson': '&stream=ndjson'}
+
+
+def measure(client, url):
+    """(peak KiB, body bytes, seconds) for one request, body consumed incrementally"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        response = client.get(url)
+        if response.streaming:
+            size = sum(len(chunk) for chunk in response.streaming_content)
+        else:
+            size = len(response.content)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return round(peak / 1024, 1), size, round(time.perf_counter() - start, 3)
+
+
+async def asgi_get(application, url):
+    """Body size of a GET to ``application``, counted as the handler sends it"""
+    path, _, query = url.partition('?')
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+        'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'query_string': query.encode(),
+        'headers': [(b'host', b'localhost')], 'server': ('localhost', 80), 'client': ('127.0.0.1', 0),
+    }
+    received = False
+    size = 0
+
+    async def receive():
+        nonlocal received
+        if received:
+            await asyncio.Event().wait()  # the client never disconnects
+        received = True
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        nonlocal size
+        if message['type'] == 'http.response.body':
+            size += len(message.get('body', b''))
+
+    await application(scope, receive, send)
+    return size
+
+
+def measure_asgi(application, url):
+    """``measure`` through the ASGI handler"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        size = asyncio.run(asgi_get(application, url))
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return round(peak / 1024, 1), size, round(time.perf_counter() - start, 3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--days', type=int, default=4000)
+    parser.add_argument('--courses', type=int, default=5)
+    parser.add_argument('--db', default=str(DEFAULT_DB))
+    parser.add_argument('--reuse', action='store_true', help='Reuse an already seeded --db file')
+    parser.add_argument('--asgi', action='store_true', help="Serve the requests with Django's ASGI handler")
+    parser.add_argument('--json', help='Write the results to this file')
+    args = parser.parse_args()
+
+    if not args.reuse:
+        Path(args.db).unlink(missing_ok=True)
+    setup_django(args.db)
+    from django.core.management import call_command
+    from django.test import Client
+
+    migrate()
+    if not args.reuse:
+        call_command('seed_benchmark_data', students=1, courses=args.courses, days=args.days, exams=0,
+                     start_date=START_DATE.isoformat(), verbosity=0)
+
+    if args.asgi:
+        from django.core.handlers.asgi import ASGIHandler
+        application = ASGIHandler()
+        get = lambda url: measure_asgi(application, url)  # noqa: E731
+    else:
+        client = Client()
+        get = lambda url: measure(client, url)  # noqa: E731
+    results = []
+    print(f"{'rows':>8}  " + ''.join(f'{mode + " KiB":>20}' for mode in MODES))
+    window = max(1, args.days // 8)
+    while window <= args.days:
+        end = START_DATE + timedelta(days=window - 1)
+        url = f'/api/attendance-by-date-range/{STUDENT}/?start={START_DATE}&end={end}'
+        row = {'rows': window * args.courses}
+        for mode, query in MODES.items():
+            peak, size, seconds = get(url + query)
+            row[mode] = {'peak_kib': peak, 'bytes': size, 'seconds': seconds}
+        results.append(row)
+        print(f"{row['rows']:>8}  " + ''.join(f"{row[mode]['peak_kib']:>20.1f}" for mode in MODES))
+        window *= 2
+
+    if args.json:
+        with open(args.json, 'w') as handle:
+            json.dump(results, handle, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,7 @@
 import { Injectable } from '@angular/core';
-import { HttpClient, HttpHeaders } from '@angular/common/http';
+import { HttpClient } from '@angular/common/http';
 import { Observable } from 'rxjs';
+import { HttpService } from './http.service';
 
 export interface AttendanceDetail {
   student_id: string;
@@ -79,48 +80,32 @@ export interface DateRangeAttendance {
 @Injectable({ providedIn: 'root' })
 export class AttendanceDetailService {
   private apiUrl = 'http://127.0.0.1:8000/api';
-  private token: string | null = null;
 
-  constructor(private http: HttpClient) {
-    this.loadToken();
-  }
-
-  private loadToken() {
-    this.token = localStorage.getItem('authToken');
-  }
-
-  private getHeaders(): HttpHeaders {
-    let headers = new HttpHeaders({
-      'Content-Type': 'application/json',
-    });
-    if (this.token) {
-      headers = headers.set('Authorization', `Bearer ${this.token}`);
-    }
-    return headers;
-  }
+  // Tokens (current, refreshed on a 401) come from HttpService
+  constructor(private http: HttpClient, private httpService: HttpService) {}
 
   // Get detailed attendance information for a student
   getAttendanceDetail(studentId: string): Observable<AttendanceDetail> {
-    return this.http.get<AttendanceDetail>(
+    return this.httpService.withAuth((headers) => this.http.get<AttendanceDetail>(
       `${this.apiUrl}/attendance-detail/${studentId}/`,
-      { headers: this.getHeaders() }
-    );
+      { headers }
+    ));
   }
 
   // Get attendance statistics and trends
   getAttendanceStatistics(studentId: string): Observable<AttendanceStatistics> {
-    return this.http.get<AttendanceStatistics>(
+    return this.httpService.withAuth((headers) => this.http.get<AttendanceStatistics>(
       `${this.apiUrl}/attendance-statistics/${studentId}/`,
-      { headers: this.getHeaders() }
-    );
+      { headers }
+    ));
   }
 
   // Get teacher attendance summary (all students)
   getTeacherAttendanceSummary(): Observable<TeacherAttendanceSummary> {
-    return this.http.get<TeacherAttendanceSummary>(
+    return this.httpService.withAuth((headers) => this.http.get<TeacherAttendanceSummary>(
       `${this.apiUrl}/teacher-attendance-summary/`,
-      { headers: this.getHeaders() }
-    );
+      { headers }
+    ));
   }
 
   // Get attendance for a date range
@@ -133,12 +118,12 @@ export class AttendanceDetailService {
       start_date: startDate,
       end_date: endDate
     };
-    return this.http.get<DateRangeAttendance>(
+    return this.httpService.withAuth((headers) => this.http.get<DateRangeAttendance>(
       `${this.apiUrl}/attendance-by-date-range/${studentId}/`,
       {
-        headers: this.getHeaders(),
+        headers,
         params: params
       }
-    );
+    ));
   }
 }
\ No newline at end of file
@@ -12,6 +12,7 @@ export class AuthService {
 
   private router = inject(Router);
   private httpService = inject(HttpService);
+  private refreshTimer: ReturnType<typeof setTimeout> | null = null;
 
   constructor() {
     this.restoreSession();
@@ -27,9 +28,30 @@ export class AuthService {
       this.userRole.set(storedRole as 'student' | 'teacher');
       this.currentUser.set(storedUser);
       this.currentUserId.set(storedUserId);
+      // The stored access token may have expired; get a fresh pair
+      if (this.httpService.hasRefreshToken()) {
+        this.refreshTokens();
+      }
     }
   }
 
+  // Refresh the access token a minute before it expires
+  private scheduleRefresh(expiresIn?: number) {
+    if (this.refreshTimer) {
+      clearTimeout(this.refreshTimer);
+    }
+    if (expiresIn) {
+      this.refreshTimer = setTimeout(() => this.refreshTokens(), Math.max(expiresIn - 60, 30) * 1000);
+    }
+  }
+
+  private refreshTokens() {
+    this.httpService.refreshOnce().subscribe({
+      next: (response) => this.scheduleRefresh(response.expires_in),
+      error: () => this.logout()
+    });
+  }
+
   // Login with backend API
   login(id: string, password: string): Promise<boolean> {
     this.loading.set(true);
@@ -39,9 +61,10 @@ export class AuthService {
       this.httpService.login(id, password).subscribe({
         next: (response) => {
           if (response.success) {
-            // Store token if provided
+            // Store tokens if provided
             if (response.token) {
-              this.httpService.setToken(response.token);
+              this.httpService.setToken(response.token, response.refresh_token);
+              this.scheduleRefresh(response.expires_in);
             }
 
             // Set role and user info
@@ -89,6 +112,13 @@ export class AuthService {
 
   // Logout
   logout() {
+    if (this.refreshTimer) {
+      clearTimeout(this.refreshTimer);
+      this.refreshTimer = null;
+    }
+    if (this.httpService.hasRefreshToken()) {
+      this.httpService.logout().subscribe({ error: () => {} });
+    }
     this.userRole.set(null);
     this.currentUser.set(null);
     this.currentUserId.set(null);
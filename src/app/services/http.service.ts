@@ -1,6 +1,6 @@
 import { Injectable } from '@angular/core';
-import { HttpClient, HttpHeaders } from '@angular/common/http';
-import { Observable } from 'rxjs';
+import { HttpClient, HttpErrorResponse, HttpHeaders } from '@angular/common/http';
+import { Observable, catchError, finalize, shareReplay, switchMap, tap, throwError } from 'rxjs';
 
 export interface LoginRequest {
   id: string;
@@ -14,6 +14,15 @@ export interface LoginResponse {
   user_name?: string;
   message: string;
   token?: string;
+  refresh_token?: string;
+  expires_in?: number;
+}
+
+export interface TokenResponse {
+  success: boolean;
+  token: string;
+  refresh_token: string;
+  expires_in: number;
 }
 
 export interface Student {
@@ -63,6 +72,8 @@ export interface AttendanceRecord {
 export class HttpService {
   private apiUrl = 'http://127.0.0.1:8000/api';
   private token: string | null = null;
+  private refreshToken: string | null = null;
+  private refreshing: Observable<TokenResponse> | null = null;
 
   constructor(private http: HttpClient) {
     this.loadToken();
@@ -70,6 +81,7 @@ export class HttpService {
 
   private loadToken() {
     this.token = localStorage.getItem('authToken');
+    this.refreshToken = localStorage.getItem('refreshToken');
   }
 
   private getHeaders(): HttpHeaders {
@@ -90,49 +102,99 @@ export class HttpService {
     });
   }
 
-  // Set token after successful login
-  setToken(token: string) {
+  // Set tokens after successful login or refresh
+  setToken(token: string, refreshToken?: string) {
     this.token = token;
     localStorage.setItem('authToken', token);
+    if (refreshToken) {
+      this.refreshToken = refreshToken;
+      localStorage.setItem('refreshToken', refreshToken);
+    }
   }
 
-  // Clear token on logout
+  hasRefreshToken(): boolean {
+    return this.refreshToken !== null;
+  }
+
+  // Exchange the refresh token for a new token pair
+  refresh(): Observable<TokenResponse> {
+    return this.http.post<TokenResponse>(`${this.apiUrl}/token/refresh/`, {
+      refresh_token: this.refreshToken
+    });
+  }
+
+  // One refresh at a time; concurrent callers share it (a refresh token is single-use)
+  refreshOnce(): Observable<TokenResponse> {
+    if (!this.refreshing) {
+      this.refreshing = this.refresh().pipe(
+        tap((response) => this.setToken(response.token, response.refresh_token)),
+        finalize(() => (this.refreshing = null)),
+        shareReplay(1)
+      );
+    }
+    return this.refreshing;
+  }
+
+  // Send a request with the current token; on a 401, refresh the tokens once and retry
+  withAuth<T>(send: (headers: HttpHeaders) => Observable<T>): Observable<T> {
+    return send(this.getHeaders()).pipe(
+      catchError((error: HttpErrorResponse) => {
+        if (error.status !== 401 || !this.refreshToken) {
+          return throwError(() => error);
+        }
+        return this.refreshOnce().pipe(switchMap(() => send(this.getHeaders())));
+      })
+    );
+  }
+
+  // Revoke the current tokens on the server
+  logout(): Observable<any> {
+    return this.withAuth((headers) => this.http.post(
+      `${this.apiUrl}/logout/`,
+      { refresh_token: this.refreshToken },
+      { headers }
+    ));
+  }
+
+  // Clear tokens on logout
   clearToken() {
     this.token = null;
+    this.refreshToken = null;
     localStorage.removeItem('authToken');
+    localStorage.removeItem('refreshToken');
   }
 
   // Get all students for teacher
   getStudents(): Observable<Student[]> {
-    return this.http.get<Student[]>(
+    return this.withAuth((headers) => this.http.get<Student[]>(
       `${this.apiUrl}/students/`,
-      { headers: this.getHeaders() }
-    );
+      { headers }
+    ));
   }
 
   // Get attendance records for a given date
   getAttendanceByDate(date: string): Observable<AttendanceRecord[]> {
-    return this.http.get<AttendanceRecord[]>(
+    return this.withAuth((headers) => this.http.get<AttendanceRecord[]>(
       `${this.apiUrl}/attendance-by-date/${date}/`,
-      { headers: this.getHeaders() }
-    );
+      { headers }
+    ));
   }
 
   // Mark attendance - POST to backend
   markAttendance(attendanceData: AttendancePayload): Observable<any> {
-    return this.http.post(
+    return this.withAuth((headers) => this.http.post(
       `${this.apiUrl}/mark-attendance/`,
       attendanceData,
-      { headers: this.getHeaders() }
-    );
+      { headers }
+    ));
   }
 
   // Get student dashboard data
   getStudentDashboard(studentId: string): Observable<StudentDashboardResponse> {
-    return this.http.get<StudentDashboardResponse>(
+    return this.withAuth((headers) => this.http.get<StudentDashboardResponse>(
       `${this.apiUrl}/student-dashboard/${studentId}/`,
-      { headers: this.getHeaders() }
-    );
+      { headers }
+    ));
   }
 
   // Get attendance report
@@ -141,37 +203,37 @@ export class HttpService {
       course: courseId,
       date: date
     };
-    return this.http.get<any>(
+    return this.withAuth((headers) => this.http.get<any>(
       `${this.apiUrl}/attendance-report/`,
       { 
-        headers: this.getHeaders(),
+        headers,
         params: params
       }
-    );
+    ));
   }
 
   // Upload marks
   uploadMarks(marksData: any): Observable<any> {
-    return this.http.post(
+    return this.withAuth((headers) => this.http.post(
       `${this.apiUrl}/upload-marks/`,
       marksData,
-      { headers: this.getHeaders() }
-    );
+      { headers }
+    ));
   }
 
   // Get marks for a student
   getMarks(studentId: string): Observable<any> {
-    return this.http.get<any>(
+    return this.withAuth((headers) => this.http.get<any>(
       `${this.apiUrl}/marks/${studentId}/`,
-      { headers: this.getHeaders() }
-    );
+      { headers }
+    ));
   }
 
   // Get all courses
   getCourses(): Observable<any[]> {
-    return this.http.get<any[]>(
+    return this.withAuth((headers) => this.http.get<any[]>(
       `${this.apiUrl}/courses/`,
-      { headers: this.getHeaders() }
-    );
+      { headers }
+    ));
   }
 }
\ No newline at end of file